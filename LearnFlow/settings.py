@@ -38,6 +38,82 @@ GEMINI_API_KEYS = [os.environ.get('GEMINI_API_KEY_1'), os.environ.get('GEMINI_AP
 YOUTUBE_API_KEYS = [os.environ.get('YOUTUBE_API_KEY_1'), os.environ.get('YOUTUBE_API_KEY_2'), os.environ.get('YOUTUBE_API_KEY_3'), os.environ.get('YOUTUBE_API_KEY_4')]
 # print(f"YOUTUBE_API_KEY: {YOUTUBE_API_KEYS}") #Add this line.
 
+# Shared Gemini clients (search_app.gemini_client)
+GEMINI_MAX_CONCURRENCY_PER_KEY = int(os.environ.get('GEMINI_MAX_CONCURRENCY_PER_KEY', 8))
+GEMINI_HTTP_TIMEOUT_MS = int(os.environ.get('GEMINI_HTTP_TIMEOUT_MS', 0)) or None
+GEMINI_BASE_URL = os.environ.get('GEMINI_BASE_URL')
+
+# Gemini key scheduling (search_app.gemini_keys): per-key requests per minute, cooldown after a 429,
+# how long a caller may wait for a free key and after how long an unreleased call stops counting as
+# in-flight (its worker is assumed dead), in seconds
+GEMINI_KEY_RPM = int(os.environ.get('GEMINI_KEY_RPM', 15))
+GEMINI_KEY_COOLDOWN_SECONDS = int(os.environ.get('GEMINI_KEY_COOLDOWN_SECONDS', 60))
+GEMINI_KEY_MAX_WAIT_SECONDS = int(os.environ.get('GEMINI_KEY_MAX_WAIT_SECONDS', 10))
+GEMINI_KEY_ERROR_RATE_THRESHOLD = float(os.environ.get('GEMINI_KEY_ERROR_RATE_THRESHOLD', 0.5))
+GEMINI_KEY_LEASE_TTL_SECONDS = int(os.environ.get('GEMINI_KEY_LEASE_TTL_SECONDS', 10 * 60))
+
+# YouTube quota accounting (search_app.youtube_keys): units per key per Pacific-time day, and how long
+# concurrent searches in one worker wait to share one videos.list call, in milliseconds (a lone search does not wait)
+YOUTUBE_DAILY_QUOTA = int(os.environ.get('YOUTUBE_DAILY_QUOTA', 10000))
+YOUTUBE_DETAILS_BATCH_WINDOW_MS = int(os.environ.get('YOUTUBE_DETAILS_BATCH_WINDOW_MS', 25))
+# Search results cache: seconds a normalized query's results are reused, and in-process entry limit
+YOUTUBE_RESULT_CACHE_TTL = int(os.environ.get('YOUTUBE_RESULT_CACHE_TTL', 6 * 60 * 60))
+YOUTUBE_RESULT_CACHE_SIZE = int(os.environ.get('YOUTUBE_RESULT_CACHE_SIZE', 1024))
+
+# Sectioned topic generation (search_app.topic_generation): concurrent section prompts and retries per section
+TOPIC_SECTION_WORKERS = int(os.environ.get('TOPIC_SECTION_WORKERS', 8))
+TOPIC_SECTION_RETRIES = int(os.environ.get('TOPIC_SECTION_RETRIES', 2))
+
+# Single-flight coalescing of expensive generation (search_app.single_flight), in seconds
+SINGLE_FLIGHT_LOCK_TIMEOUT = int(os.environ.get('SINGLE_FLIGHT_LOCK_TIMEOUT', 120))
+SINGLE_FLIGHT_WAIT_TIMEOUT = int(os.environ.get('SINGLE_FLIGHT_WAIT_TIMEOUT', 90))
+SINGLE_FLIGHT_RESULT_TIMEOUT = int(os.environ.get('SINGLE_FLIGHT_RESULT_TIMEOUT', 60))
+SINGLE_FLIGHT_ERROR_TIMEOUT = int(os.environ.get('SINGLE_FLIGHT_ERROR_TIMEOUT', 5))
+
+# Seconds the ID list of a quiz question pool is cached for sampling (search_app.quiz_pool); inserts invalidate it
+QUIZ_POOL_IDS_TTL = int(os.environ.get('QUIZ_POOL_IDS_TTL', 60 * 60))
+
+# Quiz generation (search_app.quiz_generation): largest quiz a request may ask for, questions per generated
+# chunk and chunks generated concurrently
+QUIZ_MAX_QUESTIONS = int(os.environ.get('QUIZ_MAX_QUESTIONS', 50))
+QUIZ_CHUNK_SIZE = int(os.environ.get('QUIZ_CHUNK_SIZE', 10))
+QUIZ_CHUNK_WORKERS = int(os.environ.get('QUIZ_CHUNK_WORKERS', 5))
+
+# Quiz pool replenishment (search_app.quiz_generation): a top-up job of QUIZ_POOL_TOP_UP_SIZE questions
+# is queued when fewer than QUIZ_POOL_LOW_WATER questions of a pool are left unseen by the requesting user;
+# served question IDs are remembered per user for QUIZ_SEEN_TTL seconds
+QUIZ_POOL_LOW_WATER = int(os.environ.get('QUIZ_POOL_LOW_WATER', 20))
+QUIZ_POOL_TOP_UP_SIZE = int(os.environ.get('QUIZ_POOL_TOP_UP_SIZE', 20))
+QUIZ_SEEN_TTL = int(os.environ.get('QUIZ_SEEN_TTL', 30 * 24 * 60 * 60))
+
+# Near-duplicate quiz question detection (search_app.near_duplicates): estimated Jaccard similarity at
+# which a new question counts as a rewording of a stored one, MinHash size and LSH bands (must divide it).
+# Signatures and bands are stored per question; run rebuild_quiz_lsh_index after changing the last two
+QUIZ_NEAR_DUPLICATE_THRESHOLD = float(os.environ.get('QUIZ_NEAR_DUPLICATE_THRESHOLD', 0.7))
+QUIZ_MINHASH_PERMUTATIONS = int(os.environ.get('QUIZ_MINHASH_PERMUTATIONS', 80))
+QUIZ_LSH_BANDS = int(os.environ.get('QUIZ_LSH_BANDS', 16))
+
+# Subtopics whose articles and documentation are generated by one Gemini call (search_app.resources)
+RESOURCE_BATCH_SIZE = int(os.environ.get('RESOURCE_BATCH_SIZE', 10))
+
+# Speculative prefetch (search_app.prefetch): when a topic is created, low-priority jobs generate the resources
+# of its first TOPIC_PREFETCH_SUBTOPICS roadmap subtopics and a starter pool of TOPIC_PREFETCH_QUIZ_QUESTIONS
+# mcq questions for each (0 disables either)
+TOPIC_PREFETCH_SUBTOPICS = int(os.environ.get('TOPIC_PREFETCH_SUBTOPICS', 5))
+TOPIC_PREFETCH_QUIZ_QUESTIONS = int(os.environ.get('TOPIC_PREFETCH_QUIZ_QUESTIONS', 10))
+
+# Background job queue (jobs app, run with manage.py run_jobs): retries back off exponentially from
+# JOBS_RETRY_BASE_SECONDS up to JOBS_RETRY_MAX_SECONDS; a job running longer than JOBS_LOCK_TIMEOUT
+# seconds is assumed to belong to a dead worker and is claimed again
+JOBS_MAX_ATTEMPTS = int(os.environ.get('JOBS_MAX_ATTEMPTS', 5))
+JOBS_RETRY_BASE_SECONDS = int(os.environ.get('JOBS_RETRY_BASE_SECONDS', 10))
+JOBS_RETRY_MAX_SECONDS = int(os.environ.get('JOBS_RETRY_MAX_SECONDS', 60 * 60))
+JOBS_LOCK_TIMEOUT = int(os.environ.get('JOBS_LOCK_TIMEOUT', 10 * 60))
+JOBS_POLL_INTERVAL = float(os.environ.get('JOBS_POLL_INTERVAL', 1.0))
+
+# How long 'not a relevant topic' / 'not enough information' prompt verdicts are reused, in seconds
+TOPIC_ALIAS_NEGATIVE_TTL = int(os.environ.get('TOPIC_ALIAS_NEGATIVE_TTL', 24 * 60 * 60))
+
 SUPABASE_INDEXES = os.environ.get('SUPABASE_INDEXES')
 SUPABASE_INDEXES = SUPABASE_INDEXES.split(',') if SUPABASE_INDEXES else []
 
@@ -65,6 +141,7 @@ INSTALLED_APPS = [
     'quiz',
     'corsheaders',
     'quiz_downloads',
+    'jobs',
 ]
 
 MIDDLEWARE = [
@@ -27,4 +27,5 @@ urlpatterns = [
     path('authentication/', include('authentication.urls')),
     path('quiz/', include('quiz.urls')),
     path('quiz-downloads/', include('quiz_downloads.urls')),
+    path('jobs/', include('jobs.urls')),
 ]
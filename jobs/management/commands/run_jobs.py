@@ -0,0 +1,42 @@
+import os
+import socket
+import time
+import uuid
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from jobs.queue import claim_job, run_job
+
+
+class Command(BaseCommand):
+    help = 'Run background jobs from the database queue. Start several to process jobs in parallel.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exit as soon as the queue has no runnable job')
+        parser.add_argument('--max-jobs', type=int, default=0, help='Exit after this many jobs (0: no limit)')
+        parser.add_argument('--poll-interval', type=float, default=None, help='Seconds to sleep when the queue is empty')
+
+    def handle(self, *args, **options):
+        worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        poll_interval = options['poll_interval'] or settings.JOBS_POLL_INTERVAL
+        processed = 0
+        self.stdout.write(f"Job worker {worker_id} started")
+        try:
+            while not options['max_jobs'] or processed < options['max_jobs']:
+                close_old_connections()
+                job = claim_job(worker_id)
+                if job is None:
+                    if options['once']:
+                        break
+                    time.sleep(poll_interval)
+                    continue
+                start = time.perf_counter()
+                ok = run_job(job)
+                processed += 1
+                status = self.style.SUCCESS('done') if ok else self.style.ERROR(job.status)
+                self.stdout.write(f"{job.kind} #{job.id} {status} in {time.perf_counter() - start:.1f}s")
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(f"Job worker {worker_id} stopped after {processed} job(s)")
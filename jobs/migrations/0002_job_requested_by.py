@@ -0,0 +1,19 @@
+# Generated by Django 5.1.6 on 2026-10-18 20:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0002_user_created_at_user_updated_at'),
+        ('jobs', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='requested_by',
+            field=models.ManyToManyField(blank=True, help_text='Users who asked for this job; only they can poll its status', related_name='jobs', to='authentication.user'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+from authentication.models import User
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+
+class Job(models.Model):
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+    ACTIVE_STATUSES = (STATUS_QUEUED, STATUS_RUNNING)
+
+    # Lower runs first
+    PRIORITY_HIGH = 0
+    PRIORITY_NORMAL = 10
+    PRIORITY_LOW = 20
+
+    kind = models.CharField(max_length=64, help_text="Name of the registered handler that runs this job")
+    key = models.CharField(max_length=255, help_text="Deduplication key: only one queued or running job per key")
+    payload = models.JSONField(default=dict, help_text="Keyword arguments for the handler")
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    priority = models.IntegerField(default=PRIORITY_NORMAL)
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=64, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    result = models.JSONField(null=True, blank=True)
+    requested_by = models.ManyToManyField(User, blank=True, related_name='jobs', help_text="Users who asked for this job; only they can poll its status")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['key'],
+                condition=Q(status__in=['queued', 'running']),
+                name='jobs_job_unique_active_key',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'priority', 'run_after']),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} [{self.status}] {self.key}"
@@ -0,0 +1,152 @@
+import json
+import logging
+import random
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+_handlers = {}
+
+
+class UnknownJobKind(Exception):
+    """Raised when a job's kind has no registered handler."""
+
+
+def register(kind):
+    """
+    Decorator registering fn as the handler of jobs of the given kind.
+
+    The handler is called with the job payload as keyword arguments; its return value, if any,
+    must be JSON-serializable and is stored on the job as its result.
+    """
+    def decorator(fn):
+        _handlers[kind] = fn
+        return fn
+    return decorator
+
+
+def default_key(kind, payload):
+    return f"{kind}:{json.dumps(payload, sort_keys=True, separators=(',', ':'))}"[:255]
+
+
+def enqueue(kind, payload=None, key=None, priority=Job.PRIORITY_NORMAL, run_after=None, max_attempts=None, requested_by=None):
+    """
+    Adds a job to the queue, or returns the job already queued or running under the same key.
+
+    The key defaults to the kind plus the payload, so enqueueing the same work twice is a no-op
+    while the first job is still pending. Uniqueness of active keys is enforced by the database.
+    requested_by (a user ID) is added to the job's requesters either way, so every user who asked
+    for the work can poll it.
+    """
+    job = _enqueue(kind, payload or {}, key, priority, run_after, max_attempts)
+    if requested_by is not None:
+        job.requested_by.add(requested_by)
+    return job
+
+
+def _enqueue(kind, payload, key, priority, run_after, max_attempts):
+    key = key or default_key(kind, payload)
+    try:
+        with transaction.atomic():
+            return Job.objects.create(
+                kind=kind,
+                key=key,
+                payload=payload,
+                priority=priority,
+                run_after=run_after or timezone.now(),
+                max_attempts=max_attempts or settings.JOBS_MAX_ATTEMPTS,
+            )
+    except IntegrityError:
+        existing = Job.objects.filter(key=key, status__in=Job.ACTIVE_STATUSES).first()
+        if existing is None:
+            # The active job finished between our insert and this read: try once more
+            return _enqueue(kind, payload, key, priority, run_after, max_attempts)
+        if priority < existing.priority and existing.status == Job.STATUS_QUEUED:
+            Job.objects.filter(pk=existing.pk, status=Job.STATUS_QUEUED).update(priority=priority)
+            existing.priority = priority
+        return existing
+
+
+def claim_job(worker_id):
+    """
+    Claims the next runnable job for worker_id and marks it running, or returns None.
+
+    Rows are locked with SELECT ... FOR UPDATE SKIP LOCKED, so concurrent workers never claim
+    the same job and never wait on each other. A running job whose worker has held it longer
+    than JOBS_LOCK_TIMEOUT is assumed dead and claimed again, unless that was its last attempt:
+    then it is marked failed.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.JOBS_LOCK_TIMEOUT)
+    Job.objects.filter(
+        status=Job.STATUS_RUNNING, locked_at__lt=stale, attempts__gte=F('max_attempts'),
+    ).update(
+        status=Job.STATUS_FAILED, locked_by='', locked_at=None, updated_at=now,
+        last_error=f"Worker stopped responding on the last attempt (held the job longer than {settings.JOBS_LOCK_TIMEOUT}s)",
+    )
+    with transaction.atomic():
+        job = (
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(status=Job.STATUS_QUEUED, run_after__lte=now)
+                | Q(status=Job.STATUS_RUNNING, locked_at__lt=stale, attempts__lt=F('max_attempts'))
+            )
+            .order_by('priority', 'run_after', 'id')
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = Job.STATUS_RUNNING
+        job.attempts += 1
+        job.locked_by = worker_id
+        job.locked_at = now
+        job.save(update_fields=['status', 'attempts', 'locked_by', 'locked_at', 'updated_at'])
+    return job
+
+
+def retry_delay(attempts):
+    """Exponential backoff with jitter: base * 2^(attempts-1), capped, plus up to 10%."""
+    delay = min(settings.JOBS_RETRY_BASE_SECONDS * 2 ** (attempts - 1), settings.JOBS_RETRY_MAX_SECONDS)
+    return delay + random.uniform(0, delay / 10)
+
+
+def _record_outcome(job, **fields):
+    """
+    Saves a job's outcome only while job.locked_by still holds it. A worker that overran
+    JOBS_LOCK_TIMEOUT may have lost the job to another one; its outcome is then discarded.
+    """
+    fields.update(locked_by='', locked_at=None, updated_at=timezone.now())
+    updated = Job.objects.filter(pk=job.pk, status=Job.STATUS_RUNNING, locked_by=job.locked_by).update(**fields)
+    if not updated:
+        logger.warning(f"Job {job.id} ({job.kind}) was reclaimed by another worker; discarding the outcome of {job.locked_by}")
+    for name, value in fields.items():
+        setattr(job, name, value)
+    return bool(updated)
+
+
+def run_job(job):
+    """Runs a claimed job and records its outcome: done, queued again with backoff, or failed."""
+    try:
+        handler = _handlers.get(job.kind)
+        if handler is None:
+            raise UnknownJobKind(f"No handler registered for job kind '{job.kind}'")
+        result = handler(**job.payload)
+    except Exception as e:
+        logger.error(f"Job {job.id} ({job.kind}) failed on attempt {job.attempts}: {e}")
+        if job.attempts >= job.max_attempts or isinstance(e, UnknownJobKind):
+            _record_outcome(job, status=Job.STATUS_FAILED, last_error=traceback.format_exc())
+        else:
+            _record_outcome(
+                job, status=Job.STATUS_QUEUED, last_error=traceback.format_exc(),
+                run_after=timezone.now() + timedelta(seconds=retry_delay(job.attempts)),
+            )
+        return False
+    return _record_outcome(job, status=Job.STATUS_DONE, result=result)
@@ -0,0 +1,107 @@
+from datetime import timedelta
+
+from authentication.models import User
+from django.test import TestCase
+from django.utils import timezone
+
+from .models import Job
+from .queue import claim_job, enqueue, register, run_job
+
+calls = []
+
+
+@register('test_job')
+def _test_job(fail=False):
+    calls.append(fail)
+    if fail:
+        raise ValueError('boom')
+    return {'ok': True}
+
+
+class QueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_enqueue_deduplicates_active_keys(self):
+        first = enqueue('test_job', {'fail': False})
+        second = enqueue('test_job', {'fail': False}, priority=Job.PRIORITY_HIGH)
+        self.assertEqual(first.id, second.id)
+        self.assertEqual(Job.objects.get(id=first.id).priority, Job.PRIORITY_HIGH)
+
+    def test_claims_by_priority(self):
+        enqueue('test_job', {'fail': False}, key='low', priority=Job.PRIORITY_LOW)
+        high = enqueue('test_job', {'fail': False}, key='high', priority=Job.PRIORITY_HIGH)
+        job = claim_job('worker-1')
+        self.assertEqual(job.id, high.id)
+        self.assertEqual((job.status, job.attempts, job.locked_by), (Job.STATUS_RUNNING, 1, 'worker-1'))
+
+    def test_run_records_result(self):
+        enqueue('test_job', {'fail': False})
+        self.assertTrue(run_job(claim_job('worker-1')))
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.result, job.locked_by), (Job.STATUS_DONE, {'ok': True}, ''))
+
+    def test_failure_is_retried_with_backoff_then_fails(self):
+        enqueue('test_job', {'fail': True}, max_attempts=2)
+        self.assertFalse(run_job(claim_job('worker-1')))
+        job = Job.objects.get()
+        self.assertEqual(job.status, Job.STATUS_QUEUED)
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertIsNone(claim_job('worker-1'))
+
+        Job.objects.update(run_after=timezone.now())
+        self.assertFalse(run_job(claim_job('worker-1')))
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.attempts), (Job.STATUS_FAILED, 2))
+        self.assertIn('boom', job.last_error)
+
+    def test_stale_running_job_is_reclaimed(self):
+        enqueue('test_job', {'fail': False})
+        claim_job('dead-worker')
+        self.assertIsNone(claim_job('worker-2'))
+        with self.settings(JOBS_LOCK_TIMEOUT=0):
+            job = claim_job('worker-2')
+        self.assertEqual((job.locked_by, job.attempts), ('worker-2', 2))
+
+    def test_stale_job_on_its_last_attempt_fails(self):
+        enqueue('test_job', {'fail': False}, max_attempts=1)
+        claim_job('dead-worker')
+        with self.settings(JOBS_LOCK_TIMEOUT=0):
+            self.assertIsNone(claim_job('worker-2'))
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.locked_by), (Job.STATUS_FAILED, ''))
+
+    def test_outcome_of_a_worker_that_lost_the_job_is_discarded(self):
+        enqueue('test_job', {'fail': False})
+        job = claim_job('slow-worker')
+        Job.objects.filter(id=job.id).update(locked_at=timezone.now() - timedelta(hours=1))
+        with self.settings(JOBS_LOCK_TIMEOUT=60):
+            claim_job('worker-2')
+        self.assertFalse(run_job(job))
+        stored = Job.objects.get()
+        self.assertEqual((stored.status, stored.locked_by), (Job.STATUS_RUNNING, 'worker-2'))
+
+
+class JobStatusTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create(name='Ada', email='ada@example.com', password='x')
+        self.other = User.objects.create(name='Bob', email='bob@example.com', password='x')
+        self.job = enqueue('test_job', {'fail': False}, requested_by=self.owner.id)
+
+    def get_status(self, user):
+        session = self.client.session
+        session['user_id'] = user.id
+        session.save()
+        return self.client.get(f'/jobs/{self.job.id}')
+
+    def test_requester_sees_job(self):
+        response = self.get_status(self.owner)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], Job.STATUS_QUEUED)
+
+    def test_other_user_gets_not_found(self):
+        self.assertEqual(self.get_status(self.other).status_code, 404)
+
+    def test_every_requester_of_a_deduplicated_job_sees_it(self):
+        enqueue('test_job', {'fail': False}, requested_by=self.other.id)
+        self.assertEqual(self.get_status(self.other).status_code, 200)
@@ -0,0 +1,22 @@
+from django.http import JsonResponse
+
+from .models import Job
+
+
+def job_status(request, job_id):
+    if request.session.get('user_id') is None:
+        return JsonResponse({
+            'status': 'error',
+            'message': 'User not logged in'
+        }, status=401)
+    # Only users who requested the job may see it
+    job = Job.objects.filter(id=job_id, requested_by=request.session['user_id']).first()
+    if job is None:
+        return JsonResponse({'error': 'Job not found'}, status=404)
+    return JsonResponse({
+        'id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'attempts': job.attempts,
+        'result': job.result,
+    })
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import QuizAttempt, QuestionAttempt
+from .models import QuizAttempt, QuestionAttempt, UserQuizStats
 
 @admin.register(QuizAttempt)
 class QuizAttemptAdmin(admin.ModelAdmin):
@@ -9,4 +9,12 @@ class QuizAttemptAdmin(admin.ModelAdmin):
 @admin.register(QuestionAttempt)
 class QuestionAttemptAdmin(admin.ModelAdmin):
     list_display = ('quiz_attempt', 'question', 'time_taken', 'is_correct', 'is_partial', 'score')
-    readonly_fields = ('is_correct', 'is_partial', 'score')
\ No newline at end of file
+    list_select_related = ('quiz_attempt__user', 'quiz_attempt__topic', 'question')
+    list_filter = ('is_correct', 'is_partial')
+    readonly_fields = ('is_correct', 'is_partial', 'score')
+
+
+@admin.register(UserQuizStats)
+class UserQuizStatsAdmin(admin.ModelAdmin):
+    list_display = ('user', 'total_quizzes', 'total_percentage', 'total_time_spent', 'updated_at')
+    readonly_fields = ('updated_at',)
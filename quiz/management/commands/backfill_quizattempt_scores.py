@@ -1,15 +1,58 @@
 from django.core.management.base import BaseCommand
-from quiz.models import QuizAttempt
+from django.db.models import F, Sum, Value
+from django.db.models.functions import Coalesce
+from quiz.models import QuestionAttempt, QuizAttempt
+
+BATCH_SIZE = 1000
 
 class Command(BaseCommand):
     help = 'Backfill the score field for all existing QuizAttempts based on their QuestionAttempts.'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--rescore', action='store_true',
+                            help='First recompute the stored correctness and score of every QuestionAttempt (e.g. after questions were edited)')
+
     def handle(self, *args, **options):
+        if options['rescore']:
+            rescored = self.rescore_question_attempts()
+            self.stdout.write(self.style.SUCCESS(f'Rescored {rescored} QuestionAttempt(s).'))
+
+        # Question attempt scores are stored columns, so the totals are summed by the database
+        stale = (
+            QuizAttempt.objects
+            .annotate(total_score=Coalesce(Sum('question_attempts__score'), Value(0)))
+            .exclude(score=F('total_score'))
+            .only('id', 'score')
+        )
         updated = 0
-        for attempt in QuizAttempt.objects.all():
-            total_score = sum(q.score for q in attempt.question_attempts.all())
-            if attempt.score != total_score:
-                attempt.score = total_score
-                attempt.save(update_fields=["score"])
-                updated += 1
+        batch = []
+        for attempt in stale.iterator(chunk_size=BATCH_SIZE):
+            attempt.score = attempt.total_score
+            batch.append(attempt)
+            if len(batch) >= BATCH_SIZE:
+                updated += QuizAttempt.objects.bulk_update(batch, ['score'])
+                batch = []
+        updated += QuizAttempt.objects.bulk_update(batch, ['score'])
         self.stdout.write(self.style.SUCCESS(f'Backfilled scores for {updated} QuizAttempt(s).'))
+
+    def rescore_question_attempts(self):
+        """Scores question attempts in primary-key batches, one vectorized batch each; returns how many changed."""
+        rescored = 0
+        last_id = 0
+        while True:
+            batch = list(
+                QuestionAttempt.objects.filter(id__gt=last_id).order_by('id')
+                .select_related('question', 'quiz_attempt')
+                .only(
+                    'id', 'attempted_options', 'is_correct', 'is_partial', 'score',
+                    'question__question_type', 'question__correct_answers', 'quiz_attempt__is_negative_marking',
+                )[:BATCH_SIZE]
+            )
+            if not batch:
+                break
+            stored = [(qa.is_correct, qa.is_partial, qa.score) for qa in batch]
+            QuestionAttempt.apply_scoring_batch(batch)
+            changed = [qa for qa, before in zip(batch, stored) if (qa.is_correct, qa.is_partial, qa.score) != before]
+            rescored += QuestionAttempt.objects.bulk_update(changed, ['is_correct', 'is_partial', 'score'])
+            last_id = batch[-1].id
+        return rescored
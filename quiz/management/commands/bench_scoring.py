@@ -0,0 +1,76 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from quiz.scoring import MULTIPLE_CORRECT, SINGLE_ANSWER, score_answer, score_answers, score_batch
+
+_OPTIONS = 'abcd'
+
+
+def _synthetic_answers(rng, n):
+    """Encoded answers to 4-option questions: a third multiple-correct, about 10% unanswered."""
+    types = np.where(rng.random(n) < 1 / 3, MULTIPLE_CORRECT, SINGLE_ANSWER).astype(np.uint8)
+    single_bit = np.left_shift(np.uint64(1), rng.integers(0, 4, n).astype(np.uint64))
+    correct = np.where(types == MULTIPLE_CORRECT, rng.integers(1, 16, n).astype(np.uint64), single_bit)
+    attempted_single = np.left_shift(np.uint64(1), rng.integers(0, 4, n).astype(np.uint64))
+    attempted = np.where(types == MULTIPLE_CORRECT, rng.integers(1, 16, n).astype(np.uint64), attempted_single)
+    attempted = np.where(rng.random(n) < 0.1, np.uint64(0), attempted)
+    negative = rng.random(n) < 0.5
+    return types, correct, attempted, negative
+
+
+def _decode(mask):
+    return [option for bit, option in enumerate(_OPTIONS) if int(mask) >> bit & 1]
+
+
+class Command(BaseCommand):
+    help = ('Measure quiz scoring throughput: one vectorized batch over synthetic attempts vs. scoring '
+            'the same answers one by one, and check that both agree.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--attempts', type=int, default=1_000_000, help='Answers scored by the vectorized batch')
+        parser.add_argument('--sample', type=int, default=20_000, help='Answers scored one by one (timed, then extrapolated)')
+        parser.add_argument('--seed', type=int, default=7)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options['seed'])
+        n = options['attempts']
+        types, correct, attempted, negative = _synthetic_answers(rng, n)
+
+        start = time.perf_counter()
+        is_correct, is_partial, scores = score_batch(types, correct, attempted, negative)
+        batch_time = time.perf_counter() - start
+
+        # The same answers as stored (option lists), for the paths that encode them first
+        sample = min(options['sample'], n)
+        answers = [
+            ('multiple-correct' if types[i] == MULTIPLE_CORRECT else 'mcq', _decode(correct[i]), _decode(attempted[i]), bool(negative[i]))
+            for i in range(sample)
+        ]
+        start = time.perf_counter()
+        encoded = score_answers(answers)
+        encoded_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        one_by_one = [score_answer(*answer) for answer in answers]
+        one_by_one_time = time.perf_counter() - start
+
+        mismatches = sum(
+            1 for i, result in enumerate(one_by_one)
+            if result != (bool(is_correct[i]), bool(is_partial[i]), int(scores[i]))
+            or result != (bool(encoded[0][i]), bool(encoded[1][i]), int(encoded[2][i]))
+        )
+
+        self.stdout.write(f"{'path':<28}{'answers':>10}{'seconds':>10}{'ns/answer':>11}{'per 1M s':>10}")
+        for path, rows, seconds in (
+            ('score_batch (encoded)', n, batch_time),
+            ('score_answers (encode+batch)', sample, encoded_time),
+            ('score_answer one by one', sample, one_by_one_time),
+        ):
+            self.stdout.write(f"{path:<28}{rows:>10}{seconds:>10.3f}{seconds / rows * 1e9:>11.0f}{seconds / rows * 1e6:>10.2f}")
+        self.stdout.write(
+            f"score distribution: { {int(score): int(count) for score, count in zip(*np.unique(scores, return_counts=True))} }, "
+            f"{int(is_correct.sum())} correct, {int(is_partial.sum())} partial"
+        )
+        style = self.style.SUCCESS if not mismatches else self.style.ERROR
+        self.stdout.write(style(f"{mismatches} mismatch(es) between batch and one-by-one scoring on {sample} answers."))
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+from quiz.models import QuizAttempt
+from quiz.stats import compute_quiz_stats, materialized_quiz_stats, rebuild_user_quiz_stats
+
+
+def _differences(expected, actual, path=''):
+    """
+    Paths where two stats payloads differ. Floats may differ by one cent: percentages are rounded
+    to 2 decimals by Python when a quiz is saved but by the database when stats are recomputed.
+    """
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        if expected.keys() != actual.keys():
+            return [path or '/']
+        return [d for key in expected for d in _differences(expected[key], actual[key], f"{path}/{key}")]
+    if isinstance(expected, list) and isinstance(actual, list):
+        if len(expected) != len(actual):
+            return [path]
+        return [d for i, (e, a) in enumerate(zip(expected, actual)) for d in _differences(e, a, f"{path}/{i}")]
+    if isinstance(expected, float) or isinstance(actual, float):
+        return [] if abs(expected - actual) <= 0.01 + 1e-9 else [path]
+    return [] if expected == actual else [path]
+
+
+class Command(BaseCommand):
+    help = ('Rebuild the materialized per-user quiz statistics from the quiz attempts. '
+            'With --check, compare them against a full recomputation instead of rebuilding.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', help='Only this user id (repeatable)')
+        parser.add_argument('--check', action='store_true', help='Report users whose stats differ, without rebuilding')
+
+    def handle(self, *args, **options):
+        user_ids = options['user'] or list(QuizAttempt.objects.values_list('user_id', flat=True).distinct().order_by('user_id'))
+        mismatched = 0
+        for user_id in user_ids:
+            if not options['check']:
+                rebuild_user_quiz_stats(user_id)
+                continue
+            differences = _differences(compute_quiz_stats(user_id), materialized_quiz_stats(user_id))
+            if differences:
+                mismatched += 1
+                self.stdout.write(self.style.WARNING(f"User {user_id}: {', '.join(differences[:5])}"))
+        if options['check']:
+            style = self.style.SUCCESS if not mismatched else self.style.ERROR
+            self.stdout.write(style(f'{mismatched} of {len(user_ids)} user(s) with stale quiz stats.'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt quiz stats for {len(user_ids)} user(s).'))
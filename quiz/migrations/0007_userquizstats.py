@@ -0,0 +1,60 @@
+# Generated by Django 5.1.6 on 2026-10-18 19:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0002_user_created_at_user_updated_at'),
+        ('quiz', '0006_alter_quizattempt_score'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserQuizStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_quizzes', models.IntegerField(default=0)),
+                ('total_percentage', models.FloatField(default=0, help_text='Sum of the per-quiz score percentages')),
+                ('total_time_spent', models.IntegerField(default=0, help_text='Total time spent in seconds')),
+                ('score_distribution', models.JSONField(default=list, help_text="[{'range': '0-9', 'count': n}, ...] in first-seen order")),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='quiz_stats', to='authentication.user')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='UserQuestionTypeQuizStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('question_type', models.CharField(max_length=20)),
+                ('quizzes', models.IntegerField(default=0)),
+                ('total_questions', models.IntegerField(default=0)),
+                ('correct_answers', models.IntegerField(default=0)),
+                ('total_time', models.IntegerField(default=0, help_text='Total time spent in seconds')),
+                ('first_quiz_at', models.DateTimeField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='question_type_quiz_stats', to='authentication.user')),
+            ],
+            options={
+                'ordering': ['first_quiz_at', 'id'],
+                'unique_together': {('user', 'question_type')},
+            },
+        ),
+        migrations.CreateModel(
+            name='UserTopicQuizStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quizzes', models.IntegerField(default=0)),
+                ('total_score', models.IntegerField(default=0)),
+                ('question_types', models.JSONField(default=dict, help_text='Number of quizzes per question type')),
+                ('first_quiz_at', models.DateTimeField()),
+                ('topic', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='user_quiz_stats', to='search_app.topic')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='topic_quiz_stats', to='authentication.user')),
+            ],
+            options={
+                'ordering': ['first_quiz_at', 'id'],
+                'unique_together': {('user', 'topic')},
+            },
+        ),
+    ]
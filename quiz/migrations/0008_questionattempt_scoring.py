@@ -0,0 +1,28 @@
+# Generated by Django 5.1.6 on 2026-10-18 19:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0007_userquizstats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='questionattempt',
+            name='is_correct',
+            field=models.BooleanField(db_index=True, default=False, help_text='Whether the answer is completely correct'),
+        ),
+        migrations.AddField(
+            model_name='questionattempt',
+            name='is_partial',
+            field=models.BooleanField(db_index=True, default=False, help_text='Whether the answer is partially correct (multiple correct only)'),
+        ),
+        migrations.AddField(
+            model_name='questionattempt',
+            name='score',
+            field=models.IntegerField(db_index=True, default=0, help_text='Score of this answer, negative marking included'),
+        ),
+    ]
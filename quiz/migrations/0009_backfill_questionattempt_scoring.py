@@ -0,0 +1,43 @@
+from django.db import migrations
+
+from quiz.scoring import score_answer
+
+BATCH_SIZE = 1000
+
+
+def backfill_scoring(apps, schema_editor):
+    """Computes is_correct, is_partial and score of existing question attempts in primary-key chunks."""
+    QuestionAttempt = apps.get_model('quiz', 'QuestionAttempt')
+
+    last_id = 0
+    while True:
+        batch = list(
+            QuestionAttempt.objects.filter(id__gt=last_id).order_by('id')
+            .select_related('question', 'quiz_attempt')
+            .only(
+                'id', 'attempted_options', 'question__question_type', 'question__correct_answers',
+                'quiz_attempt__is_negative_marking',
+            )[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        for q_attempt in batch:
+            q_attempt.is_correct, q_attempt.is_partial, q_attempt.score = score_answer(
+                q_attempt.question.question_type,
+                q_attempt.question.correct_answers,
+                q_attempt.attempted_options,
+                q_attempt.quiz_attempt.is_negative_marking,
+            )
+        QuestionAttempt.objects.bulk_update(batch, ['is_correct', 'is_partial', 'score'])
+        last_id = batch[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0008_questionattempt_scoring'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_scoring, migrations.RunPython.noop),
+    ]
@@ -3,6 +3,8 @@ from authentication.models import User
 from search_app.models import QuizQuestion, Topic
 from django.utils import timezone
 
+from .scoring import score_answer, score_answers
+
 # Create your models here.
 class QuizAttempt(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -50,69 +52,86 @@ class QuestionAttempt(models.Model):
     question = models.ForeignKey(QuizQuestion, on_delete=models.CASCADE)
     time_taken = models.IntegerField(help_text="Time taken for this question in seconds")
     attempted_options = models.JSONField(help_text="Options selected by the user")
+    is_correct = models.BooleanField(default=False, db_index=True, help_text="Whether the answer is completely correct")
+    is_partial = models.BooleanField(default=False, db_index=True, help_text="Whether the answer is partially correct (multiple correct only)")
+    score = models.IntegerField(default=0, db_index=True, help_text="Score of this answer, negative marking included")
 
-    @property
-    def is_correct(self):
-        """Check if the attempt is completely correct"""
-        if not self.attempted_options:
-            return False
-        
-        if self.question.question_type == 'multiple-correct':
-            # For multiple correct, all correct options must be selected and no incorrect options
-            correct_options = set(self.question.correct_answers)
-            attempted = set(self.attempted_options)
-            return correct_options == attempted
-        else:
-            # For MCQ and True/False, check if the selected option matches the correct answer
-            return self.attempted_options == self.question.correct_answers
+    def apply_scoring(self, question=None, is_negative_marking=None):
+        """Computes is_correct, is_partial and score from the question and the selected options."""
+        question = question or self.question
+        if is_negative_marking is None:
+            is_negative_marking = self.quiz_attempt.is_negative_marking
+        self.is_correct, self.is_partial, self.score = score_answer(
+            question.question_type, question.correct_answers, self.attempted_options, is_negative_marking
+        )
 
-    @property
-    def is_partial(self):
-        """Check if the attempt is partially correct (only for multiple correct type)"""
-        if self.question.question_type != 'multiple-correct' or not self.attempted_options:
-            return False
-        
-        correct_options = set(self.question.correct_answers)
-        attempted = set(self.attempted_options)
-        
-        # Check if at least one correct option is selected and no incorrect options
-        return bool(correct_options.intersection(attempted)) and not (attempted - correct_options)
+    @classmethod
+    def apply_scoring_batch(cls, question_attempts):
+        """
+        apply_scoring for many question attempts in one vectorized batch.
 
-    @property
-    def score(self):
-        """Calculate score for this question attempt based on question type and negative marking"""
-        if not self.attempted_options:
-            return 0
+        Each attempt's question and quiz_attempt must already be loaded (or assigned).
+        """
+        question_attempts = list(question_attempts)
+        is_correct, is_partial, scores = score_answers([
+            (qa.question.question_type, qa.question.correct_answers, qa.attempted_options, qa.quiz_attempt.is_negative_marking)
+            for qa in question_attempts
+        ])
+        for qa, correct, partial, score in zip(question_attempts, is_correct, is_partial, scores):
+            qa.is_correct, qa.is_partial, qa.score = bool(correct), bool(partial), int(score)
+        return question_attempts
 
-        if self.question.question_type == 'multiple-correct':
-            correct_options = set(self.question.correct_answers)
-            attempted = set(self.attempted_options)
-            
-            # Check for incorrect selections
-            incorrect_selections = len(attempted - correct_options)
-            
-            # If any incorrect option is selected, return -2
-            if self.quiz_attempt.is_negative_marking and incorrect_selections > 0:
-                return -2
-            if incorrect_selections > 0:
-                return 0
-            
-            # Count correct selections
-            correct_selections = len(correct_options.intersection(attempted))
-            
-            # If all correct options are selected, return 4
-            if correct_selections == len(correct_options):
-                return 4
-            
-            # Otherwise, return 1 point per correct option
-            return correct_selections
-        else:
-            # For MCQ and True/False
-            if self.is_correct:
-                return 4
-            elif self.quiz_attempt.is_negative_marking:
-                return -1  # -1 mark for incorrect answer
-            return 0
+    def save(self, *args, **kwargs):
+        # Scores are computed once at write time; readers never need the question row for them
+        self.apply_scoring()
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"Attempt for question {self.question.id} in quiz attempt {self.quiz_attempt.id}"
+
+
+# --- Materialized profile statistics, maintained by quiz.stats ---
+class UserQuizStats(models.Model):
+    """Running totals of a user's quizzes, updated whenever a quiz attempt is saved."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='quiz_stats')
+    total_quizzes = models.IntegerField(default=0)
+    total_percentage = models.FloatField(default=0, help_text="Sum of the per-quiz score percentages")
+    total_time_spent = models.IntegerField(default=0, help_text="Total time spent in seconds")
+    score_distribution = models.JSONField(default=list, help_text="[{'range': '0-9', 'count': n}, ...] in first-seen order")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Quiz stats of {self.user_id}"
+
+
+class UserTopicQuizStats(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='topic_quiz_stats')
+    topic = models.ForeignKey(Topic, on_delete=models.CASCADE, related_name='user_quiz_stats')
+    quizzes = models.IntegerField(default=0)
+    total_score = models.IntegerField(default=0)
+    question_types = models.JSONField(default=dict, help_text="Number of quizzes per question type")
+    first_quiz_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('user', 'topic')
+        ordering = ['first_quiz_at', 'id']
+
+    def __str__(self):
+        return f"Quiz stats of {self.user_id} on {self.topic_id}"
+
+
+class UserQuestionTypeQuizStats(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='question_type_quiz_stats')
+    question_type = models.CharField(max_length=20)
+    quizzes = models.IntegerField(default=0)
+    total_questions = models.IntegerField(default=0)
+    correct_answers = models.IntegerField(default=0)
+    total_time = models.IntegerField(default=0, help_text="Total time spent in seconds")
+    first_quiz_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('user', 'question_type')
+        ordering = ['first_quiz_at', 'id']
 
     def __str__(self):
-        return f"Attempt for question {self.question.id} in quiz attempt {self.quiz_attempt.id}"
\ No newline at end of file
+        return f"{self.question_type} stats of {self.user_id}"
@@ -0,0 +1,126 @@
+import numpy as np
+
+# Scoring rules of quiz answers, kept free of database access so they can run at write time,
+# in migrations and over whole batches. Answers are encoded as bitmasks (one bit per option) and
+# scored with NumPy bit operations; scoring a single answer is a batch of one.
+
+MCQ_CORRECT_SCORE = 4
+MCQ_NEGATIVE_SCORE = -1
+MULTIPLE_CORRECT_NEGATIVE_SCORE = -2
+
+# Question type codes of the batch arrays
+SINGLE_ANSWER = 0  # mcq and true-false
+MULTIPLE_CORRECT = 1
+
+# Bit shared by all selected options that are not correct answers; the bits below it are for correct answers
+WRONG_OPTION_BIT = 63
+MAX_CORRECT_ANSWERS = WRONG_OPTION_BIT
+
+
+def question_type_code(question_type):
+    return MULTIPLE_CORRECT if question_type == 'multiple-correct' else SINGLE_ANSWER
+
+
+def encode_answer(correct_answers, attempted_options):
+    """
+    Encodes the correct answers and the selected options of one question as bitmasks.
+
+    Each distinct correct answer gets one bit, in order of first appearance, so comparing
+    option sets becomes integer bit operations. Scoring only needs to know whether a wrong
+    option was selected, not which one, so every selected option that is not a correct answer
+    shares the top bit. This keeps the masks within uint64 whatever the client sends.
+
+    Returns:
+        (correct_mask, attempted_mask)
+
+    Raises:
+        ValueError: when a question has more than MAX_CORRECT_ANSWERS distinct correct answers
+    """
+    bits = {}
+    for option in correct_answers or ():
+        bits.setdefault(option, len(bits))
+    if len(bits) > MAX_CORRECT_ANSWERS:
+        raise ValueError(f"A question can have at most {MAX_CORRECT_ANSWERS} correct answers, got {len(bits)}")
+
+    correct_mask = 0
+    for bit in bits.values():
+        correct_mask |= 1 << bit
+    attempted_mask = 0
+    for option in attempted_options or ():
+        attempted_mask |= 1 << bits.get(option, WRONG_OPTION_BIT)
+    return correct_mask, attempted_mask
+
+
+def score_batch(question_types, correct_masks, attempted_masks, negative_marking):
+    """
+    Scores a batch of encoded answers at once.
+
+    mcq and true-false: +4 when the selected options equal the correct answers, otherwise 0
+    (-1 with negative marking). multiple-correct: +4 when exactly the correct options are
+    selected, 1 per correct option when only some are, and 0 when any wrong option is
+    selected (-2 with negative marking). An unanswered question scores 0.
+
+    Args:
+        question_types: type codes (SINGLE_ANSWER or MULTIPLE_CORRECT)
+        correct_masks, attempted_masks: bitmasks from encode_answer
+        negative_marking: whether negative marking applies to each answer
+
+    Returns:
+        (is_correct, is_partial, score) arrays: two bool arrays and an int8 array
+    """
+    multiple = np.asarray(question_types) == MULTIPLE_CORRECT
+    correct = np.asarray(correct_masks, dtype=np.uint64)
+    attempted = np.asarray(attempted_masks, dtype=np.uint64)
+    negative = np.asarray(negative_marking, dtype=bool)
+
+    answered = attempted != 0
+    hits = attempted & correct
+    wrong = (attempted & ~correct) != 0
+    is_correct = answered & (attempted == correct)
+    # At least one correct option is selected and no incorrect options
+    is_partial = multiple & (hits != 0) & ~wrong
+
+    single_score = np.where(is_correct, MCQ_CORRECT_SCORE, np.where(negative, MCQ_NEGATIVE_SCORE, 0))
+    multiple_score = np.where(
+        wrong,
+        np.where(negative, MULTIPLE_CORRECT_NEGATIVE_SCORE, 0),
+        np.where(hits == correct, MCQ_CORRECT_SCORE, np.bitwise_count(hits)),
+    )
+    score = np.where(answered, np.where(multiple, multiple_score, single_score), 0).astype(np.int8)
+    return is_correct, is_partial, score
+
+
+def score_answers(answers):
+    """
+    Scores many answered questions in one batch.
+
+    Args:
+        answers: sequence of (question_type, correct_answers, attempted_options, is_negative_marking)
+
+    Returns:
+        (is_correct, is_partial, score) arrays, see score_batch
+    """
+    types, correct_masks, attempted_masks, negative_marking = [], [], [], []
+    for question_type, correct_answers, attempted_options, is_negative_marking in answers:
+        correct_mask, attempted_mask = encode_answer(correct_answers, attempted_options)
+        types.append(question_type_code(question_type))
+        correct_masks.append(correct_mask)
+        attempted_masks.append(attempted_mask)
+        negative_marking.append(bool(is_negative_marking))
+    return score_batch(
+        np.array(types, dtype=np.uint8),
+        np.array(correct_masks, dtype=np.uint64),
+        np.array(attempted_masks, dtype=np.uint64),
+        np.array(negative_marking, dtype=bool),
+    )
+
+
+def score_answer(question_type, correct_answers, attempted_options, is_negative_marking=False):
+    """
+    Scores one answered question, under the rules of score_batch.
+
+    Returns:
+        (is_correct, is_partial, score)
+    """
+    is_correct, is_partial, score = score_answers([(question_type, correct_answers, attempted_options, is_negative_marking)])
+    return bool(is_correct[0]), bool(is_partial[0]), int(score[0])
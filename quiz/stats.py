@@ -0,0 +1,318 @@
+from django.db import transaction
+from django.db.models import (
+    Avg, Case, Count, Exists, F, FloatField, Min, OuterRef, Q, RowRange, Subquery, Sum, Value, When, Window,
+)
+from django.db.models.functions import Cast, Coalesce, Floor, Round
+from authentication.models import User
+from search_app.models import Topic
+
+from .models import QuestionAttempt, QuizAttempt, UserQuestionTypeQuizStats, UserQuizStats, UserTopicQuizStats
+
+# Question types counted per topic in topicStats
+QUESTION_TYPES = ('mcq', 'multiple-correct', 'true-false')
+
+
+def _percentage(total_score, total_possible_score):
+    return round((total_score / total_possible_score) * 100, 2) if total_possible_score > 0 else 0
+
+
+def _minutes(seconds):
+    return seconds / 60 if seconds else 0
+
+
+def _score_range(total_score):
+    rng = int(total_score // 10) * 10
+    return f"{rng}-{rng+9}"
+
+
+def summarize_quiz_attempt(attempt, question_attempts):
+    """
+    The per-quiz figures the profile statistics are built from.
+
+    The quiz's question type is that of its first question. Returns None for a quiz without
+    question attempts, which the statistics skip.
+    """
+    if not question_attempts:
+        return None
+    first_question = question_attempts[0].question
+    total_score = sum(q_attempt.score for q_attempt in question_attempts)
+    return {
+        'question_type': first_question.question_type if first_question else '',
+        'total_score': total_score,
+        'correct_answers': sum(1 for q_attempt in question_attempts if q_attempt.is_correct),
+        'questions': len(question_attempts),
+        'percentage': _percentage(total_score, attempt.total_possible_score),
+        'time': attempt.total_time_taken,
+        'created_at': attempt.created_at,
+    }
+
+
+def _apply(summary, stats, topic_row, type_row):
+    stats.total_quizzes += 1
+    stats.total_percentage += summary['percentage']
+    stats.total_time_spent += summary['time']
+    score_range = _score_range(summary['total_score'])
+    for entry in stats.score_distribution:
+        if entry['range'] == score_range:
+            entry['count'] += 1
+            break
+    else:
+        stats.score_distribution.append({'range': score_range, 'count': 1})
+
+    topic_row.quizzes += 1
+    topic_row.total_score += summary['total_score']
+    if summary['question_type'] in QUESTION_TYPES:
+        topic_row.question_types[summary['question_type']] = topic_row.question_types.get(summary['question_type'], 0) + 1
+
+    type_row.quizzes += 1
+    type_row.total_questions += summary['questions']
+    type_row.correct_answers += summary['correct_answers']
+    type_row.total_time += summary['time']
+
+
+def record_quiz_attempt(attempt, summary):
+    """
+    Adds one saved quiz to its user's materialized statistics.
+
+    Call it inside the transaction that saved the attempt. The user row is locked so
+    concurrent saves by the same user are applied one after the other. A user without a stats
+    row yet (quizzes saved before the statistics tables existed) is rebuilt from all of their
+    attempts, this one included, instead of starting from zero.
+    """
+    if summary is None:
+        return
+    User.objects.select_for_update().filter(id=attempt.user_id).first()
+    stats = UserQuizStats.objects.filter(user_id=attempt.user_id).first()
+    if stats is None:
+        rebuild_user_quiz_stats(attempt.user_id)
+        return
+    topic_row = (
+        UserTopicQuizStats.objects.filter(user_id=attempt.user_id, topic_id=attempt.topic_id).first()
+        or UserTopicQuizStats(user_id=attempt.user_id, topic_id=attempt.topic_id, first_quiz_at=summary['created_at'])
+    )
+    type_row = (
+        UserQuestionTypeQuizStats.objects.filter(user_id=attempt.user_id, question_type=summary['question_type']).first()
+        or UserQuestionTypeQuizStats(user_id=attempt.user_id, question_type=summary['question_type'], first_quiz_at=summary['created_at'])
+    )
+    _apply(summary, stats, topic_row, type_row)
+    stats.save()
+    topic_row.save()
+    type_row.save()
+
+
+def _count(queryset):
+    """Correlated subquery counting the rows of queryset (0 when there are none)."""
+    return Coalesce(Subquery(queryset.values('quiz_attempt').annotate(n=Count('pk')).values('n')[:1]), 0)
+
+
+def _total_possible_score():
+    return (F('correct_attempts') + F('incorrect_attempts') + F('partial_attempts') + F('unattempted')) * 4
+
+
+def scored_quiz_attempts(user_id):
+    """
+    The user's quizzes that count in the statistics (those with question attempts), annotated
+    in SQL with the quiz's question type (that of its first question), its number of
+    questions and correct answers, and its score percentage.
+    """
+    question_attempts = QuestionAttempt.objects.filter(quiz_attempt=OuterRef('pk'))
+    return (
+        QuizAttempt.objects
+        .filter(user_id=user_id)
+        .filter(Exists(question_attempts))
+        .alias(total_possible=_total_possible_score())
+        .annotate(
+            quiz_type=Subquery(question_attempts.order_by('pk').values('question__question_type')[:1]),
+            questions=_count(question_attempts),
+            correct=_count(question_attempts.filter(is_correct=True)),
+            percentage=Case(
+                When(Q(total_possible__gt=0), then=Round(Cast('score', FloatField()) * 100 / F('total_possible'), 2)),
+                default=Value(0.0),
+                output_field=FloatField(),
+            ),
+        )
+    )
+
+
+def aggregate_quiz_stats_rows(user_id):
+    """
+    Computes a user's statistics rows from scratch with a few GROUP BY queries.
+
+    Nothing per question is loaded: each query returns one row per user, topic, question type
+    or score range. Returns unsaved (UserQuizStats, [UserTopicQuizStats], [UserQuestionTypeQuizStats]).
+    """
+    attempts = scored_quiz_attempts(user_id)
+    totals = attempts.aggregate(
+        total_quizzes=Count('pk'),
+        total_percentage=Coalesce(Sum('percentage'), Value(0.0)),
+        total_time_spent=Coalesce(Sum('total_time_taken'), 0),
+    )
+    buckets = (
+        attempts
+        .annotate(bucket=Floor(Cast('score', FloatField()) / 10))
+        .values('bucket')
+        .annotate(count=Count('pk'), first_quiz_at=Min('created_at'))
+        .order_by('first_quiz_at')
+    )
+    stats = UserQuizStats(
+        user_id=user_id,
+        score_distribution=[{'range': _score_range(row['bucket'] * 10), 'count': row['count']} for row in buckets],
+        **totals,
+    )
+
+    type_counts = {qtype: Count('pk', filter=Q(quiz_type=qtype)) for qtype in QUESTION_TYPES}
+    topics = (
+        attempts
+        .values('topic_id', 'topic__name')
+        .annotate(quizzes=Count('pk'), total_score=Sum('score'), first_quiz_at=Min('created_at'), **{
+            f'type_{i}': count for i, count in enumerate(type_counts.values())
+        })
+        .order_by('first_quiz_at')
+    )
+    topic_rows = [
+        UserTopicQuizStats(
+            user_id=user_id,
+            topic=Topic(id=row['topic_id'], name=row['topic__name']),
+            quizzes=row['quizzes'],
+            total_score=row['total_score'],
+            question_types={qtype: row[f'type_{i}'] for i, qtype in enumerate(QUESTION_TYPES) if row[f'type_{i}']},
+            first_quiz_at=row['first_quiz_at'],
+        )
+        for row in topics
+    ]
+
+    types = (
+        attempts
+        .values('quiz_type')
+        .annotate(
+            quizzes=Count('pk'),
+            total_questions=Sum('questions'),
+            correct_answers=Sum('correct'),
+            total_time=Sum('total_time_taken'),
+            first_quiz_at=Min('created_at'),
+        )
+        .order_by('first_quiz_at')
+    )
+    type_rows = [
+        UserQuestionTypeQuizStats(
+            user_id=user_id,
+            question_type=row['quiz_type'],
+            quizzes=row['quizzes'],
+            total_questions=row['total_questions'],
+            correct_answers=row['correct_answers'],
+            total_time=row['total_time'],
+            first_quiz_at=row['first_quiz_at'],
+        )
+        for row in types
+    ]
+    return stats, topic_rows, type_rows
+
+
+def rebuild_user_quiz_stats(user_id):
+    """Recomputes a user's materialized statistics from all of their quiz attempts."""
+    with transaction.atomic():
+        # Serializes with record_quiz_attempt for the same user
+        User.objects.select_for_update().filter(id=user_id).first()
+        stats, topic_rows, type_rows = aggregate_quiz_stats_rows(user_id)
+        UserQuizStats.objects.filter(user_id=user_id).delete()
+        UserTopicQuizStats.objects.filter(user_id=user_id).delete()
+        UserQuestionTypeQuizStats.objects.filter(user_id=user_id).delete()
+        stats.save()
+        UserTopicQuizStats.objects.bulk_create(topic_rows)
+        UserQuestionTypeQuizStats.objects.bulk_create(type_rows)
+    return stats
+
+
+def _quiz_history(user_id):
+    """
+    timeAnalysis and scoreProgression: one entry per quiz, oldest first.
+
+    Only a handful of QuizAttempt columns are read, and the cumulative average is a window
+    function over the scores so far.
+    """
+    time_analysis = []
+    score_progression = []
+    attempts = (
+        QuizAttempt.objects
+        .filter(user_id=user_id)
+        .filter(Exists(QuestionAttempt.objects.filter(quiz_attempt=OuterRef('pk'))))
+        .annotate(
+            total_possible=_total_possible_score(),
+            cumulative_avg=Window(
+                Avg('score', output_field=FloatField()),
+                order_by=[F('created_at').asc(), F('id').asc()],
+                frame=RowRange(start=None, end=0),
+            ),
+        )
+        .order_by('created_at', 'id')
+        .values_list('topic__name', 'created_at', 'total_time_taken', 'score', 'total_possible', 'cumulative_avg')
+    )
+    for topic_name, created_at, time_taken, score, total_possible, cumulative_avg in attempts.iterator():
+        time_analysis.append({
+            'topic': topic_name,
+            'timeInMinutes': _minutes(time_taken),
+            'score': _percentage(score, total_possible)
+        })
+        score_progression.append({
+            'date': created_at.strftime('%Y-%m-%d'),
+            'score': score,
+            'topic': topic_name,
+            'cumulativeAvg': cumulative_avg
+        })
+    return time_analysis, score_progression
+
+
+def _stats_payload(user_id, stats, topic_rows, type_rows):
+    time_analysis, score_progression = _quiz_history(user_id)
+    return {
+        'topicStats': [
+            {
+                'name': row.topic.name,
+                'quizzes': row.quizzes,
+                'avgScore': round(row.total_score / row.quizzes),
+                'totalScore': row.total_score,
+                'questionTypes': {qtype: row.question_types.get(qtype, 0) for qtype in QUESTION_TYPES}
+            }
+            for row in topic_rows
+        ],
+        'questionTypeData': [{'name': row.question_type, 'value': row.quizzes} for row in type_rows],
+        'scoreDistributionData': stats.score_distribution,
+        'timeAnalysis': time_analysis,
+        'performanceByQuestionTypeData': [
+            {
+                'type': row.question_type,
+                'accuracy': (row.correct_answers / row.total_questions) * 100 if row.total_questions > 0 else 0,
+                'avgTime': (row.total_time / row.quizzes) / 60 if row.quizzes > 0 else 0
+            }
+            for row in type_rows
+        ],
+        'scoreProgression': score_progression,
+        'averageScore': round(stats.total_percentage / stats.total_quizzes, 2) if stats.total_quizzes > 0 else None,
+        'totalQuizzes': stats.total_quizzes,
+        'totalTopics': len(topic_rows),
+        'totalTimeSpent': stats.total_time_spent
+    }
+
+
+def materialized_quiz_stats(user_id):
+    """
+    The profile statistics of a user, read from the materialized rows.
+
+    Aggregates come from one stats row plus one row per topic and per question type.
+    A user without a stats row (attempts saved before it existed) is rebuilt first.
+    """
+    stats = UserQuizStats.objects.filter(user_id=user_id).first()
+    if stats is None:
+        stats = rebuild_user_quiz_stats(user_id)
+    topic_rows = list(UserTopicQuizStats.objects.filter(user_id=user_id).select_related('topic'))
+    type_rows = list(UserQuestionTypeQuizStats.objects.filter(user_id=user_id))
+    return _stats_payload(user_id, stats, topic_rows, type_rows)
+
+
+def compute_quiz_stats(user_id):
+    """
+    The profile statistics of a user, computed from scratch in the database.
+
+    This is what the materialized statistics are checked against (manage.py rebuild_quiz_stats --check).
+    """
+    return _stats_payload(user_id, *aggregate_quiz_stats_rows(user_id))
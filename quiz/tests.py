@@ -1,3 +1,179 @@
-from django.test import TestCase
+import json
 
-# Create your tests here.
+from django.test import SimpleTestCase, TestCase
+from authentication.models import User
+from search_app.models import QuizQuestion, Topic
+
+from .models import QuestionAttempt, QuizAttempt, UserQuizStats
+from .scoring import encode_answer, score_answer, score_answers
+from .stats import compute_quiz_stats, materialized_quiz_stats
+
+
+def _property_rules(question_type, correct_answers, attempted_options, is_negative_marking):
+    """The scoring rules of the former QuestionAttempt.is_correct/is_partial/score properties."""
+    if not attempted_options:
+        return False, False, 0
+    if question_type == 'multiple-correct':
+        correct_options = set(correct_answers)
+        attempted = set(attempted_options)
+        is_correct = correct_options == attempted
+        is_partial = bool(correct_options & attempted) and not (attempted - correct_options)
+        if attempted - correct_options:
+            return is_correct, is_partial, -2 if is_negative_marking else 0
+        if len(correct_options & attempted) == len(correct_options):
+            return is_correct, is_partial, 4
+        return is_correct, is_partial, len(correct_options & attempted)
+    is_correct = attempted_options == correct_answers
+    if is_correct:
+        return True, False, 4
+    return False, False, -1 if is_negative_marking else 0
+
+
+CASES = [
+    ('mcq', ['a'], ['a']),
+    ('mcq', ['a'], ['b']),
+    ('mcq', ['a'], []),
+    ('true-false', ['True'], ['True']),
+    ('true-false', ['True'], ['False']),
+    ('true-false', ['True'], []),
+    ('multiple-correct', ['a', 'b'], ['a', 'b']),
+    ('multiple-correct', ['a', 'b'], ['b', 'a']),
+    ('multiple-correct', ['a', 'b', 'c'], ['a']),
+    ('multiple-correct', ['a', 'b', 'c'], ['a', 'c']),
+    ('multiple-correct', ['a', 'b'], ['a', 'd']),
+    ('multiple-correct', ['a', 'b'], ['c']),
+    ('multiple-correct', ['a', 'b'], ['a', 'b', 'c']),
+    ('multiple-correct', ['a', 'b'], []),
+]
+
+
+class ScoreAnswerTests(SimpleTestCase):
+    def test_matches_property_rules(self):
+        for negative in (False, True):
+            for question_type, correct, attempted in CASES:
+                with self.subTest(question_type=question_type, correct=correct, attempted=attempted, negative=negative):
+                    self.assertEqual(
+                        score_answer(question_type, correct, attempted, negative),
+                        _property_rules(question_type, correct, attempted, negative),
+                    )
+
+    def test_scores(self):
+        self.assertEqual(score_answer('mcq', ['a'], ['b'], True), (False, False, -1))
+        self.assertEqual(score_answer('true-false', ['True'], ['True'], True), (True, False, 4))
+        self.assertEqual(score_answer('multiple-correct', ['a', 'b', 'c'], ['a', 'c'], True), (False, True, 2))
+        self.assertEqual(score_answer('multiple-correct', ['a', 'b'], ['a', 'd'], True), (False, False, -2))
+        self.assertEqual(score_answer('multiple-correct', ['a', 'b'], ['a', 'd'], False), (False, False, 0))
+
+    def test_many_wrong_options_fit_the_mask(self):
+        attempted = ['a'] + [f'wrong {i}' for i in range(100)]
+        for question_type, negative in (('multiple-correct', True), ('multiple-correct', False), ('mcq', True)):
+            with self.subTest(question_type=question_type, negative=negative):
+                self.assertEqual(
+                    score_answer(question_type, ['a', 'b'], attempted, negative),
+                    _property_rules(question_type, ['a', 'b'], attempted, negative),
+                )
+
+    def test_too_many_correct_answers_are_rejected(self):
+        with self.assertRaises(ValueError):
+            encode_answer([str(i) for i in range(64)], ['0'])
+
+    def test_batch_matches_one_by_one(self):
+        answers = [(question_type, correct, attempted, negative) for negative in (False, True) for question_type, correct, attempted in CASES]
+        is_correct, is_partial, scores = score_answers(answers)
+        self.assertEqual(
+            [(bool(c), bool(p), int(s)) for c, p, s in zip(is_correct, is_partial, scores)],
+            [score_answer(*answer) for answer in answers],
+        )
+
+
+class QuizStatsTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(name='Ada', email='ada@example.com', password='x')
+        self.topic = Topic.objects.create(name='python', content='{}')
+        self.questions = [
+            QuizQuestion.objects.create(
+                topic=self.topic, question_type='mcq', question=f'Question {i}?',
+                options=['a', 'b', 'c', 'd'], correct_answers=['a'], explanation='',
+            )
+            for i in range(5)
+        ]
+        session = self.client.session
+        session['user_id'] = self.user.id
+        session.save()
+
+    def create_attempt(self, answers, time_taken=60):
+        """A quiz attempt written directly, as saved before the statistics tables existed."""
+        attempt = QuizAttempt.objects.create(
+            user=self.user, topic=self.topic, subtopic='', total_time_taken=time_taken,
+            correct_attempts=len(answers), incorrect_attempts=0, partial_attempts=0, unattempted=0,
+        )
+        for question, attempted in zip(self.questions, answers):
+            QuestionAttempt.objects.create(quiz_attempt=attempt, question=question, time_taken=5, attempted_options=attempted)
+        attempt.score = sum(qa.score for qa in attempt.question_attempts.all())
+        attempt.save(update_fields=['score'])
+        return attempt
+
+    def save_quiz(self, answers, time_taken=60):
+        return self.client.post('/quiz/save-quiz-attempt', json.dumps({
+            'total_time_taken': time_taken,
+            'correct_attempts': len(answers), 'incorrect_attempts': 0, 'partial_attempts': 0, 'unattempted': 0,
+            'topic': self.topic.name, 'subtopic': '',
+            'question_attempts': [
+                {'question_id': question.id, 'time_taken': 5, 'attempted_options': attempted}
+                for question, attempted in zip(self.questions, answers)
+            ],
+        }), content_type='application/json')
+
+
+class MaterializedQuizStatsTests(QuizStatsTestCase):
+    def test_first_save_keeps_earlier_quizzes(self):
+        for answers in (['a', 'b'], ['a'], ['c', 'a', 'a']):
+            self.create_attempt([[option] for option in answers])
+        self.assertFalse(UserQuizStats.objects.filter(user=self.user).exists())
+
+        response = self.save_quiz([['a'], ['a'], ['b']])
+        self.assertEqual(response.status_code, 200)
+
+        stats = materialized_quiz_stats(self.user.id)
+        self.assertEqual(stats['totalQuizzes'], 4)
+        self.assertEqual(stats['totalTimeSpent'], 240)
+        self.assertEqual(stats, compute_quiz_stats(self.user.id))
+
+    def test_incremental_updates_match_recomputation(self):
+        for answers in ([['a'], ['b']], [['a']], [['c'], [], ['a']], [['a'], ['a'], ['a'], ['a']]):
+            self.assertEqual(self.save_quiz(answers, time_taken=30).status_code, 200)
+        self.assertEqual(materialized_quiz_stats(self.user.id), compute_quiz_stats(self.user.id))
+
+
+class SaveQuizAttemptTests(QuizStatsTestCase):
+    def post(self, question_attempts):
+        return self.client.post('/quiz/save-quiz-attempt', json.dumps({
+            'total_time_taken': 30, 'correct_attempts': 0, 'incorrect_attempts': 0, 'partial_attempts': 0,
+            'unattempted': 0, 'topic': self.topic.name, 'subtopic': '', 'question_attempts': question_attempts,
+        }), content_type='application/json')
+
+    def test_invalid_entries_are_rejected(self):
+        question_id = self.questions[0].id
+        cases = [
+            ({'time_taken': 5, 'attempted_options': ['a']}, 'question_attempts[0] is missing question_id'),
+            ({'question_id': 'abc', 'time_taken': 5, 'attempted_options': ['a']}, 'question_attempts[0] has an invalid question_id'),
+            ({'question_id': question_id, 'time_taken': -1, 'attempted_options': ['a']}, 'question_attempts[0] has an invalid time_taken'),
+            ({'question_id': question_id, 'time_taken': 5, 'attempted_options': 'a'}, 'question_attempts[0] attempted_options must be a list of options'),
+            ({'question_id': question_id, 'time_taken': 5, 'attempted_options': [['a']]}, 'question_attempts[0] attempted_options must be a list of options'),
+        ]
+        for entry, message in cases:
+            with self.subTest(message=message):
+                response = self.post([entry])
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json()['message'], message)
+        self.assertFalse(QuizAttempt.objects.exists())
+
+    def test_query_count_does_not_grow_with_answers(self):
+        self.save_quiz([['a']])
+        # Session, topic, questions, then the attempt, its answers in one insert and the three stats rows
+        with self.assertNumQueries(14):
+            self.save_quiz([['a']])
+        with self.assertNumQueries(14):
+            response = self.save_quiz([['a'], ['b'], [], ['a'], ['c']])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(QuestionAttempt.objects.filter(quiz_attempt_id=response.json()['quiz_attempt_id']).count(), 5)
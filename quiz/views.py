@@ -1,7 +1,9 @@
 import json
 from django.http import JsonResponse
 from django.shortcuts import render
+from django.db import transaction
 from .models import QuizAttempt, QuestionAttempt
+from .stats import materialized_quiz_stats, record_quiz_attempt, summarize_quiz_attempt
 from search_app.models import QuizQuestion, Topic
 from django.core.serializers.json import DjangoJSONEncoder
 from authentication.models import User
@@ -13,7 +15,7 @@ from django.core.paginator import Paginator
 def get_quiz_stats(request):
     """
     Returns all quiz statistics for the currently logged-in user, matching the calculations in the ProfilePage frontend.
-    Optimized for performance and scalability.
+    Reads the per-user statistics tables instead of recomputing them from the whole quiz history.
     """
     if request.session.get('user_id') is None:
         return JsonResponse({
@@ -23,145 +25,10 @@ def get_quiz_stats(request):
     try:
         user_id = request.session.get('user_id')
         user = User.objects.get(id=user_id)
-        # Avoid N+1 queries: fetch all related objects in one go
-        quiz_attempts = (
-            QuizAttempt.objects
-            .filter(user=user)
-            .select_related('topic')
-            .prefetch_related(
-                'question_attempts__question'
-            )
-            .order_by('created_at')  # ascending for score progression
-        )
-        # Prepare all stats in a single pass
-        topic_stats = {}
-        question_type_stats = {}
-        score_distribution = {}
-        time_analysis = []
-        performance_by_qtype = {}
-        score_progression = []
-        cumulative_sum = 0
-        quiz_count_by_qtype = {}
-        quizzes_for_progression = []  # store (date, score, topic) for progression
-        # --- Stats for summary ---
-        total_quizzes = 0
-        total_percentage = 0
-        topic_set = set()
-        total_time_spent = 0
-        for idx, attempt in enumerate(quiz_attempts):
-            topic_name = attempt.topic.name
-            created_at_str = attempt.created_at.strftime('%Y-%m-%d')
-            question_attempts = list(attempt.question_attempts.all())
-            # Defensive: skip quiz if it has no question attempts
-            if not question_attempts:
-                continue
-            first_question = question_attempts[0].question
-            question_type = first_question.question_type if first_question else ''
-            # Calculate score and stats for this quiz
-            questions = []
-            correct_count = 0
-            for q_attempt in question_attempts:
-                q = q_attempt.question
-                is_correct = q_attempt.is_correct
-                correct_count += 1 if is_correct else 0
-                questions.append({
-                    'question': q.question,
-                    'options': q.options,
-                    'correctAnswers': q.correct_answers,
-                    'selectedAnswers': q_attempt.attempted_options,
-                    'isCorrect': is_correct,
-                    'partiallyCorrect': q_attempt.is_partial,
-                    'timeTaken': q_attempt.time_taken,
-                    'score': q_attempt.score,
-                    'explanation': q.explanation
-                })
-            total_score = sum(q['score'] for q in questions)
-            total_possible_score = attempt.total_possible_score
-            percentage = round((total_score / total_possible_score) * 100, 2) if total_possible_score > 0 else 0
-            # --- summary stats ---
-            total_quizzes += 1
-            total_percentage += percentage
-            topic_set.add(topic_name)
-            total_time_spent += attempt.total_time_taken
-            # --- topicStats ---
-            if topic_name not in topic_stats:
-                topic_stats[topic_name] = {
-                    'name': topic_name,
-                    'quizzes': 0,
-                    'avgScore': 0,
-                    'totalScore': 0,
-                    'questionTypes': {'mcq': 0, 'multiple-correct': 0, 'true-false': 0}
-                }
-            topic_stats[topic_name]['quizzes'] += 1
-            topic_stats[topic_name]['totalScore'] += total_score
-            topic_stats[topic_name]['avgScore'] = round(topic_stats[topic_name]['totalScore'] / topic_stats[topic_name]['quizzes'])
-            if question_type in topic_stats[topic_name]['questionTypes']:
-                topic_stats[topic_name]['questionTypes'][question_type] += 1
-            # --- questionTypeData ---
-            question_type_stats[question_type] = question_type_stats.get(question_type, 0) + 1
-            quiz_count_by_qtype[question_type] = quiz_count_by_qtype.get(question_type, 0) + 1
-            # --- scoreDistributionData ---
-            rng = int(total_score // 10) * 10
-            key = f"{rng}-{rng+9}"
-            score_distribution[key] = score_distribution.get(key, 0) + 1
-            # --- timeAnalysis ---
-            def seconds_to_minutes(seconds):
-                return seconds / 60 if seconds else 0
-            time_analysis.append({
-                'topic': topic_name,
-                'timeInMinutes': seconds_to_minutes(attempt.total_time_taken),
-                'score': percentage
-            })
-            # --- performanceByQuestionTypeData ---
-            if question_type not in performance_by_qtype:
-                performance_by_qtype[question_type] = {'totalQuestions': 0, 'correctAnswers': 0, 'time': 0}
-            performance_by_qtype[question_type]['totalQuestions'] += len(questions)
-            performance_by_qtype[question_type]['correctAnswers'] += correct_count
-            performance_by_qtype[question_type]['time'] += attempt.total_time_taken
-            # --- scoreProgression ---
-            quizzes_for_progression.append((created_at_str, total_score, topic_name))
-        # Prepare topicStats array
-        topic_stats_array = list(topic_stats.values())
-        # Prepare questionTypeData
-        question_type_data = [{'name': k, 'value': v} for k, v in question_type_stats.items()]
-        # Prepare scoreDistributionData
-        score_distribution_data = [{'range': k, 'count': v} for k, v in score_distribution.items()]
-        # Prepare performanceByQuestionTypeData
-        performance_by_qtype_data = []
-        for qtype, data in performance_by_qtype.items():
-            count = quiz_count_by_qtype.get(qtype, 1)
-            avg_time = (data['time'] / count) / 60 if count > 0 else 0
-            accuracy = (data['correctAnswers'] / data['totalQuestions']) * 100 if data['totalQuestions'] > 0 else 0
-            performance_by_qtype_data.append({
-                'type': qtype,
-                'accuracy': accuracy,
-                'avgTime': avg_time
-            })
-        # Prepare scoreProgression
-        score_progression = []
-        cumulative_sum = 0
-        for idx, (date, score, topic) in enumerate(sorted(quizzes_for_progression, key=lambda x: x[0])):
-            cumulative_sum += score
-            score_progression.append({
-                'date': date,
-                'score': score,
-                'topic': topic,
-                'cumulativeAvg': cumulative_sum / (idx + 1)
-            })
-        average_score = round(total_percentage / total_quizzes, 2) if total_quizzes > 0 else None
-        total_topics = len(topic_set)
+        # Aggregates are maintained incrementally by save_quiz_attempt (see quiz/stats.py)
         return JsonResponse({
             'status': 'success',
-            'topicStats': topic_stats_array,
-            'questionTypeData': question_type_data,
-            'scoreDistributionData': score_distribution_data,
-            'timeAnalysis': time_analysis,
-            'performanceByQuestionTypeData': performance_by_qtype_data,
-            'scoreProgression': score_progression,
-            'averageScore': average_score,
-            'totalQuizzes': total_quizzes,
-            'totalTopics': total_topics,
-            'totalTimeSpent': total_time_spent
+            **materialized_quiz_stats(user.id)
         }, encoder=DjangoJSONEncoder)
     except Exception as e:
         return JsonResponse({
@@ -193,7 +60,8 @@ def get_questions_for_quiz_attempt(request, quiz_attempt_id):
             quiz_attempt = QuizAttempt.objects.get(id=quiz_attempt_id, user=user)
         except QuizAttempt.DoesNotExist:
             return JsonResponse({'status': 'error', 'message': 'Quiz attempt not found'}, status=404)
-        question_attempts = quiz_attempt.question_attempts.all()
+        # Correctness and scores are stored columns; the question row is only needed for its text
+        question_attempts = quiz_attempt.question_attempts.select_related('question')
         paginator = Paginator(question_attempts, 5)
         page = paginator.get_page(page_number)
         questions_data = []
@@ -324,6 +192,25 @@ def get_quizzes_for_topic(request, topic_id):
             'message': str(e)
         }, status=400)
 
+def _question_attempt_error(index, question_data):
+    """Returns why one entry of question_attempts is invalid, or None when it can be saved."""
+    if not isinstance(question_data, dict):
+        return f'question_attempts[{index}] must be an object'
+    for field in ('question_id', 'time_taken', 'attempted_options'):
+        if field not in question_data:
+            return f'question_attempts[{index}] is missing {field}'
+    try:
+        int(question_data['question_id'])
+    except (TypeError, ValueError):
+        return f'question_attempts[{index}] has an invalid question_id'
+    time_taken = question_data['time_taken']
+    if isinstance(time_taken, bool) or not isinstance(time_taken, int) or time_taken < 0:
+        return f'question_attempts[{index}] has an invalid time_taken'
+    options = question_data['attempted_options']
+    if not isinstance(options, list) or not all(isinstance(option, (str, int, float)) for option in options):
+        return f'question_attempts[{index}] attempted_options must be a list of options'
+    return None
+
 def save_quiz_attempt(request):
     if request.session.get('user_id') is None:
         return JsonResponse({
@@ -351,6 +238,19 @@ def save_quiz_attempt(request):
                     'status': 'error',
                     'message': f'Missing required field: {field}'
                 }, status=400)
+
+        if not isinstance(data['question_attempts'], list):
+            return JsonResponse({
+                'status': 'error',
+                'message': 'question_attempts must be a list'
+            }, status=400)
+        for index, question_data in enumerate(data['question_attempts']):
+            error = _question_attempt_error(index, question_data)
+            if error:
+                return JsonResponse({
+                    'status': 'error',
+                    'message': error
+                }, status=400)
         
         # Get or create the Topic object
         topic_name = data['topic']
@@ -362,39 +262,49 @@ def save_quiz_attempt(request):
                 'message': 'Topic not found'
             }, status=404)
         
-        # Create the quiz attempt
-        quiz_attempt: QuizAttempt = QuizAttempt.objects.create(
+        is_negative_marking = data.get('is_negative_marking', False)
+        # One query for every referenced question; only the columns scoring needs
+        questions = QuizQuestion.objects.only('id', 'question_type', 'correct_answers').in_bulk(
+            {int(question_data['question_id']) for question_data in data['question_attempts']}
+        )
+
+        quiz_attempt = QuizAttempt(
             user_id=request.session.get('user_id'),  # Assuming user_id is stored in session
             total_time_taken=data['total_time_taken'],
             correct_attempts=data['correct_attempts'],
             incorrect_attempts=data['incorrect_attempts'],
             partial_attempts=data['partial_attempts'],
             unattempted=data['unattempted'],
-            is_negative_marking=data.get('is_negative_marking', False),
+            is_negative_marking=is_negative_marking,
             topic=topic,
             subtopic=data['subtopic']
         )
-        
-        # Create question attempts and calculate score
-        total_score = 0
+
+        # Build question attempts and score them in one batch, in memory
+        question_attempts = []
         for question_data in data['question_attempts']:
-            try:
-                question = QuizQuestion.objects.get(id=question_data['question_id'])
-                qa = QuestionAttempt.objects.create(
-                    quiz_attempt=quiz_attempt,
-                    question=question,
-                    time_taken=question_data['time_taken'],
-                    attempted_options=question_data['attempted_options']
-                )
-                total_score += qa.score
-            except QuizQuestion.DoesNotExist:
+            question = questions.get(int(question_data['question_id']))
+            if question is None:
                 # Skip if question doesn't exist
                 continue
-        
-        # Update the score field
-        quiz_attempt.score = total_score
-        quiz_attempt.save(update_fields=["score"])
-        
+            qa = QuestionAttempt(
+                quiz_attempt=quiz_attempt,
+                question=question,
+                time_taken=question_data['time_taken'],
+                attempted_options=question_data['attempted_options']
+            )
+            question_attempts.append(qa)
+        QuestionAttempt.apply_scoring_batch(question_attempts)
+        quiz_attempt.score = sum(qa.score for qa in question_attempts)
+
+        with transaction.atomic():
+            # The attempt is written once with its final score, its answers in one bulk insert
+            quiz_attempt.save()
+            QuestionAttempt.objects.bulk_create(question_attempts)
+
+            # Keep the profile statistics current, in the same transaction as the attempt
+            record_quiz_attempt(quiz_attempt, summarize_quiz_attempt(quiz_attempt, question_attempts))
+
         return JsonResponse({
             'status': 'success',
             'quiz_attempt_id': quiz_attempt.pk,
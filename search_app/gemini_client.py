@@ -0,0 +1,193 @@
+import atexit
+import json
+import logging
+import threading
+from contextlib import contextmanager
+
+import requests
+from django.conf import settings
+from google import genai
+from google.genai import errors, types
+from google.genai._api_client import HttpResponse
+from requests.adapters import HTTPAdapter
+
+from .gemini_keys import gemini_key_scheduler, is_rate_limit_error
+
+logger = logging.getLogger(__name__)
+
+
+def _install_pooled_session(client, session):
+    """
+    Routes the client's API-key requests through a long-lived requests.Session.
+
+    google-genai 1.3.0 opens a new requests.Session (and so a new TCP + TLS connection) for every
+    call in ApiClient._request_unauthorized. This replacement is the same code path with the
+    shared session swapped in, so connections and TLS sessions are kept alive between calls.
+    """
+    api_client = client._api_client
+
+    def _request_unauthorized(http_request, stream=False):
+        data = None
+        if http_request.data:
+            if not isinstance(http_request.data, bytes):
+                data = json.dumps(http_request.data)
+            else:
+                data = http_request.data
+        response = session.request(
+            method=http_request.method,
+            url=http_request.url,
+            headers=http_request.headers,
+            data=data,
+            timeout=http_request.timeout,
+            stream=stream,
+        )
+        errors.APIError.raise_for_response(response)
+        return HttpResponse(response.headers, response if stream else [response.text])
+
+    api_client._request_unauthorized = _request_unauthorized
+
+
+class GeminiClientRegistry:
+    """
+    Process-wide registry of genai.Client objects, one per API key.
+
+    Each client keeps a pooled keep-alive HTTP session and a semaphore bounding how many
+    requests may be in flight on that key at once. Clients are created lazily and shared
+    by every thread in the process; close() releases the pooled connections.
+    """
+
+    def __init__(self, max_concurrency_per_key=None, pool_maxsize=None, http_options=None):
+        self.max_concurrency_per_key = max_concurrency_per_key or settings.GEMINI_MAX_CONCURRENCY_PER_KEY
+        self.pool_maxsize = pool_maxsize or self.max_concurrency_per_key
+        self.http_options = http_options
+        self._clients = {}
+        self._sessions = {}
+        self._semaphores = {}
+        self._lock = threading.Lock()
+
+    def _http_options(self):
+        if self.http_options is not None:
+            return self.http_options
+        options = {}
+        if settings.GEMINI_BASE_URL:
+            options['base_url'] = settings.GEMINI_BASE_URL
+        if settings.GEMINI_HTTP_TIMEOUT_MS:
+            options['timeout'] = settings.GEMINI_HTTP_TIMEOUT_MS
+        return options or None
+
+    def get(self, api_key):
+        """Returns the shared client for api_key, creating it on first use."""
+        client = self._clients.get(api_key)
+        if client is not None:
+            return client
+        with self._lock:
+            client = self._clients.get(api_key)
+            if client is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                client = genai.Client(api_key=api_key, http_options=self._http_options())
+                _install_pooled_session(client, session)
+                self._sessions[api_key] = session
+                self._semaphores[api_key] = threading.BoundedSemaphore(self.max_concurrency_per_key)
+                self._clients[api_key] = client
+        return client
+
+    @contextmanager
+    def lease(self, api_key):
+        """Yields the client for api_key while holding one of its concurrency slots."""
+        client = self.get(api_key)
+        semaphore = self._semaphores[api_key]
+        with semaphore:
+            yield client
+
+    def close(self):
+        """Closes every pooled session. Clients are recreated on the next get()."""
+        with self._lock:
+            for session in self._sessions.values():
+                try:
+                    session.close()
+                except Exception as e:
+                    logger.warning(f"Error closing Gemini HTTP session: {e}")
+            self._clients.clear()
+            self._sessions.clear()
+            self._semaphores.clear()
+
+
+gemini_clients = GeminiClientRegistry()
+atexit.register(gemini_clients.close)
+
+
+def _build_request(prompt, temperature, top_p, top_k, max_output_tokens, response_mime_type, response_schema=None):
+    contents = [
+        types.Content(
+            role="user",
+            parts=[types.Part.from_text(text=prompt)],
+        ),
+    ]
+    generate_content_config = types.GenerateContentConfig(
+        temperature=temperature,
+        top_p=top_p,
+        top_k=top_k,
+        max_output_tokens=max_output_tokens,
+        response_mime_type=response_mime_type,
+        response_schema=response_schema,
+    )
+    return contents, generate_content_config
+
+
+def call_gemini_model(prompt, model_name="gemini-2.0-pro-exp-02-05", temperature=1, top_p=0.95, top_k=64, max_output_tokens=8192, response_mime_type="application/json", response_schema=None):
+    """
+    Calls the Gemini model with the given prompt and configuration.
+    Pass response_schema (a types.Schema) to have the model emit JSON of that exact shape.
+    """
+    try:
+        contents, generate_content_config = _build_request(prompt, temperature, top_p, top_k, max_output_tokens, response_mime_type, response_schema)
+        # A rate-limited key is put in cooldown by the scheduler, so each retry lands on another key
+        attempts = max(1, len(gemini_key_scheduler.api_keys))
+        for attempt in range(attempts):
+            try:
+                with gemini_key_scheduler.acquire() as api_key, gemini_clients.lease(api_key) as client:
+                    response = client.models.generate_content(
+                        model=model_name,
+                        contents=contents,
+                        config=generate_content_config,
+                    )
+                return response.text
+            except Exception as e:
+                if not is_rate_limit_error(e) or attempt == attempts - 1:
+                    raise
+    except Exception as e:
+        logger.exception(f"Error calling Gemini model: {e}")
+        raise
+
+
+def stream_gemini_model(prompt, model_name="gemini-2.0-flash", temperature=1, top_p=0.95, top_k=64, max_output_tokens=8192, response_mime_type="application/json", response_schema=None):
+    """
+    Streams the Gemini model's answer, yielding text chunks as they arrive.
+
+    The key lease is held until the stream is exhausted or closed. A rate-limited call is
+    retried on another key only if it fails before the first chunk was yielded.
+    """
+    contents, generate_content_config = _build_request(prompt, temperature, top_p, top_k, max_output_tokens, response_mime_type, response_schema)
+    attempts = max(1, len(gemini_key_scheduler.api_keys))
+    for attempt in range(attempts):
+        started = False
+        try:
+            with gemini_key_scheduler.acquire() as api_key, gemini_clients.lease(api_key) as client:
+                for chunk in client.models.generate_content_stream(
+                    model=model_name,
+                    contents=contents,
+                    config=generate_content_config,
+                ):
+                    if chunk.text:
+                        started = True
+                        yield chunk.text
+            return
+        except GeneratorExit:
+            raise
+        except Exception as e:
+            if started or not is_rate_limit_error(e) or attempt == attempts - 1:
+                logger.exception(f"Error streaming Gemini model: {e}")
+                raise
@@ -0,0 +1,259 @@
+import hashlib
+import logging
+import random
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from google.genai import errors
+
+logger = logging.getLogger(__name__)
+
+# How long a worker waits for a key's state lock before moving on to another key
+_LOCK_WAIT_SECONDS = 1.0
+# Weight of the latest outcome in the exponentially weighted error rate
+_ERROR_RATE_ALPHA = 0.2
+
+
+class NoGeminiKeyAvailable(Exception):
+    """Raised when every configured key is cooling down or out of tokens for longer than the allowed wait."""
+
+
+class _KeyLockTimeout(Exception):
+    """Raised when a key's state lock could not be taken in time; the caller tries another key."""
+
+
+def is_rate_limit_error(error):
+    """True for 429 / RESOURCE_EXHAUSTED responses, i.e. the key hit its rate limit or quota."""
+    if isinstance(error, errors.APIError):
+        return error.code == 429 or error.status == 'RESOURCE_EXHAUSTED'
+    return False
+
+
+def key_id(api_key):
+    """Stable, non-secret identifier for an API key, used in cache keys and stats output."""
+    return hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:12]
+
+
+class GeminiKeyScheduler:
+    """
+    Picks the healthiest Gemini API key for each call, with state shared through the Django cache.
+
+    Every key may be called GEMINI_KEY_RPM times per minute, counted with atomic cache increments
+    so concurrent workers can never overspend it. It also has a cooldown that starts when the key
+    returns a rate-limit error, an exponentially weighted error rate and a list of in-flight leases,
+    kept in a state entry that is only changed under the key's own lock. acquire() chooses the
+    least-loaded key that is not cooling down and has calls left this minute, so all workers spread
+    load over the combined quota instead of round-robining into throttled keys.
+    """
+
+    def __init__(self, api_keys=None):
+        # Unset GEMINI_API_KEY_n variables show up as None in settings; they are never scheduled
+        self.api_keys = [key for key in (api_keys if api_keys is not None else settings.GEMINI_API_KEYS) if key]
+        self.rpm = settings.GEMINI_KEY_RPM
+        self.cooldown_seconds = settings.GEMINI_KEY_COOLDOWN_SECONDS
+        self.max_wait_seconds = settings.GEMINI_KEY_MAX_WAIT_SECONDS
+        self.error_rate_threshold = settings.GEMINI_KEY_ERROR_RATE_THRESHOLD
+        self.lease_ttl_seconds = settings.GEMINI_KEY_LEASE_TTL_SECONDS
+
+    def _state_key(self, api_key):
+        return f"gemini_keys:state:{key_id(api_key)}"
+
+    def _usage_key(self, api_key, minute):
+        return f"gemini_keys:used:{key_id(api_key)}:{minute}"
+
+    def _new_state(self):
+        return {
+            'cooldown_until': 0.0,
+            'consecutive_rate_limits': 0,
+            'leases': {},
+            'successes': 0,
+            'errors': 0,
+            'rate_limited': 0,
+            'error_rate': 0.0,
+        }
+
+    def _load_state(self, api_key, now):
+        state = cache.get(self._state_key(api_key)) or self._new_state()
+        # A lease past its TTL belongs to a dead worker and stops counting as in-flight
+        state['leases'] = {lease: expires for lease, expires in state['leases'].items() if expires > now}
+        return state
+
+    def _load_states(self, now):
+        stored = cache.get_many([self._state_key(api_key) for api_key in self.api_keys])
+        states = {}
+        for api_key in self.api_keys:
+            state = stored.get(self._state_key(api_key)) or self._new_state()
+            state['leases'] = {lease: expires for lease, expires in state['leases'].items() if expires > now}
+            states[api_key] = state
+        return states
+
+    def _used(self, now):
+        minute = int(now // 60)
+        keys = {api_key: self._usage_key(api_key, minute) for api_key in self.api_keys}
+        stored = cache.get_many(list(keys.values()))
+        return {api_key: stored.get(cache_key, 0) for api_key, cache_key in keys.items()}
+
+    def _take_token(self, api_key, now):
+        """Atomically counts one call against the key's current minute; False if the key has none left."""
+        cache_key = self._usage_key(api_key, int(now // 60))
+        cache.add(cache_key, 0, timeout=120)
+        if cache.incr(cache_key) <= self.rpm:
+            return True
+        cache.decr(cache_key)
+        return False
+
+    def _return_token(self, api_key, now):
+        try:
+            cache.decr(self._usage_key(api_key, int(now // 60)))
+        except ValueError:
+            # The minute rolled over and its counter expired; nothing left to give back
+            pass
+
+    @contextmanager
+    def _locked(self, api_key):
+        # Short cross-worker mutex around read-modify-write of one key's state
+        lock_key = f"gemini_keys:lock:{key_id(api_key)}"
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + _LOCK_WAIT_SECONDS
+        acquired = cache.add(lock_key, token, timeout=5)
+        while not acquired and time.monotonic() < deadline:
+            time.sleep(0.005 + random.random() * 0.01)
+            acquired = cache.add(lock_key, token, timeout=5)
+        if not acquired:
+            raise _KeyLockTimeout(f"Timed out waiting for the state lock of Gemini key {key_id(api_key)}")
+        try:
+            yield
+        finally:
+            if cache.get(lock_key) == token:
+                cache.delete(lock_key)
+
+    def _seconds_until_free(self, states, used, now):
+        next_minute = (int(now // 60) + 1) * 60 - now
+        return min(
+            max(state['cooldown_until'] - now, next_minute if used[api_key] >= self.rpm else 0.0)
+            for api_key, state in states.items()
+        )
+
+    def _try_acquire(self):
+        """Takes a token from the best key. Returns (api_key, lease_id) or (None, seconds_until_a_key_is_free)."""
+        now = time.time()
+        states = self._load_states(now)
+        used = self._used(now)
+        candidates = sorted(
+            (api_key for api_key, state in states.items() if state['cooldown_until'] <= now and used[api_key] < self.rpm),
+            key=lambda k: (len(states[k]['leases']), states[k]['error_rate'], used[k]),
+        )
+        locked_out = False
+        for api_key in candidates:
+            if not self._take_token(api_key, now):
+                continue
+            try:
+                with self._locked(api_key):
+                    state = self._load_state(api_key, now)
+                    if state['cooldown_until'] > now:
+                        # Another worker saw a 429 on this key since the states were read
+                        self._return_token(api_key, now)
+                        continue
+                    lease_id = uuid.uuid4().hex
+                    state['leases'][lease_id] = now + self.lease_ttl_seconds
+                    cache.set(self._state_key(api_key), state, timeout=None)
+                    return api_key, lease_id
+            except _KeyLockTimeout as e:
+                logger.warning(f"{e}, trying another key")
+                self._return_token(api_key, now)
+                locked_out = True
+        if locked_out:
+            return None, 0.05
+        return None, self._seconds_until_free(states, self._used(now), now)
+
+    def _release(self, api_key, lease_id, error=None):
+        try:
+            with self._locked(api_key):
+                self._record_outcome(api_key, lease_id, error)
+        except _KeyLockTimeout as e:
+            # The lease expires after GEMINI_KEY_LEASE_TTL_SECONDS; only this call's outcome goes unrecorded
+            logger.warning(f"{e}, outcome of the call not recorded")
+
+    def _record_outcome(self, api_key, lease_id, error):
+        now = time.time()
+        state = self._load_state(api_key, now)
+        state['leases'].pop(lease_id, None)
+        failed = error is not None
+        state['error_rate'] = (1 - _ERROR_RATE_ALPHA) * state['error_rate'] + _ERROR_RATE_ALPHA * (1.0 if failed else 0.0)
+        if not failed:
+            state['successes'] += 1
+            state['consecutive_rate_limits'] = 0
+        elif is_rate_limit_error(error):
+            state['rate_limited'] += 1
+            state['consecutive_rate_limits'] += 1
+            # Back off harder while the key keeps answering 429, capped at ten cooldown periods
+            backoff = self.cooldown_seconds * min(2 ** (state['consecutive_rate_limits'] - 1), 10)
+            state['cooldown_until'] = now + backoff
+            logger.warning(f"Gemini key {key_id(api_key)} rate limited, cooling down for {backoff}s")
+        else:
+            state['errors'] += 1
+            if state['error_rate'] >= self.error_rate_threshold:
+                state['cooldown_until'] = max(state['cooldown_until'], now + self.cooldown_seconds / 4)
+        cache.set(self._state_key(api_key), state, timeout=None)
+
+    @contextmanager
+    def acquire(self):
+        """
+        Yields the API key to use for one Gemini call and records how the call went.
+
+        Waits up to GEMINI_KEY_MAX_WAIT_SECONDS for a key to come out of cooldown or refill a token,
+        then raises NoGeminiKeyAvailable.
+        """
+        if not self.api_keys:
+            raise NoGeminiKeyAvailable("No Gemini API keys are configured")
+        deadline = time.monotonic() + self.max_wait_seconds
+        while True:
+            api_key, lease_or_wait = self._try_acquire()
+            if api_key is not None:
+                break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or lease_or_wait > remaining:
+                raise NoGeminiKeyAvailable(f"All Gemini API keys are throttled for another {lease_or_wait:.1f}s")
+            time.sleep(max(lease_or_wait, 0.05))
+        error = None
+        try:
+            yield api_key
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            # Always free the lease, also on GeneratorExit when a streaming caller is closed early;
+            # only real exceptions count against the key
+            self._release(api_key, lease_or_wait, error=error)
+
+    def stats(self):
+        """Current per-key state for monitoring; keys are identified by key_id(), never by the secret itself."""
+        now = time.time()
+        states = self._load_states(now)
+        used = self._used(now)
+        return [
+            {
+                'key_id': key_id(api_key),
+                'tokens': max(0, self.rpm - used[api_key]),
+                'in_flight': len(state['leases']),
+                'cooldown_remaining': round(max(0.0, state['cooldown_until'] - now), 1),
+                'successes': state['successes'],
+                'errors': state['errors'],
+                'rate_limited': state['rate_limited'],
+                'error_rate': round(state['error_rate'], 3),
+            }
+            for api_key, state in states.items()
+        ]
+
+    def reset(self):
+        minute = int(time.time() // 60)
+        cache.delete_many(
+            [self._state_key(api_key) for api_key in self.api_keys]
+            + [self._usage_key(api_key, minute) for api_key in self.api_keys]
+        )
+
+
+gemini_key_scheduler = GeminiKeyScheduler()
@@ -0,0 +1,37 @@
+import hashlib
+import re
+
+_whitespace_re = re.compile(r'\s+')
+# Sentence punctuation only: symbols such as "+" and "#" carry meaning in topics like "C++" or "C#"
+_punctuation_re = re.compile(r'[.,!?;:\'"`()\[\]{}<>]+')
+# Punctuation closing a question sentence, e.g. the "?" of "What is Python?"
+_trailing_punctuation_re = re.compile(r'[\s.!?]+$')
+
+
+def normalize_topic_name(name):
+    """Normalize a topic name the way it is stored in Topic.name (trimmed, lower-case, single spaces)."""
+    return _whitespace_re.sub(' ', (name or '').strip()).lower()
+
+
+def normalize_prompt(prompt):
+    """Normalize a free-text search prompt: case-folded, punctuation dropped and whitespace collapsed."""
+    return _whitespace_re.sub(' ', _punctuation_re.sub(' ', (prompt or '').casefold())).strip()
+
+
+def prompt_hash(prompt):
+    """SHA-256 hex digest of the normalized prompt, used as the TopicAlias lookup key."""
+    return hashlib.sha256(normalize_prompt(prompt).encode('utf-8')).hexdigest()
+
+
+def normalize_question_text(question_text):
+    """
+    Normalize a quiz question for deduplication: case-folded, whitespace collapsed and trailing
+    sentence punctuation dropped. Brackets, quotes and other symbols are kept, since in code
+    questions "a[1]" and "a(1)" are different questions.
+    """
+    return _trailing_punctuation_re.sub('', _whitespace_re.sub(' ', (question_text or '').casefold()).strip())
+
+
+def question_content_hash(question_text):
+    """SHA-256 hex digest of the normalized question text, so "What is Python?" and "what is python ?" hash the same."""
+    return hashlib.sha256(normalize_question_text(question_text).encode('utf-8')).hexdigest()
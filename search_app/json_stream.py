@@ -0,0 +1,74 @@
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class IncrementalJSONScanner:
+    """
+    Finds completed members of a JSON document while it is still being streamed.
+
+    Every container (object or array) opened at container_depth is watched: each of its children
+    is parsed and returned as soon as the comma or closing bracket after it arrives. The outermost
+    container has depth 1, so for {"topic": "x", "x": {"A": {...}, "B": [...]}} a depth of 2
+    yields ("A", {...}) and ("B", [...]), and for {"quiz": [{...}, {...}]} it yields (None, {...})
+    for each question.
+    """
+
+    def __init__(self, container_depth=2):
+        self.container_depth = container_depth
+        self.text = ''
+        self._pos = 0
+        self._depth = 0
+        self._containers = []
+        self._in_string = False
+        self._escaped = False
+        self._child_start = None
+
+    def feed(self, chunk):
+        """Appends chunk to the document and returns a list of (key, value) for newly completed children."""
+        self.text += chunk
+        completed = []
+        text = self.text
+        for i in range(self._pos, len(text)):
+            c = text[i]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif c == '\\':
+                    self._escaped = True
+                elif c == '"':
+                    self._in_string = False
+                continue
+            if c == '"':
+                self._in_string = True
+            elif c in '{[':
+                self._depth += 1
+                self._containers.append(c)
+                if self._depth == self.container_depth:
+                    self._child_start = i + 1
+            elif c in '}]':
+                if self._depth == self.container_depth:
+                    self._emit(text[self._child_start:i], completed)
+                    self._child_start = None
+                self._depth -= 1
+                if self._containers:
+                    self._containers.pop()
+            elif c == ',' and self._depth == self.container_depth:
+                self._emit(text[self._child_start:i], completed)
+                self._child_start = i + 1
+        self._pos = len(text)
+        return completed
+
+    def _emit(self, raw, completed):
+        raw = raw.strip()
+        if not raw:
+            return
+        try:
+            if self._containers[-1] == '{':
+                member = json.loads('{' + raw + '}')
+                completed.extend(member.items())
+            else:
+                completed.append((None, json.loads(raw)))
+        except ValueError as e:
+            logger.warning(f"Skipping unparseable streamed JSON member: {e}")
@@ -0,0 +1,65 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+from google import genai
+
+from search_app.gemini_client import GeminiClientRegistry
+
+_STUB_BODY = json.dumps({
+    'candidates': [{'content': {'role': 'model', 'parts': [{'text': '{"ok": true}'}]}, 'finishReason': 'STOP'}],
+}).encode('utf-8')
+
+
+class _StubGeminiHandler(BaseHTTPRequestHandler):
+    """Answers every generateContent call with a fixed response over keep-alive HTTP/1.1."""
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(_STUB_BODY)))
+        self.end_headers()
+        self.wfile.write(_STUB_BODY)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = 'Benchmark per-call Gemini client overhead (new client per call vs the shared registry) against a local stub server.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--calls', type=int, default=200, help='Calls per scenario')
+
+    def handle(self, *args, **options):
+        calls = options['calls']
+        server = ThreadingHTTPServer(('127.0.0.1', 0), _StubGeminiHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        http_options = {'base_url': f'http://127.0.0.1:{server.server_address[1]}/'}
+
+        def per_call_client():
+            client = genai.Client(api_key='bench-key', http_options=http_options)
+            client.models.generate_content(model='gemini-2.0-flash', contents='ping')
+
+        registry = GeminiClientRegistry(http_options=http_options)
+
+        def shared_client():
+            with registry.lease('bench-key') as client:
+                client.models.generate_content(model='gemini-2.0-flash', contents='ping')
+
+        try:
+            for name, fn in [('new genai.Client per call', per_call_client), ('shared registry client', shared_client)]:
+                fn()  # warm up imports and the first connection
+                start = time.perf_counter()
+                for _ in range(calls):
+                    fn()
+                elapsed = time.perf_counter() - start
+                self.stdout.write(f"{name:<28} {elapsed / calls * 1000:8.3f} ms/call over {calls} calls")
+        finally:
+            registry.close()
+            server.shutdown()
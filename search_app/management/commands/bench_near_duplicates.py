@@ -0,0 +1,84 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from search_app.near_duplicates import NearDuplicateIndex, MinHasher, estimated_similarity
+
+_SYLLABLES = ['ka', 'lo', 'mi', 'ne', 'ru', 'ta', 'vo', 'zi', 'pe', 'su', 'da', 'fi', 'go', 'hu', 'ja', 'be']
+_TEMPLATES = [
+    'What is the {0} of a {1} {2} when used with {3}?',
+    'Which statement best describes how a {1} {2} affects {0} and {3}?',
+    'How does {3} change the {0} of a {2} in {1}?',
+]
+
+
+def _vocabulary(rng, size=5000):
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rng.choice(_SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def _question(rng, vocabulary):
+    return rng.choice(_TEMPLATES).format(*rng.sample(vocabulary, 4))
+
+
+def _reword(rng, question):
+    # A light rewording: same content words, different template wording and order
+    words = question.rstrip('?').split()
+    rng.shuffle(words)
+    return 'In other words, ' + ' '.join(words) + '?'
+
+
+class Command(BaseCommand):
+    help = 'Measure the insert-time cost of near-duplicate detection (MinHash + LSH vs. a linear scan) as a question pool grows. Half of the inserted questions are rewordings of pooled ones.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='100,1000,5000,20000', help='Comma-separated pool sizes to measure')
+        parser.add_argument('--inserts', type=int, default=200, help='Questions inserted (and timed) at each pool size')
+        parser.add_argument('--seed', type=int, default=7)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        vocabulary = _vocabulary(rng)
+        hasher = MinHasher()
+        sizes = sorted(int(size) for size in options['sizes'].split(','))
+        inserts = options['inserts']
+
+        index = NearDuplicateIndex()
+        pool = []
+        texts_in_pool = []
+        self.stdout.write(f"{'pool size':>10}{'signature us':>14}{'lsh query us':>14}{'scan query us':>15}{'lsh flagged':>13}{'scan flagged':>14}")
+        for size in sizes:
+            while len(pool) < size:
+                text = _question(rng, vocabulary)
+                signature = hasher.signature(text)
+                index.add(len(pool), signature)
+                pool.append(signature)
+                texts_in_pool.append(text)
+
+            # Half new questions, half rewordings of pooled ones
+            texts = [
+                _reword(rng, rng.choice(texts_in_pool)) if i % 2 else _question(rng, vocabulary)
+                for i in range(inserts)
+            ]
+            start = time.perf_counter()
+            signatures = [hasher.signature(text) for text in texts]
+            signature_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            lsh_flagged = sum(1 for signature in signatures if index.query(signature) is not None)
+            lsh_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            scan_flagged = sum(
+                1 for signature in signatures
+                if any(estimated_similarity(signature, other) >= index.threshold for other in pool)
+            )
+            scan_time = time.perf_counter() - start
+
+            self.stdout.write(
+                f"{size:>10}{signature_time / inserts * 1e6:>14.1f}{lsh_time / inserts * 1e6:>14.1f}"
+                f"{scan_time / inserts * 1e6:>15.1f}{lsh_flagged:>13}{scan_flagged:>14}"
+            )
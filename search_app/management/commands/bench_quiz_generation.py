@@ -0,0 +1,56 @@
+import itertools
+import json
+import re
+import time
+
+from django.core.management.base import BaseCommand
+
+from search_app.quiz_generation import generate_quiz_question_data
+
+# Rough output size of one generated mcq question in tokens
+_QUESTION_TOKENS = 90
+
+
+class Command(BaseCommand):
+    help = 'Compare one-prompt and chunked parallel quiz generation against a stub model with per-token delay.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--questions', type=int, default=50)
+        parser.add_argument('--ms-per-token', type=float, default=2.0, help='Simulated generation time per output token')
+        parser.add_argument('--first-token-ms', type=float, default=400.0, help='Simulated latency before the first token')
+        parser.add_argument('--fail-every', type=int, default=0, help='Make every Nth chunk fail, to exercise partial results')
+
+    def handle(self, *args, **options):
+        per_token = options['ms_per_token'] / 1000
+        first_token = options['first_token_ms'] / 1000
+        count_pattern = re.compile(r'consist of (\d+) questions')
+        serial = itertools.count(1)
+
+        def stub_model(prompt, **kwargs):
+            count = int(count_pattern.search(prompt).group(1))
+            call = next(serial)
+            time.sleep(first_token + per_token * _QUESTION_TOKENS * count)
+            if options['fail_every'] and call % options['fail_every'] == 0:
+                raise RuntimeError('simulated chunk failure')
+            return json.dumps({'quiz': [
+                {
+                    'type': 'mcq',
+                    'question': f'Stub question {call}-{i}?',
+                    'options': ['a', 'b', 'c', 'd'],
+                    'correct_answers': [0],
+                    'explanation': 'lorem ' * 40,
+                }
+                for i in range(count)
+            ]})
+
+        num_questions = options['questions']
+        start = time.perf_counter()
+        single = generate_quiz_question_data('python', '', 'mcq', num_questions, model_call=stub_model, chunk_size=num_questions)
+        single_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        chunked = generate_quiz_question_data('python', '', 'mcq', num_questions, model_call=stub_model)
+        chunked_time = time.perf_counter() - start
+
+        self.stdout.write(f"single prompt    {single_time * 1000:9.1f} ms  {len(single)} questions")
+        self.stdout.write(f"chunked          {chunked_time * 1000:9.1f} ms  {len(chunked)} questions")
@@ -0,0 +1,74 @@
+import json
+import re
+import time
+
+from django.core.management.base import BaseCommand
+
+from search_app.topic_generation import TOPIC_SECTIONS, generate_prompt, generate_topic_sections, section_key
+
+# Rough output size of each section in tokens, from typical generated topics
+_SECTION_TOKENS = {
+    "Short Description": 180,
+    "Need to Learn {topic-name}": 200,
+    "Resource Tab Suggestions": 30,
+    "SubTopics": 1600,
+    "Road Map to Learn {topic-name}": 1300,
+    "Key Takeaways": 150,
+    "Frequently Asked Questions": 450,
+    "Related Topics": 160,
+}
+
+
+def _filler(tokens):
+    # About four characters per token
+    return "lorem " * int(tokens * 4 / 6)
+
+
+def _section_value(section, tokens):
+    text = _filler(tokens)
+    if section == "SubTopics":
+        return {"Description": {"subtopics": [{"name": "Basics", "description": text}]}}
+    if section.startswith("Road Map"):
+        return {"Description": {"prerequisites": [], "levels": [{"name": "Basic Level", "description": text}]}}
+    if section in ("Frequently Asked Questions", "Related Topics"):
+        return {"Description": [{"question": "Why?", "answer": text}]}
+    return {"Description": text}
+
+
+class Command(BaseCommand):
+    help = 'Compare single-prompt and parallel sectioned topic generation end-to-end against a stub model with per-token delay.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ms-per-token', type=float, default=2.0, help='Simulated generation time per output token')
+        parser.add_argument('--first-token-ms', type=float, default=400.0, help='Simulated latency before the first token')
+        parser.add_argument('--topic', default='python')
+
+    def handle(self, *args, **options):
+        topic = options['topic']
+        per_token = options['ms_per_token'] / 1000
+        first_token = options['first_token_ms'] / 1000
+        section_pattern = re.compile(r'Only generate the "(.+?)" section')
+
+        def stub_model(prompt, **kwargs):
+            match = section_pattern.search(prompt)
+            if match:
+                requested = [(s, t) for s, t in _SECTION_TOKENS.items() if section_key(s, topic) == match.group(1)]
+            else:
+                requested = list(_SECTION_TOKENS.items())
+            sections = {section_key(s, topic): _section_value(s, t) for s, t in requested}
+            time.sleep(first_token + per_token * sum(t for _, t in requested))
+            if match:
+                return json.dumps(sections)
+            return json.dumps({"topic": topic, topic: sections})
+
+        start = time.perf_counter()
+        stub_model(generate_prompt(topic))
+        monolithic = time.perf_counter() - start
+
+        start = time.perf_counter()
+        content = json.loads(generate_topic_sections(topic, model_call=stub_model))
+        sectioned = time.perf_counter() - start
+
+        assert list(content[topic]) == [section_key(s, topic) for s, _ in TOPIC_SECTIONS]
+        self.stdout.write(f"single prompt        {monolithic * 1000:9.1f} ms")
+        self.stdout.write(f"parallel sections    {sectioned * 1000:9.1f} ms  ({len(TOPIC_SECTIONS)} sections)")
@@ -0,0 +1,69 @@
+import json
+import time
+
+import httplib2
+from django.core.management.base import BaseCommand
+from googleapiclient.discovery import build
+
+from search_app.youtube_api import QueryResultCache, get_youtube_service
+
+
+class _StubYouTubeHttp:
+    """Stand-in for httplib2.Http that answers search and videos calls without touching the network."""
+
+    def __init__(self, results=2):
+        ids = [f'vid{i:08d}' for i in range(results)]
+        self.search = json.dumps({'items': [
+            {'id': {'videoId': video_id}, 'snippet': {'title': f'Video {video_id}', 'channelTitle': 'Bench'}}
+            for video_id in ids
+        ]}).encode('utf-8')
+        self.videos = json.dumps({'items': [
+            {'id': video_id, 'contentDetails': {'duration': 'PT12M3S'}} for video_id in ids
+        ]}).encode('utf-8')
+
+    def request(self, uri, method='GET', body=None, headers=None, redirections=5, connection_type=None):
+        content = self.search if '/search' in uri else self.videos
+        return httplib2.Response({'status': '200', 'content-type': 'application/json'}), content
+
+
+def _search_and_details(youtube, query):
+    response = youtube.search().list(q=query, part='snippet', maxResults=2, type='video').execute()
+    ids = [item['id']['videoId'] for item in response['items']]
+    return youtube.videos().list(part='contentDetails', id=','.join(ids), maxResults=len(ids)).execute()
+
+
+class Command(BaseCommand):
+    help = 'Benchmark search_youtube client overhead with a stubbed transport: build() per call vs cached service vs cached results.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--calls', type=int, default=200, help='Calls per scenario')
+
+    def handle(self, *args, **options):
+        calls = options['calls']
+        http = _StubYouTubeHttp()
+        query = 'python loops tutorial'
+
+        def build_per_call():
+            _search_and_details(build('youtube', 'v3', developerKey='bench-key', http=http, cache_discovery=False), query)
+
+        def cached_service():
+            _search_and_details(get_youtube_service('bench-key', http=http), query)
+
+        result_cache = QueryResultCache(ttl=60, maxsize=16)
+        cache_key = result_cache.key(query, 2)
+        result_cache.set(cache_key, [{'title': 'cached'}])
+
+        def cached_result():
+            result_cache.get(result_cache.key('  Python loops tutorial ', 2))
+
+        for name, fn in [
+            ('build() per call', build_per_call),
+            ('cached service', cached_service),
+            ('cached query result', cached_result),
+        ]:
+            fn()
+            start = time.perf_counter()
+            for _ in range(calls):
+                fn()
+            elapsed = time.perf_counter() - start
+            self.stdout.write(f"{name:<22} {elapsed / calls * 1000:8.3f} ms/call over {calls} calls")
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from search_app.gemini_keys import gemini_key_scheduler
+
+
+class Command(BaseCommand):
+    help = 'Show the shared health state of every configured Gemini API key.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Clear all key state (cooldowns, counters, per-minute call counts)')
+
+    def handle(self, *args, **options):
+        if options['reset']:
+            gemini_key_scheduler.reset()
+            self.stdout.write(self.style.SUCCESS('Reset Gemini key scheduler state.'))
+            return
+        rows = gemini_key_scheduler.stats()
+        if not rows:
+            self.stdout.write(self.style.WARNING('No Gemini API keys are configured.'))
+            return
+        self.stdout.write(f"{'key':<14}{'tokens':>8}{'in-flight':>11}{'cooldown':>10}{'ok':>8}{'errors':>8}{'429s':>7}{'err-rate':>10}")
+        for row in rows:
+            self.stdout.write(
+                f"{row['key_id']:<14}{row['tokens']:>8}{row['in_flight']:>11}{row['cooldown_remaining']:>10}"
+                f"{row['successes']:>8}{row['errors']:>8}{row['rate_limited']:>7}{row['error_rate']:>10}"
+            )
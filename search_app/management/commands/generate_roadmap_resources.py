@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from search_app.models import Topic
+from search_app.prefetch import roadmap_subtopics
+from search_app.resources import generate_subtopic_resources_batch
+
+
+class Command(BaseCommand):
+    help = 'Generate the articles and documentation of every roadmap subtopic of topics with batched Gemini calls.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('topics', nargs='*', help='Topic names (default: every topic)')
+        parser.add_argument('--batch-size', type=int, default=None, help='Subtopics per Gemini call (default: RESOURCE_BATCH_SIZE)')
+
+    def handle(self, *args, **options):
+        topics = Topic.objects.all().order_by('name')
+        if options['topics']:
+            topics = topics.filter(name__in=options['topics'])
+            if not topics.exists():
+                raise CommandError('None of the given topics exist.')
+        total_calls = 0
+        for topic in topics:
+            subtopics = roadmap_subtopics(topic.content)
+            if not subtopics:
+                continue
+            outcome = generate_subtopic_resources_batch(topic, subtopics, batch_size=options['batch_size'])
+            total_calls += outcome['calls']
+            self.stdout.write(
+                f"{topic.name}: {len(subtopics)} subtopics, {outcome['calls']} call(s), "
+                f"{outcome['articles']} articles, {outcome['documentation']} docs"
+                + ''.join(
+                    f", missing {kind}: {', '.join(missing)}" for kind, missing in outcome['missing'].items() if missing
+                )
+            )
+        self.stdout.write(self.style.SUCCESS(f'Done with {total_calls} Gemini call(s).'))
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from search_app.models import QuizQuestion
+from search_app.near_duplicates import NearDuplicateIndex, rebuild_pool_index
+
+
+class Command(BaseCommand):
+    help = ('Build or rebuild the near-duplicate (MinHash/LSH) index of every quiz question pool. Run it once for '
+            'questions stored before the index existed and after changing QUIZ_MINHASH_PERMUTATIONS or QUIZ_LSH_BANDS.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--topic', help='Only rebuild the pools of this topic name')
+        parser.add_argument('--report', action='store_true', help='Also count stored questions that near-duplicate an earlier one')
+
+    def handle(self, *args, **options):
+        pools = QuizQuestion.objects.all()
+        if options['topic']:
+            pools = pools.filter(topic__name=options['topic'])
+        pools = pools.values_list('topic_id', 'subtopic', 'question_type').distinct().order_by('topic_id', 'subtopic', 'question_type')
+
+        total = 0
+        for topic_id, subtopic, question_type in pools:
+            signatures = rebuild_pool_index(topic_id, subtopic, question_type)
+            total += len(signatures)
+            line = f"topic {topic_id} {question_type:<17} {subtopic or '-':<40} {len(signatures):>6} questions"
+            if options['report']:
+                line += f"  {self._count_near_duplicates(signatures):>5} near-duplicates"
+            self.stdout.write(line)
+        self.stdout.write(self.style.SUCCESS(f'Indexed {total} question(s) in {len(pools)} pool(s).'))
+
+    def _count_near_duplicates(self, signatures):
+        # Replay the pool in insertion order: a question counts if it near-duplicates an older one
+        replay = NearDuplicateIndex()
+        count = 0
+        for key in sorted(signatures):
+            signature = signatures[key]
+            if replay.query(signature) is not None:
+                count += 1
+            else:
+                replay.add(key, signature)
+        return count
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.6 on 2026-10-18 19:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search_app', '0010_articleresource_documentationresource_videoresource'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TopicAlias',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prompt_hash', models.CharField(help_text='SHA-256 of the normalized prompt', max_length=64, unique=True)),
+                ('normalized_prompt', models.TextField()),
+                ('verdict', models.CharField(choices=[('topic', 'Topic'), ('not a relevant topic', 'Not a relevant topic'), ('not enough information', 'Not enough information')], default='topic', max_length=32)),
+                ('expires_at', models.DateTimeField(blank=True, help_text='Negative verdicts stop applying after this time', null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('topic', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='aliases', to='search_app.topic')),
+            ],
+        ),
+    ]
@@ -0,0 +1,17 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search_app', '0011_topicalias'),
+    ]
+
+    operations = [
+        # Nullable first so existing rows can be backfilled by the next migration
+        migrations.AddField(
+            model_name='quizquestion',
+            name='content_hash',
+            field=models.CharField(editable=False, help_text='SHA-256 of the normalized question text', max_length=64, null=True),
+        ),
+    ]
@@ -0,0 +1,136 @@
+import hashlib
+import json
+import re
+
+from django.db import migrations
+from django.db.models import Sum, Value
+from django.db.models.functions import Coalesce
+
+from quiz.scoring import score_answer
+
+BATCH_SIZE = 1000
+
+# Frozen copy of search_app.helpers.question_content_hash as of this migration, so later
+# changes to the runtime normalization cannot change what this backfill merges
+_whitespace_re = re.compile(r'\s+')
+_trailing_punctuation_re = re.compile(r'[\s.!?]+$')
+
+
+def question_content_hash(question_text):
+    normalized = _trailing_punctuation_re.sub('', _whitespace_re.sub(' ', (question_text or '').casefold()).strip())
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+def _answer_key(question):
+    return json.dumps([question.options, question.correct_answers], sort_keys=True)
+
+
+def _disambiguated_hash(content_hash, answer_key):
+    """Hash kept by a same-text question whose options or answers differ from the pool's canonical row."""
+    return hashlib.sha256(f'{content_hash}:{answer_key}'.encode('utf-8')).hexdigest()
+
+
+def backfill_content_hash(apps, schema_editor):
+    """
+    Fills content_hash for existing questions in primary-key chunks.
+
+    Rows whose normalized text, options and correct answers all equal an earlier row of the
+    same pool (topic, subtopic, question_type) are duplicates: their question attempts are
+    repointed to the earliest (canonical) row and the duplicates are deleted, so the unique
+    constraint added by the next migration can be created. A same-text row whose options or
+    answers differ is a different question and is kept under a disambiguated hash, since
+    attempts against it were scored with its own answers. Rows of different pools are never merged.
+    """
+    QuizQuestion = apps.get_model('search_app', 'QuizQuestion')
+    QuestionAttempt = apps.get_model('quiz', 'QuestionAttempt')
+
+    canonical = {}
+    duplicates = {}
+    last_id = 0
+    while True:
+        batch = list(
+            QuizQuestion.objects.filter(id__gt=last_id).order_by('id')
+            .only('id', 'topic_id', 'subtopic', 'question_type', 'question', 'options', 'correct_answers')[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        changed = []
+        for question in batch:
+            content_hash = question_content_hash(question.question)
+            answer_key = _answer_key(question)
+            pool_key = (question.topic_id, question.subtopic, question.question_type, content_hash)
+            if pool_key in canonical:
+                canonical_id, canonical_answer_key = canonical[pool_key]
+                if answer_key == canonical_answer_key:
+                    duplicates[question.id] = canonical_id
+                    continue
+                content_hash = _disambiguated_hash(content_hash, answer_key)
+                variant_key = pool_key + (answer_key,)
+                if variant_key in canonical:
+                    duplicates[question.id] = canonical[variant_key]
+                    continue
+                canonical[variant_key] = question.id
+            else:
+                canonical[pool_key] = (question.id, answer_key)
+            question.content_hash = content_hash
+            changed.append(question)
+        QuizQuestion.objects.bulk_update(changed, ['content_hash'])
+        last_id = batch[-1].id
+
+    duplicate_ids = list(duplicates)
+    for start in range(0, len(duplicate_ids), BATCH_SIZE):
+        chunk = duplicate_ids[start:start + BATCH_SIZE]
+        repointed = set(QuestionAttempt.objects.filter(question_id__in=chunk).values_list('id', flat=True))
+        for duplicate_id in chunk:
+            QuestionAttempt.objects.filter(question_id=duplicate_id).update(question_id=duplicates[duplicate_id])
+        QuizQuestion.objects.filter(id__in=chunk).delete()
+        _rescore(apps, repointed)
+
+
+def _rescore(apps, question_attempt_ids):
+    """
+    Scores repointed question attempts against their canonical question and refreshes the totals
+    of their quiz attempts, whether or not quiz.0009 has already scored them against the duplicate.
+    """
+    QuestionAttempt = apps.get_model('quiz', 'QuestionAttempt')
+    QuizAttempt = apps.get_model('quiz', 'QuizAttempt')
+
+    ids = sorted(question_attempt_ids)
+    for start in range(0, len(ids), BATCH_SIZE):
+        batch = list(
+            QuestionAttempt.objects.filter(id__in=ids[start:start + BATCH_SIZE])
+            .select_related('question', 'quiz_attempt')
+            .only(
+                'id', 'quiz_attempt_id', 'attempted_options', 'question__question_type',
+                'question__correct_answers', 'quiz_attempt__is_negative_marking',
+            )
+        )
+        for q_attempt in batch:
+            q_attempt.is_correct, q_attempt.is_partial, q_attempt.score = score_answer(
+                q_attempt.question.question_type,
+                q_attempt.question.correct_answers,
+                q_attempt.attempted_options,
+                q_attempt.quiz_attempt.is_negative_marking,
+            )
+        QuestionAttempt.objects.bulk_update(batch, ['is_correct', 'is_partial', 'score'])
+        attempts = list(
+            QuizAttempt.objects.filter(id__in={q_attempt.quiz_attempt_id for q_attempt in batch})
+            .annotate(total_score=Coalesce(Sum('question_attempts__score'), Value(0)))
+            .only('id', 'score')
+        )
+        for attempt in attempts:
+            attempt.score = attempt.total_score
+        QuizAttempt.objects.bulk_update(attempts, ['score'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search_app', '0012_quizquestion_content_hash'),
+        # Repointed attempts are rescored, so the stored scoring columns must exist
+        ('quiz', '0008_questionattempt_scoring'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_content_hash, migrations.RunPython.noop),
+    ]
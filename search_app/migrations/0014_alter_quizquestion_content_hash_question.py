@@ -0,0 +1,29 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search_app', '0013_backfill_quizquestion_content_hash'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='quizquestion',
+            name='content_hash',
+            field=models.CharField(editable=False, help_text='SHA-256 of the normalized question text', max_length=64),
+        ),
+        migrations.AddConstraint(
+            model_name='quizquestion',
+            constraint=models.UniqueConstraint(
+                fields=('topic', 'subtopic', 'question_type', 'content_hash'),
+                name='unique_quiz_question_per_pool',
+            ),
+        ),
+        # Uniqueness now lives on the pool and the hash; drop the B-tree over every full question body
+        migrations.AlterField(
+            model_name='quizquestion',
+            name='question',
+            field=models.TextField(),
+        ),
+    ]
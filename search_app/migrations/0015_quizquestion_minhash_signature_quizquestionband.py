@@ -0,0 +1,31 @@
+# Generated by Django 5.1.6 on 2026-10-18 20:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search_app', '0014_alter_quizquestion_content_hash_question'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizquestion',
+            name='minhash_signature',
+            field=models.JSONField(blank=True, editable=False, help_text='MinHash signature of the question text, see search_app.near_duplicates', null=True),
+        ),
+        migrations.CreateModel(
+            name='QuizQuestionBand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('band', models.PositiveSmallIntegerField()),
+                ('bucket', models.BigIntegerField(db_index=True)),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lsh_bands', to='search_app.quizquestion')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('question', 'band'), name='unique_quiz_question_band')],
+            },
+        ),
+    ]
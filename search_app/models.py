@@ -1,5 +1,7 @@
 from django.db import models
 
+from .helpers import question_content_hash
+
 class Topic(models.Model):
     name = models.CharField(max_length=255, unique=True)
     content = models.TextField()
@@ -78,17 +80,69 @@ class QuizQuestion(models.Model):
     topic = models.ForeignKey(Topic, on_delete=models.CASCADE, related_name='questions')
     subtopic = models.CharField(max_length=255, blank=True)
     question_type = models.CharField(max_length=20, choices=QUESTION_TYPES)
-    question = models.TextField(unique=True)
+    question = models.TextField()
+    content_hash = models.CharField(max_length=64, editable=False, help_text="SHA-256 of the normalized question text")
     options = models.JSONField()  # Store as JSON array
     correct_answers = models.JSONField()  # Store as JSON array
     explanation = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     source = models.CharField(max_length=20, choices=[('gemini', 'Gemini'), ('manual', 'Manual')], default='gemini')
+    minhash_signature = models.JSONField(null=True, blank=True, editable=False, help_text="MinHash signature of the question text, see search_app.near_duplicates")
 
     class Meta:
         indexes = [
             models.Index(fields=['topic', 'subtopic', 'question_type']),
         ]
+        constraints = [
+            # A question is unique within its pool; the same text may exist in another topic or type
+            models.UniqueConstraint(
+                fields=['topic', 'subtopic', 'question_type', 'content_hash'],
+                name='unique_quiz_question_per_pool',
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.content_hash = question_content_hash(self.question)
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.question[:50]}..."
+
+class QuizQuestionBand(models.Model):
+    """
+    One LSH band of a quiz question's MinHash signature. Questions of a pool that share a bucket
+    are near-duplicate candidates; the bucket hash includes the pool, so one indexed lookup finds them.
+    """
+    question = models.ForeignKey(QuizQuestion, on_delete=models.CASCADE, related_name='lsh_bands')
+    band = models.PositiveSmallIntegerField()
+    bucket = models.BigIntegerField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['question', 'band'], name='unique_quiz_question_band'),
+        ]
+
+    def __str__(self):
+        return f"question {self.question_id} band {self.band}"
+
+class TopicAlias(models.Model):
+    """Maps a normalized search prompt to its canonical Topic, or to a cached negative verdict."""
+    VERDICT_TOPIC = 'topic'
+    VERDICT_NOT_RELEVANT = 'not a relevant topic'
+    VERDICT_NOT_ENOUGH_INFORMATION = 'not enough information'
+    VERDICTS = [
+        (VERDICT_TOPIC, 'Topic'),
+        (VERDICT_NOT_RELEVANT, 'Not a relevant topic'),
+        (VERDICT_NOT_ENOUGH_INFORMATION, 'Not enough information'),
+    ]
+
+    prompt_hash = models.CharField(max_length=64, unique=True, help_text="SHA-256 of the normalized prompt")
+    normalized_prompt = models.TextField()
+    topic = models.ForeignKey(Topic, on_delete=models.CASCADE, related_name='aliases', null=True, blank=True)
+    verdict = models.CharField(max_length=32, choices=VERDICTS, default=VERDICT_TOPIC)
+    expires_at = models.DateTimeField(null=True, blank=True, help_text="Negative verdicts stop applying after this time")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
-        return f"{self.question[:50]}..."
\ No newline at end of file
+        return f"{self.normalized_prompt[:50]} -> {self.topic.name if self.topic_id else self.verdict}"
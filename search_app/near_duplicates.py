@@ -0,0 +1,197 @@
+import hashlib
+import logging
+import random
+import re
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import QuizQuestion, QuizQuestionBand
+
+logger = logging.getLogger(__name__)
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+# Function words carry no meaning of their own: without them "What is a Python decorator?" and
+# "What is a decorator in Python?" shingle identically while "list" vs "tuple" questions stay apart
+_STOPWORDS = frozenset("""
+    a an the is are was were be been being am do does did of in on at to for from by with about as
+    into than then that this these those it its which what who whom whose when where why how
+    and or not no nor but if so can could should would will shall may might must following
+    there their they them you your we our i me my he she his her
+""".split())
+
+
+_whitespace_re = re.compile(r'\s+')
+# Sentence punctuation around a word; symbols inside or around code such as "a[1]", "x++" or "len()" are kept
+_SENTENCE_PUNCTUATION = '.,!?;:\'"`'
+
+
+def shingles(text):
+    """
+    The set of meaningful words of a question, the unit MinHash estimates Jaccard similarity over.
+    Code symbols are part of the words, so "a[1]" and "a(1)" are different shingles.
+    """
+    words = [word.strip(_SENTENCE_PUNCTUATION) for word in _whitespace_re.split((text or '').casefold())]
+    words = [word for word in words if word]
+    return {word for word in words if word not in _STOPWORDS} or set(words)
+
+
+class MinHasher:
+    """
+    Computes MinHash signatures: num_perm minimum values of independent hash permutations of a
+    shingle set. The fraction of positions two signatures agree on estimates the Jaccard
+    similarity of the sets. The seed is fixed so signatures are comparable across processes.
+    """
+
+    def __init__(self, num_perm=None, seed=1):
+        self.num_perm = num_perm or settings.QUIZ_MINHASH_PERMUTATIONS
+        rng = random.Random(seed)
+        self._permutations = [
+            (rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME)) for _ in range(self.num_perm)
+        ]
+
+    def signature(self, text):
+        """Returns the signature tuple of text, or None if it has no words at all."""
+        tokens = shingles(text)
+        if not tokens:
+            return None
+        hashes = [int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest(), 'big') for token in tokens]
+        return tuple(
+            min((a * h + b) % _MERSENNE_PRIME for h in hashes) & _MAX_HASH
+            for a, b in self._permutations
+        )
+
+
+def estimated_similarity(signature, other):
+    return sum(1 for x, y in zip(signature, other) if x == y) / len(signature)
+
+
+class NearDuplicateIndex:
+    """
+    LSH index over MinHash signatures.
+
+    Each signature is cut into `bands` bands of num_perm/bands rows; two questions become
+    candidates when any whole band matches, and a candidate is reported as a near-duplicate only
+    if its estimated Jaccard similarity reaches `threshold`. Lookups therefore touch a handful of
+    buckets instead of every question in the pool. This is the in-memory index, used within a batch;
+    stored questions are indexed in the QuizQuestionBand table (see load_pool_candidates).
+    """
+
+    def __init__(self, threshold=None, num_perm=None, bands=None):
+        self.threshold = threshold if threshold is not None else settings.QUIZ_NEAR_DUPLICATE_THRESHOLD
+        self.num_perm = num_perm or settings.QUIZ_MINHASH_PERMUTATIONS
+        self.bands = bands or settings.QUIZ_LSH_BANDS
+        if self.num_perm % self.bands:
+            raise ValueError(f"QUIZ_LSH_BANDS ({self.bands}) must divide QUIZ_MINHASH_PERMUTATIONS ({self.num_perm})")
+        self.rows = self.num_perm // self.bands
+        self.signatures = {}
+        self.buckets = [{} for _ in range(self.bands)]
+
+    def __len__(self):
+        return len(self.signatures)
+
+    def _band_keys(self, signature):
+        for band in range(self.bands):
+            yield band, tuple(signature[band * self.rows:(band + 1) * self.rows])
+
+    def add(self, key, signature):
+        if signature is None or key in self.signatures:
+            return
+        self.signatures[key] = signature
+        for band, band_key in self._band_keys(signature):
+            self.buckets[band].setdefault(band_key, []).append(key)
+
+    def query(self, signature):
+        """Returns (key, similarity) of the most similar indexed question at or above threshold, or None."""
+        if signature is None:
+            return None
+        candidates = set()
+        for band, band_key in self._band_keys(signature):
+            candidates.update(self.buckets[band].get(band_key, ()))
+        best = None
+        for key in candidates:
+            if len(self.signatures[key]) != len(signature):
+                # Stored before QUIZ_MINHASH_PERMUTATIONS changed; rebuild_quiz_lsh_index refreshes it
+                continue
+            similarity = estimated_similarity(signature, self.signatures[key])
+            if similarity >= self.threshold and (best is None or similarity > best[1]):
+                best = (key, similarity)
+        return best
+
+
+minhasher = MinHasher()
+
+
+def pool_buckets(topic_id, subtopic, question_type, signature, bands=None):
+    """
+    The (band, bucket) pairs a signature is stored under in QuizQuestionBand. Buckets are signed
+    64-bit digests of the pool and the band's rows, stable across processes and Python versions.
+    """
+    bands = bands or settings.QUIZ_LSH_BANDS
+    rows = len(signature) // bands
+    pool = f"{topic_id}:{question_type}:{subtopic}"
+    for band in range(bands):
+        band_rows = ','.join(str(value) for value in signature[band * rows:(band + 1) * rows])
+        digest = hashlib.blake2b(f"{pool}:{band}:{band_rows}".encode('utf-8'), digest_size=8).digest()
+        yield band, int.from_bytes(digest, 'big', signed=True)
+
+
+def load_pool_candidates(topic_id, subtopic, question_type, signatures):
+    """
+    An in-memory index of the stored questions of a pool that share an LSH bucket with any of
+    signatures, loaded in one query. Querying it answers whether a signature near-duplicates a
+    stored question without reading the rest of the pool.
+    """
+    index = NearDuplicateIndex()
+    buckets = {
+        bucket
+        for signature in signatures if signature is not None
+        for _, bucket in pool_buckets(topic_id, subtopic, question_type, signature, index.bands)
+    }
+    if not buckets:
+        return index
+    candidates = (
+        QuizQuestion.objects.filter(lsh_bands__bucket__in=buckets, minhash_signature__isnull=False)
+        .distinct().values_list('id', 'minhash_signature')
+    )
+    for question_id, signature in candidates:
+        index.add(question_id, tuple(signature))
+    return index
+
+
+def index_questions(questions):
+    """
+    Stores the LSH bands of saved questions that carry a minhash_signature. Every question gets its
+    own rows, so concurrent inserts into one pool never overwrite each other's index entries.
+    """
+    bands = [
+        QuizQuestionBand(question_id=question.id, band=band, bucket=bucket)
+        for question in questions if question.minhash_signature
+        for band, bucket in pool_buckets(question.topic_id, question.subtopic, question.question_type, question.minhash_signature)
+    ]
+    QuizQuestionBand.objects.bulk_create(bands, ignore_conflicts=True, batch_size=1000)
+
+
+def rebuild_pool_index(topic_id, subtopic, question_type):
+    """
+    Recomputes the signatures and bands of every question of one pool, e.g. for questions stored
+    before the index existed or after the MinHash settings changed. Reads the whole pool, so it
+    is only run by the rebuild_quiz_lsh_index command, never on a request.
+
+    Returns:
+        {question_id: signature} of the pool's indexed questions.
+    """
+    pool = QuizQuestion.objects.filter(topic_id=topic_id, subtopic=subtopic, question_type=question_type)
+    questions = list(
+        pool.only('id', 'topic_id', 'subtopic', 'question_type', 'question', 'minhash_signature')
+    )
+    for question in questions:
+        signature = minhasher.signature(question.question)
+        question.minhash_signature = list(signature) if signature is not None else None
+    with transaction.atomic():
+        QuizQuestionBand.objects.filter(question__in=pool).delete()
+        QuizQuestion.objects.bulk_update(questions, ['minhash_signature'], batch_size=1000)
+        index_questions(questions)
+    return {question.id: tuple(question.minhash_signature) for question in questions if question.minhash_signature}
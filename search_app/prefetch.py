@@ -0,0 +1,69 @@
+import json
+import logging
+
+from django.conf import settings
+from jobs.models import Job
+from jobs.queue import enqueue
+
+from .quiz_generation import quiz_pool_manager
+
+logger = logging.getLogger(__name__)
+
+
+def roadmap_subtopics(content):
+    """Names of the subtopics listed in a topic's generated content, in roadmap order."""
+    try:
+        data = json.loads(content) if isinstance(content, str) else content
+        sections = data.get(data.get('topic')) or next(v for k, v in data.items() if k != 'topic' and isinstance(v, dict))
+        subtopics = sections['SubTopics']['Description']['subtopics']
+    except (ValueError, TypeError, KeyError, AttributeError, StopIteration):
+        return []
+    names = []
+    for subtopic in subtopics:
+        name = subtopic.get('name') if isinstance(subtopic, dict) else None
+        if isinstance(name, str) and name.strip() and name.strip() not in names:
+            names.append(name.strip())
+    return names
+
+
+def schedule_subtopic_prefetch(topic, max_subtopics=None, quiz_questions=None):
+    """
+    Speculatively queues generation of the first subtopics of a newly created topic.
+
+    For the first max_subtopics roadmap subtopics, low-priority jobs generate their articles
+    and documentation in batched calls, plus the videos and a starter pool of quiz_questions
+    mcq questions of each, so the subtopic page loads from the database on first click. Jobs are deduplicated, and
+    user-facing work (priority normal or high) always runs first.
+
+    Returns:
+        The number of jobs queued.
+    """
+    max_subtopics = settings.TOPIC_PREFETCH_SUBTOPICS if max_subtopics is None else max_subtopics
+    quiz_questions = settings.TOPIC_PREFETCH_QUIZ_QUESTIONS if quiz_questions is None else quiz_questions
+    subtopics = roadmap_subtopics(topic.content)[:max_subtopics]
+    queued = 0
+    try:
+        if subtopics:
+            # Articles and documentation of every subtopic come from batched Gemini calls
+            enqueue(
+                'generate_subtopic_resources',
+                {'topic_id': topic.id, 'subtopics': subtopics},
+                priority=Job.PRIORITY_LOW,
+            )
+            queued += 1
+        for subtopic in subtopics:
+            enqueue(
+                'generate_resources',
+                {'kind': 'videos', 'topic_id': topic.id, 'subtopic': subtopic},
+                priority=Job.PRIORITY_LOW,
+            )
+            queued += 1
+            if quiz_questions:
+                quiz_pool_manager.request_top_up(topic, subtopic, 'mcq', num_questions=quiz_questions, priority=Job.PRIORITY_LOW)
+                queued += 1
+    except Exception as e:
+        # Prefetching is best-effort: never fail the request that created the topic
+        logger.error(f"Error queueing prefetch jobs for {topic.name}: {e}")
+    if queued:
+        logger.info(f"Queued {queued} prefetch jobs for {len(subtopics)} subtopics of {topic.name}")
+    return queued
@@ -0,0 +1,303 @@
+import logging
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import transaction
+from jobs.models import Job
+from jobs.queue import enqueue
+
+from .gemini_client import call_gemini_model, stream_gemini_model
+from .helpers import question_content_hash
+from .json_stream import IncrementalJSONScanner
+from .quiz_parsing import QUIZ_RESPONSE_SCHEMA, load_quiz_json, parse_quiz_response, validate_question
+from .quiz_pool import (
+    DeferredPoolIndex,
+    mark_questions_seen,
+    pool_question_ids,
+    sample_pool_questions,
+    seen_question_ids,
+    store_quiz_questions,
+    unseen_pool_questions,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class QuizGenerationError(Exception):
+    """Raised when every chunk of a quiz failed to generate."""
+
+
+def build_quiz_prompt(topic_name, subtopic, question_type, num_questions, part=1, parts=1):
+    prompt = f"""
+                Create a quiz on the {'subtopic of ' + subtopic + ' within the broader topic of ' if subtopic else 'topic of '}{topic_name}.
+                The quiz should consist of {num_questions} questions.
+                All questions should be of type '{question_type}'.
+                There should be only 4 options for mcq type and multiple-correct type questions and only 2 options for true-false type questions.
+                There should be only 1 correct answer for true-false type and mcq type questions and 1 or more correct answers for multiple-correct type questions.
+                For each question, provide:
+                    type: string;
+                    question: string;
+                    options: string[];
+                    correct_answers: number[];
+                    explanation: string;
+
+                Return the quiz in JSON format with a "quiz" key containing an array of questions.
+            """
+    if parts > 1:
+        # Chunks are generated independently; steer each one to a different slice of the material
+        prompt += f"""
+                This is part {part} of {parts} of a larger quiz. Split the material into {parts} parts ordered from
+                fundamentals (part 1) to the most advanced aspects (part {parts}) and only ask about part {part}.
+            """
+    return prompt
+
+
+def _chunk_sizes(num_questions, chunk_size):
+    return [min(chunk_size, num_questions - start) for start in range(0, num_questions, chunk_size)]
+
+
+def _generate_chunk(topic_name, subtopic, question_type, count, part, parts, model_call):
+    prompt = build_quiz_prompt(topic_name, subtopic, question_type, count, part, parts)
+    response_text = model_call(prompt, model_name="gemini-2.0-flash", response_schema=QUIZ_RESPONSE_SCHEMA)
+    # Parsed and validated per question: one malformed question no longer fails the whole quiz
+    return parse_quiz_response(response_text, question_type)
+
+
+def generate_quiz_question_data(topic_name, subtopic, question_type, num_questions, model_call=None, chunk_size=None, max_workers=None):
+    """
+    Generates num_questions validated question dicts, without storing them.
+
+    Requests are split into chunks of at most chunk_size questions generated concurrently, so a
+    large quiz takes about as long as one small chunk and no single generation runs into the
+    output token limit. Questions repeated across chunks (same normalized text) are dropped.
+    A chunk that fails is logged and skipped, so the result may hold fewer questions than asked.
+
+    Raises:
+        QuizGenerationError: if every chunk failed.
+    """
+    model_call = model_call or call_gemini_model
+    sizes = _chunk_sizes(num_questions, chunk_size or settings.QUIZ_CHUNK_SIZE)
+    if not sizes:
+        return []
+    with ThreadPoolExecutor(max_workers=min(len(sizes), max_workers or settings.QUIZ_CHUNK_WORKERS)) as executor:
+        futures = [
+            executor.submit(_generate_chunk, topic_name, subtopic, question_type, count, part, len(sizes), model_call)
+            for part, count in enumerate(sizes, start=1)
+        ]
+        questions = {}
+        failures = []
+        for future in futures:
+            try:
+                chunk = future.result()
+            except Exception as e:
+                failures.append(e)
+                logger.error(f"Quiz chunk for {topic_name}/{subtopic or '-'}/{question_type} failed: {e}")
+                continue
+            for question in chunk:
+                questions.setdefault(question_content_hash(question['question']), question)
+    if len(failures) == len(sizes):
+        raise QuizGenerationError(f"All {len(sizes)} quiz chunks failed: {failures[0]}")
+    return list(questions.values())[:num_questions]
+
+
+def generate_quiz_questions(topic, subtopic, question_type, num_questions):
+    """Generates up to num_questions questions with Gemini, stores them in the pool and returns them serialized."""
+    generated_questions = generate_quiz_question_data(topic.name, subtopic, question_type, num_questions)
+    # Store new questions in database and collect their IDs, in a constant number of queries
+    with transaction.atomic():
+        return store_quiz_questions(topic, subtopic, question_type, generated_questions)
+
+
+_CHUNK_DONE = object()
+
+
+class _ChunkFailed:
+    def __init__(self, error):
+        self.error = error
+
+
+def _stream_chunk(topic_name, subtopic, question_type, count, part, parts, stream_call, results):
+    """Streams one chunk, putting each raw question on results as soon as its JSON object is complete."""
+    prompt = build_quiz_prompt(topic_name, subtopic, question_type, count, part, parts)
+    scanner = IncrementalJSONScanner(container_depth=2)
+    emitted = 0
+    try:
+        for text in stream_call(prompt, model_name="gemini-2.0-flash", response_schema=QUIZ_RESPONSE_SCHEMA):
+            for _, question in scanner.feed(text):
+                emitted += 1
+                results.put(question)
+        if not emitted:
+            # Output the scanner could not split (e.g. wrapped in chatter): fall back to parsing it whole
+            data = load_quiz_json(scanner.text)
+            for question in (data.get('quiz', []) if isinstance(data, dict) else data):
+                results.put(question)
+    except Exception as e:
+        logger.error(f"Streamed quiz chunk for {topic_name}/{subtopic or '-'}/{question_type} failed: {e}")
+        results.put(_ChunkFailed(e))
+    finally:
+        results.put(_CHUNK_DONE)
+
+
+def stream_quiz_question_data(topic_name, subtopic, question_type, num_questions, stream_call=None, chunk_size=None, max_workers=None):
+    """
+    Streaming counterpart of generate_quiz_question_data: yields each validated question dict as
+    soon as it is complete in the output of any chunk, instead of after every chunk has finished.
+
+    Chunks stream concurrently on worker threads; validation and deduplication happen on the
+    consuming thread, so callers may touch the database between questions.
+
+    Raises:
+        QuizGenerationError: after the stream, if every chunk failed.
+    """
+    stream_call = stream_call or stream_gemini_model
+    sizes = _chunk_sizes(num_questions, chunk_size or settings.QUIZ_CHUNK_SIZE)
+    if not sizes:
+        return
+    results = queue.Queue()
+    executor = ThreadPoolExecutor(max_workers=min(len(sizes), max_workers or settings.QUIZ_CHUNK_WORKERS))
+    for part, count in enumerate(sizes, start=1):
+        executor.submit(_stream_chunk, topic_name, subtopic, question_type, count, part, len(sizes), stream_call, results)
+    finished = 0
+    failures = []
+    seen_hashes = set()
+    yielded = 0
+    try:
+        while finished < len(sizes):
+            item = results.get()
+            if item is _CHUNK_DONE:
+                finished += 1
+                continue
+            if isinstance(item, _ChunkFailed):
+                failures.append(item.error)
+                continue
+            question = validate_question(item, question_type)
+            if question is None:
+                logger.warning(f"Dropping invalid generated {question_type} question: {str(item)[:200]}")
+                continue
+            content_hash = question_content_hash(question['question'])
+            if content_hash in seen_hashes or yielded >= num_questions:
+                continue
+            seen_hashes.add(content_hash)
+            yielded += 1
+            yield question
+    finally:
+        # If the consumer stops early, chunks still running finish in the background and are discarded
+        executor.shutdown(wait=False)
+    if len(failures) == len(sizes):
+        raise QuizGenerationError(f"All {len(sizes)} quiz chunks failed: {failures[0]}")
+
+
+class QuizPoolManager:
+    """
+    Decides where each quiz comes from, per (topic, subtopic, question_type) pool.
+
+    A quiz is served from the database whenever the pool holds enough questions, preferring
+    ones the user has not been served yet. When fewer than low_water unseen questions remain
+    for that user, a top-up job adding top_up_size questions to the pool is queued (at most
+    one pending per pool), so the next request is served from the database as well. A pool too
+    small for the quiz serves the questions the user has not seen as a partial quiz and queues a
+    high-priority top-up; Gemini is only called synchronously when the user has seen them all.
+    """
+
+    def __init__(self, low_water=None, top_up_size=None):
+        self.low_water = low_water if low_water is not None else settings.QUIZ_POOL_LOW_WATER
+        self.top_up_size = top_up_size or settings.QUIZ_POOL_TOP_UP_SIZE
+
+    def serve(self, topic, subtopic, question_type, num_questions, user_id):
+        """
+        Returns up to num_questions serialized questions; fewer is a partial quiz (the pool is still
+        being topped up, or generation came up short).
+
+        Raises:
+            QuizGenerationError: if the pool is empty and generating questions failed.
+        """
+        seen = seen_question_ids(user_id, topic.id, subtopic, question_type)
+        questions = sample_pool_questions(topic, subtopic, question_type, num_questions, exclude_ids=seen)
+        if questions is None:
+            pool_name = f"{topic.name}/{subtopic or '-'}/{question_type}"
+            questions = unseen_pool_questions(topic, subtopic, question_type, exclude_ids=seen)
+            shortfall = num_questions - len(questions)
+            if questions:
+                # Serve what the pool has now; the top-up fills it for the next quiz
+                logger.info(f"Quiz pool for {pool_name} is short by {shortfall}, serving a partial quiz")
+                self.request_top_up(topic, subtopic, question_type, max(self.top_up_size, shortfall), priority=Job.PRIORITY_HIGH)
+            else:
+                logger.info(f"Quiz pool for {pool_name} has no unseen questions, generating synchronously")
+                try:
+                    questions = generate_quiz_questions(topic, subtopic, question_type, num_questions)[:num_questions]
+                except QuizGenerationError as e:
+                    # Questions the user has already seen are better than no quiz at all
+                    questions = unseen_pool_questions(topic, subtopic, question_type)[:num_questions]
+                    if not questions:
+                        raise
+                    logger.error(f"Quiz generation for {pool_name} failed, serving seen questions: {e}")
+
+        served_ids = [question['id'] for question in questions]
+        mark_questions_seen(user_id, topic.id, subtopic, question_type, served_ids)
+        pool_ids = pool_question_ids(topic.id, subtopic, question_type)
+        unseen = len(set(pool_ids) - seen - set(served_ids))
+        if unseen < self.low_water:
+            self.request_top_up(topic, subtopic, question_type)
+        return questions
+
+    def serve_stream(self, topic, subtopic, question_type, num_questions, user_id):
+        """
+        Like serve(), but yields each serialized question as soon as it is available.
+
+        Pool questions are yielded straight away; generated ones are yielded one by one as they
+        are parsed from the streaming model output and stored, so each carries its stable id.
+        Their LSH bands are written once, when the stream ends. A generation failure ends the
+        stream early instead of raising: the generator then returns the error message, so the
+        caller can report a partial quiz.
+        """
+        seen = seen_question_ids(user_id, topic.id, subtopic, question_type)
+        served_ids = []
+        error = None
+        deferred_index = DeferredPoolIndex()
+        try:
+            questions = sample_pool_questions(topic, subtopic, question_type, num_questions, exclude_ids=seen)
+            if questions is None:
+                questions = unseen_pool_questions(topic, subtopic, question_type, exclude_ids=seen)
+            for question in questions:
+                served_ids.append(question['id'])
+                yield question
+            shortfall = num_questions - len(served_ids)
+            if shortfall > 0:
+                logger.info(f"Quiz pool for {topic.name}/{subtopic or '-'}/{question_type} is short by {shortfall}, streaming generation")
+                try:
+                    for generated in stream_quiz_question_data(topic.name, subtopic, question_type, shortfall):
+                        stored = store_quiz_questions(topic, subtopic, question_type, [generated], deferred_index=deferred_index)
+                        # A near-duplicate maps to a stored question, which may already be in this quiz
+                        for question in stored:
+                            if question['id'] not in served_ids and len(served_ids) < num_questions:
+                                served_ids.append(question['id'])
+                                yield question
+                except QuizGenerationError as e:
+                    logger.error(f"Streaming quiz generation for {topic.name}/{subtopic or '-'}/{question_type} failed: {e}")
+                    error = str(e)
+        finally:
+            deferred_index.flush()
+            mark_questions_seen(user_id, topic.id, subtopic, question_type, served_ids)
+        pool_ids = pool_question_ids(topic.id, subtopic, question_type)
+        if len(set(pool_ids) - seen - set(served_ids)) < self.low_water:
+            self.request_top_up(topic, subtopic, question_type)
+        return error
+
+    def request_top_up(self, topic, subtopic, question_type, num_questions=None, priority=Job.PRIORITY_NORMAL):
+        """Queues a background top-up of the pool (see search_app.tasks); a no-op while one is pending."""
+        return enqueue(
+            'top_up_quiz_pool',
+            {
+                'topic_id': topic.id,
+                'subtopic': subtopic,
+                'question_type': question_type,
+                'num_questions': num_questions or self.top_up_size,
+            },
+            # Keyed on the pool alone: one pending top-up per pool, whatever its size
+            key=f"top_up_quiz_pool:{topic.id}:{question_type}:{subtopic}"[:255],
+            priority=priority,
+        )
+
+
+quiz_pool_manager = QuizPoolManager()
@@ -0,0 +1,187 @@
+import ast
+import json
+import logging
+import re
+
+from google.genai import types
+
+try:
+    import orjson
+except ImportError:  # orjson is an optional speed-up; the stdlib parser gives the same result
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# Number of options each question type must have
+OPTION_COUNTS = {
+    'mcq': 4,
+    'multiple-correct': 4,
+    'true-false': 2,
+}
+
+_QUESTION_SCHEMA = types.Schema(
+    type='OBJECT',
+    properties={
+        'type': types.Schema(type='STRING'),
+        'question': types.Schema(type='STRING'),
+        'options': types.Schema(type='ARRAY', items=types.Schema(type='STRING')),
+        'correct_answers': types.Schema(type='ARRAY', items=types.Schema(type='INTEGER')),
+        'explanation': types.Schema(type='STRING'),
+    },
+    required=['type', 'question', 'options', 'correct_answers', 'explanation'],
+)
+
+# Passed to Gemini as response_schema so the model is constrained to emit this JSON shape
+QUIZ_RESPONSE_SCHEMA = types.Schema(
+    type='OBJECT',
+    properties={'quiz': types.Schema(type='ARRAY', items=_QUESTION_SCHEMA)},
+    required=['quiz'],
+)
+
+_fence_re = re.compile(r'^\s*```(?:json)?\s*|\s*```\s*$')
+
+
+def _loads(text):
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
+
+def _rewrite_outside_strings(text, rewrite_token):
+    """
+    Applies rewrite_token(token, next_char) to every bare word and punctuation mark outside JSON strings.
+    Returning None drops the token. String contents are copied untouched.
+    """
+    out = []
+    i = 0
+    length = len(text)
+    while i < length:
+        c = text[i]
+        if c in '"\'':
+            # Copy the whole string literal, honouring escapes
+            j = i + 1
+            while j < length and text[j] != c:
+                j += 2 if text[j] == '\\' else 1
+            out.append(text[i:j + 1])
+            i = j + 1
+        elif c.isalpha():
+            j = i
+            while j < length and (text[j].isalnum() or text[j] == '_'):
+                j += 1
+            out.append(rewrite_token(text[i:j], ''))
+            i = j
+        elif c == ',':
+            rest = text[i + 1:].lstrip()
+            replaced = rewrite_token(',', rest[:1])
+            if replaced is not None:
+                out.append(replaced)
+            i += 1
+        else:
+            out.append(c)
+            i += 1
+    return ''.join(out)
+
+
+def _drop_trailing_commas(text):
+    return _rewrite_outside_strings(text, lambda token, following: None if token == ',' and following in ('}', ']') else token)
+
+
+def _to_python_literals(text):
+    literals = {'true': 'True', 'false': 'False', 'null': 'None'}
+    return _rewrite_outside_strings(text, lambda token, following: literals.get(token, token))
+
+
+def load_quiz_json(text):
+    """
+    Parses model output into Python data without ever executing it.
+
+    Tries a strict (fast) JSON parse first, then a repair pass for the usual model slips: markdown
+    code fences, leading/trailing chatter, trailing commas, and Python-style output (single quotes,
+    True/False/None), the last of which is read with ast.literal_eval.
+
+    Raises:
+        ValueError: if the text cannot be repaired into a JSON-like value.
+    """
+    try:
+        return _loads(text)
+    except ValueError:
+        pass
+    repaired = _fence_re.sub('', text.strip())
+    starts = [i for i in (repaired.find('{'), repaired.find('[')) if i != -1]
+    if starts:
+        repaired = repaired[min(starts):max(repaired.rfind('}'), repaired.rfind(']')) + 1]
+    repaired = _drop_trailing_commas(repaired)
+    try:
+        return _loads(repaired)
+    except ValueError:
+        pass
+    try:
+        return ast.literal_eval(_to_python_literals(repaired))
+    except (ValueError, SyntaxError) as e:
+        raise ValueError(f"Unparseable quiz output: {e}") from e
+
+
+def validate_question(question, question_type):
+    """
+    Returns a cleaned copy of one generated question, or None if it is unusable.
+
+    mcq and multiple-correct questions need 4 options, true-false needs 2; mcq and true-false have
+    exactly one correct answer, multiple-correct at least one; every index must point at an option.
+    """
+    if not isinstance(question, dict):
+        return None
+    text = question.get('question')
+    options = question.get('options')
+    correct_answers = question.get('correct_answers')
+    explanation = question.get('explanation', '')
+    if not isinstance(text, str) or not text.strip():
+        return None
+    if not isinstance(options, list) or len(options) != OPTION_COUNTS.get(question_type):
+        return None
+    if not all(isinstance(option, (str, int, float)) for option in options):
+        return None
+    if isinstance(correct_answers, int):
+        correct_answers = [correct_answers]
+    if not isinstance(correct_answers, list) or not correct_answers:
+        return None
+    try:
+        correct_answers = [int(answer) for answer in correct_answers]
+    except (TypeError, ValueError):
+        return None
+    if len(set(correct_answers)) != len(correct_answers):
+        return None
+    if any(answer < 0 or answer >= len(options) for answer in correct_answers):
+        return None
+    if question_type in ('mcq', 'true-false') and len(correct_answers) != 1:
+        return None
+    return {
+        'type': question_type,
+        'question': text.strip(),
+        'options': [str(option) for option in options],
+        'correct_answers': correct_answers,
+        'explanation': explanation if isinstance(explanation, str) else str(explanation),
+    }
+
+
+def parse_quiz_response(text, question_type):
+    """
+    Parses and validates a generated quiz, dropping invalid questions individually.
+
+    Returns:
+        A list of cleaned question dicts (possibly empty).
+
+    Raises:
+        ValueError: if the output as a whole cannot be parsed.
+    """
+    data = load_quiz_json(text)
+    questions = data.get('quiz', []) if isinstance(data, dict) else data
+    if not isinstance(questions, list):
+        raise ValueError("Quiz output has no list of questions")
+    valid = []
+    for question in questions:
+        cleaned = validate_question(question, question_type)
+        if cleaned is None:
+            logger.warning(f"Dropping invalid generated {question_type} question: {str(question)[:200]}")
+            continue
+        valid.append(cleaned)
+    return valid
@@ -0,0 +1,231 @@
+import hashlib
+import logging
+import random
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .helpers import question_content_hash
+from .models import QuizQuestion
+from .near_duplicates import NearDuplicateIndex, index_questions, load_pool_candidates, minhasher
+
+logger = logging.getLogger(__name__)
+
+
+def serialize_question(question):
+    """The quiz payload shape returned to the frontend for one QuizQuestion."""
+    return {
+        'id': question.id,
+        'type': question.question_type,
+        'question': question.question,
+        'options': question.options,
+        'correct_answers': question.correct_answers,
+        'explanation': question.explanation,
+    }
+
+
+def _pool_ids_cache_key(topic_id, subtopic, question_type):
+    subtopic_digest = hashlib.sha256(subtopic.encode('utf-8')).hexdigest()[:16]
+    return f"quiz_pool_ids:{topic_id}:{question_type}:{subtopic_digest}"
+
+
+def pool_question_ids(topic_id, subtopic, question_type):
+    """IDs of every question in a (topic, subtopic, question_type) pool, cached until the pool changes."""
+    cache_key = _pool_ids_cache_key(topic_id, subtopic, question_type)
+    ids = cache.get(cache_key)
+    if ids is None:
+        ids = list(QuizQuestion.objects.filter(
+            topic_id=topic_id, subtopic=subtopic, question_type=question_type
+        ).order_by('id').values_list('id', flat=True))
+        cache.set(cache_key, ids, timeout=settings.QUIZ_POOL_IDS_TTL)
+    return ids
+
+
+def invalidate_pool(topic_id, subtopic, question_type):
+    cache.delete(_pool_ids_cache_key(topic_id, subtopic, question_type))
+
+
+def sample_pool_questions(topic, subtopic, question_type, num_questions, exclude_ids=()):
+    """
+    Picks num_questions random questions from a pool without loading the whole pool.
+
+    Sampling happens on the cached ID list; only the chosen rows are fetched, in one query.
+    Questions in exclude_ids (e.g. already seen by the user) are only picked when there are
+    not enough others.
+
+    Returns:
+        The serialized questions, or None if the pool has fewer than num_questions.
+    """
+    excluded = set(exclude_ids)
+    for _ in range(2):
+        ids = pool_question_ids(topic.id, subtopic, question_type)
+        if len(ids) < num_questions:
+            return None
+        fresh = [question_id for question_id in ids if question_id not in excluded]
+        if len(fresh) >= num_questions:
+            chosen = random.sample(fresh, num_questions)
+        else:
+            seen = [question_id for question_id in ids if question_id in excluded]
+            chosen = fresh + random.sample(seen, num_questions - len(fresh))
+            random.shuffle(chosen)
+        rows = QuizQuestion.objects.in_bulk(chosen)
+        if len(rows) == len(chosen):
+            return [serialize_question(rows[question_id]) for question_id in chosen]
+        # Some questions were deleted behind the cache's back: reload the ID list and sample again
+        invalidate_pool(topic.id, subtopic, question_type)
+    return None
+
+
+def unseen_pool_questions(topic, subtopic, question_type, exclude_ids=()):
+    """Every question of a pool not in exclude_ids, serialized. Only meant for small pools."""
+    excluded = set(exclude_ids)
+    ids = [i for i in pool_question_ids(topic.id, subtopic, question_type) if i not in excluded]
+    rows = QuizQuestion.objects.in_bulk(ids)
+    return [serialize_question(rows[question_id]) for question_id in ids if question_id in rows]
+
+
+def _seen_cache_key(user_id, topic_id, subtopic, question_type):
+    subtopic_digest = hashlib.sha256(subtopic.encode('utf-8')).hexdigest()[:16]
+    return f"quiz_seen:{user_id}:{topic_id}:{question_type}:{subtopic_digest}"
+
+
+def seen_question_ids(user_id, topic_id, subtopic, question_type):
+    """IDs of the pool's questions already served to user_id."""
+    return set(cache.get(_seen_cache_key(user_id, topic_id, subtopic, question_type), ()))
+
+
+def mark_questions_seen(user_id, topic_id, subtopic, question_type, question_ids):
+    cache_key = _seen_cache_key(user_id, topic_id, subtopic, question_type)
+    seen = set(cache.get(cache_key, ()))
+    seen.update(question_ids)
+    cache.set(cache_key, sorted(seen), timeout=settings.QUIZ_SEEN_TTL)
+
+
+class DeferredPoolIndex:
+    """
+    Collects the LSH bands of questions stored one at a time (e.g. while a quiz streams) so they
+    are written in one bulk insert by flush(). Until then, its in-memory index lets later questions
+    of the same stream be checked against the earlier ones.
+    """
+
+    def __init__(self):
+        self.index = NearDuplicateIndex()
+        self.questions = []
+
+    def add(self, question):
+        if question.minhash_signature:
+            self.index.add(question.id, tuple(question.minhash_signature))
+        self.questions.append(question)
+
+    def flush(self):
+        index_questions(self.questions)
+        self.questions = []
+
+
+def store_quiz_questions(topic, subtopic, question_type, questions, deferred_index=None):
+    """
+    Stores generated questions in bulk, reusing rows that already exist.
+
+    Runs a constant number of queries whatever len(questions) is: one lookup of existing rows,
+    one of near-duplicate candidates, one bulk_create of the new ones (conflicts on the pool's
+    unique content_hash are ignored, so a concurrent insert of the same question is harmless), one
+    read-back for their IDs and one bulk_create of their LSH bands.
+    Lookups only see the pool (topic, subtopic, question_type): a row of another pool has other
+    options and answers and is never reused. Questions are matched on their normalized content hash, so "What is Python?" and
+    "what is python ?" are the same row. Rewordings that survive the hash are caught by the
+    pool's MinHash/LSH index (QuizQuestionBand rows): a question that near-duplicates a stored
+    one reuses that row, and one that near-duplicates an earlier question of the batch is dropped.
+
+    Args:
+        topic: The Topic the questions belong to.
+        subtopic: Subtopic name, '' for the topic itself.
+        question_type: One of QuizQuestion.QUESTION_TYPES.
+        questions: Validated question dicts with question/options/correct_answers/explanation.
+        deferred_index: Optional DeferredPoolIndex collecting the new questions' bands instead
+            of writing them now; the caller flushes it once it is done storing.
+
+    Returns:
+        Serialized questions with stable IDs, in the order they were generated. Repeats within
+        the batch are returned once.
+    """
+    unique = {}
+    for question in questions:
+        unique.setdefault(question_content_hash(question['question']), question)
+    if not unique:
+        return []
+
+    pool = QuizQuestion.objects.filter(topic=topic, subtopic=subtopic, question_type=question_type)
+    stored = {q.content_hash: q for q in pool.filter(content_hash__in=list(unique))}
+
+    signatures = {
+        content_hash: minhasher.signature(question['question'])
+        for content_hash, question in unique.items() if content_hash not in stored
+    }
+    pool_index = load_pool_candidates(topic.id, subtopic, question_type, signatures.values())
+    batch_index = NearDuplicateIndex()
+    near_duplicates = {}
+    for content_hash, signature in signatures.items():
+        question = unique[content_hash]
+        match = pool_index.query(signature)
+        if match is None and deferred_index is not None:
+            match = deferred_index.index.query(signature)
+        if match is not None:
+            near_duplicates[content_hash] = match[0]
+            logger.info(f"Generated question is a near-duplicate (similarity {match[1]:.2f}) of question {match[0]}: {question['question'][:50]}")
+            continue
+        match = batch_index.query(signature)
+        if match is not None:
+            near_duplicates[content_hash] = None
+            logger.info(f"Dropping generated question that near-duplicates another in its batch: {question['question'][:50]}")
+            continue
+        batch_index.add(content_hash, signature)
+    if near_duplicates:
+        matched = QuizQuestion.objects.in_bulk([i for i in near_duplicates.values() if i is not None])
+        for content_hash, question_id in near_duplicates.items():
+            # A stale index entry (question since deleted) leaves the question out rather than failing
+            if question_id in matched:
+                stored[content_hash] = matched[question_id]
+
+    new_questions = [
+        QuizQuestion(
+            topic=topic,
+            subtopic=subtopic,
+            question_type=question_type,
+            question=question['question'],
+            content_hash=content_hash,
+            options=question['options'],
+            correct_answers=question['correct_answers'],
+            explanation=question['explanation'],
+            source='gemini',
+            minhash_signature=list(signatures[content_hash]) if signatures[content_hash] is not None else None,
+        )
+        for content_hash, question in unique.items() if content_hash not in stored and content_hash not in near_duplicates
+    ]
+    if new_questions:
+        with transaction.atomic():
+            QuizQuestion.objects.bulk_create(new_questions, ignore_conflicts=True)
+            # ignore_conflicts leaves primary keys unset, so read the new rows back in one query
+            new_hashes = [question.content_hash for question in new_questions]
+            created = {q.content_hash: q for q in pool.filter(content_hash__in=new_hashes)}
+            if deferred_index is None:
+                index_questions(created.values())
+            else:
+                for row in created.values():
+                    deferred_index.add(row)
+        stored.update(created)
+        invalidate_pool(topic.id, subtopic, question_type)
+
+    result = []
+    seen_ids = set()
+    for content_hash, question in unique.items():
+        row = stored.get(content_hash)
+        if row is None:
+            if content_hash not in near_duplicates:
+                logger.warning(f"Generated question could not be stored: {question['question'][:50]}")
+            continue
+        if row.id in seen_ids:
+            continue
+        seen_ids.add(row.id)
+        result.append(serialize_question(row))
+    return result
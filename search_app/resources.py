@@ -0,0 +1,349 @@
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import transaction
+from google.genai import types
+
+from .gemini_client import call_gemini_model
+from .helpers import normalize_topic_name
+from .models import ArticleResource, DocumentationResource, VideoResource
+from .youtube_api import search_youtube
+
+logger = logging.getLogger(__name__)
+
+# Learning resources of a topic or subtopic. Each kind is generated in two steps: fetch_* talks to the
+# external API and touches no database, save_* stores the result. Keeping them apart lets the slow part
+# run anywhere (a worker, a thread pool) while writes stay short and on the caller's thread.
+
+
+def _subject(topic_name, subtopic):
+    return f'{topic_name} {subtopic}' if subtopic else topic_name
+
+
+def serialize_video(video):
+    return {
+        'title': video.title,
+        'url': video.url,
+        'duration': video.duration,
+        'thumbnail': video.thumbnail
+    }
+
+
+def serialize_article(article):
+    return {
+        'title': article.title,
+        'url': article.url,
+        'readTime': article.read_time
+    }
+
+
+def serialize_documentation(doc):
+    return {
+        'title': doc.title,
+        'url': doc.url,
+        'type': doc.doc_type
+    }
+
+
+def stored_videos(topic, subtopic):
+    return [serialize_video(video) for video in VideoResource.objects.filter(topic=topic, subtopic=subtopic)]
+
+
+def stored_articles(topic, subtopic):
+    return [serialize_article(article) for article in ArticleResource.objects.filter(topic=topic, subtopic=subtopic)]
+
+
+def stored_documentation(topic, subtopic):
+    return [serialize_documentation(doc) for doc in DocumentationResource.objects.filter(topic=topic, subtopic=subtopic)]
+
+
+def fetch_videos(topic_name, subtopic):
+    """Searches YouTube for the top 2 tutorials. Returns video dicts, empty if the search failed."""
+    youtube_prompt = f"{_subject(topic_name, subtopic)} tutorial"
+    youtube_results = search_youtube(youtube_prompt, max_results=2)
+    videos = []
+    for video in (youtube_results or [])[:2]:  # Get top 2 videos
+        video_url = video.get('url', '')
+        video_id = video_url.split('v=')[-1] if 'v=' in video_url else ''
+        videos.append({
+            'title': video.get('title', ''),
+            'url': video_url,
+            'duration': video.get('duration', ''),
+            'thumbnail': f"https://img.youtube.com/vi/{video_id}/maxresdefault.jpg" if video_id else ''
+        })
+    return videos
+
+
+def fetch_articles(topic_name, subtopic):
+    """Asks Gemini for 2 beginner-friendly articles. Returns their dicts as generated."""
+    gemini_prompt = f"""
+                Generate 2 high-quality, beginner-friendly articles about {_subject(topic_name, subtopic)}.
+                Return a JSON array with the following structure for each article:
+                {{
+                    "title": "article title",
+                    "url": "article url",
+                    "readTime": "estimated read time"
+                }}
+
+                Make sure all URLs are valid and accessible.
+            """
+    return json.loads(call_gemini_model(gemini_prompt))
+
+
+def fetch_documentation(topic_name, subtopic):
+    """Asks Gemini for 2 documentation sources. Returns their dicts as generated."""
+    gemini_prompt = f"""
+                Generate 2 official or widely recognized documentation sources for {_subject(topic_name, subtopic)}.
+                Return a JSON array with the following structure for each documentation:
+                {{
+                    "title": "documentation title",
+                    "url": "documentation url",
+                    "type": "documentation type"
+                }}
+
+                Make sure all URLs are valid and accessible.
+            """
+    return json.loads(call_gemini_model(gemini_prompt))
+
+
+def save_videos(topic, subtopic, videos):
+    with transaction.atomic():
+        for video_data in videos:
+            VideoResource.objects.create(topic=topic, subtopic=subtopic, **video_data)
+    return videos
+
+
+def save_articles(topic, subtopic, articles_data):
+    articles = []
+    with transaction.atomic():
+        for article_data in articles_data:
+            article = ArticleResource.objects.create(
+                topic=topic,
+                subtopic=subtopic,
+                title=article_data['title'],
+                url=article_data['url'],
+                read_time=article_data['readTime']
+            )
+            articles.append(serialize_article(article))
+    return articles
+
+
+def save_documentation(topic, subtopic, docs_data):
+    documentation = []
+    with transaction.atomic():
+        for doc_data in docs_data:
+            doc = DocumentationResource.objects.create(
+                topic=topic,
+                subtopic=subtopic,
+                title=doc_data['title'],
+                url=doc_data['url'],
+                doc_type=doc_data['type']
+            )
+            documentation.append(serialize_documentation(doc))
+    return documentation
+
+
+# kind (also the key of the kind's list in API responses): (stored_*, fetch_*, save_*)
+RESOURCE_KINDS = {
+    'videos': (stored_videos, fetch_videos, save_videos),
+    'articles': (stored_articles, fetch_articles, save_articles),
+    'documentation': (stored_documentation, fetch_documentation, save_documentation),
+}
+
+
+def get_or_generate_resources(kind, topic, subtopic):
+    """Returns the stored resources of one kind, generating and storing them first if there are none."""
+    stored, fetch, save = RESOURCE_KINDS[kind]
+    resources = stored(topic, subtopic)
+    if resources:
+        return resources
+    return save(topic, subtopic, fetch(topic.name, subtopic))
+
+
+def get_or_generate_all_resources(topic, subtopic, kinds=None):
+    """
+    Returns every resource kind of a topic or subtopic in one call.
+
+    Stored kinds are read straight from their tables. The external lookups of missing kinds
+    (YouTube, Gemini) run concurrently, so a cold subtopic costs the slowest lookup rather
+    than the sum of all three; the results are then saved on the calling thread.
+
+    Returns:
+        (resources, errors): resources maps each kind to its list, errors maps a kind whose
+        lookup failed to the error message (its list is then empty).
+    """
+    kinds = list(kinds or RESOURCE_KINDS)
+    resources = {kind: RESOURCE_KINDS[kind][0](topic, subtopic) for kind in kinds}
+    missing = [kind for kind in kinds if not resources[kind]]
+    errors = {}
+    if not missing:
+        return resources, errors
+    with ThreadPoolExecutor(max_workers=len(missing)) as executor:
+        futures = {kind: executor.submit(RESOURCE_KINDS[kind][1], topic.name, subtopic) for kind in missing}
+        for kind, future in futures.items():
+            try:
+                fetched = future.result()
+            except Exception as e:
+                logger.error(f"Error generating {kind} for {topic.name}/{subtopic or '-'}: {e}")
+                errors[kind] = str(e)
+                continue
+            resources[kind] = RESOURCE_KINDS[kind][2](topic, subtopic, fetched)
+    return resources, errors
+
+
+_LINK_PROPERTIES = {'title': types.Schema(type='STRING'), 'url': types.Schema(type='STRING')}
+
+# One structured-output answer covering the articles and documentation of many subtopics
+SUBTOPIC_RESOURCES_SCHEMA = types.Schema(
+    type='OBJECT',
+    properties={
+        'subtopics': types.Schema(
+            type='ARRAY',
+            items=types.Schema(
+                type='OBJECT',
+                properties={
+                    'name': types.Schema(type='STRING'),
+                    'articles': types.Schema(type='ARRAY', items=types.Schema(
+                        type='OBJECT',
+                        properties={**_LINK_PROPERTIES, 'readTime': types.Schema(type='STRING')},
+                        required=['title', 'url', 'readTime'],
+                    )),
+                    'documentation': types.Schema(type='ARRAY', items=types.Schema(
+                        type='OBJECT',
+                        properties={**_LINK_PROPERTIES, 'type': types.Schema(type='STRING')},
+                        required=['title', 'url', 'type'],
+                    )),
+                },
+                required=['name', 'articles', 'documentation'],
+            ),
+        ),
+    },
+    required=['subtopics'],
+)
+
+
+def _max_length(model, field):
+    return model._meta.get_field(field).max_length
+
+
+def _valid_links(items, extra_field):
+    """
+    The first 2 well-formed, distinct links of a generated list; malformed and repeated entries are
+    dropped, and so are URLs too long for the url column, since a cut URL would be broken.
+    """
+    url_max_length = _max_length(ArticleResource, 'url')
+    valid = []
+    seen_urls = set()
+    for item in items if isinstance(items, list) else []:
+        if not isinstance(item, dict):
+            continue
+        title, url, extra = item.get('title'), item.get('url'), item.get(extra_field)
+        if not (isinstance(title, str) and title.strip() and isinstance(url, str) and url.startswith(('http://', 'https://'))):
+            continue
+        if len(url.strip()) > url_max_length:
+            continue
+        if url.strip() in seen_urls:
+            continue
+        seen_urls.add(url.strip())
+        valid.append({'title': title.strip(), 'url': url.strip(), extra_field: extra if isinstance(extra, str) else ''})
+    return valid[:2]
+
+
+def fetch_subtopic_resources_batch(topic_name, subtopics):
+    """
+    Asks Gemini for the articles and documentation of several subtopics in one structured-output call.
+
+    Returns:
+        {subtopic: {'articles': [...], 'documentation': [...]}} for the requested subtopics the
+        answer covered with valid links; subtopics missing or invalid in the answer are left out.
+    """
+    listed = "\n".join(f"- {subtopic}" for subtopic in subtopics)
+    gemini_prompt = f"""
+                For each of the following subtopics of {topic_name}:
+                {listed}
+
+                Generate 2 high-quality, beginner-friendly articles and 2 official or widely recognized
+                documentation sources. Return a JSON object with a "subtopics" array holding one entry per
+                subtopic, with "name" exactly as listed above, "articles" (each with "title", "url" and
+                "readTime" as the estimated read time) and "documentation" (each with "title", "url" and
+                "type" as the documentation type).
+
+                Make sure all URLs are valid and accessible.
+            """
+    data = json.loads(call_gemini_model(gemini_prompt, response_schema=SUBTOPIC_RESOURCES_SCHEMA))
+    requested = {normalize_topic_name(subtopic): subtopic for subtopic in subtopics}
+    batch = {}
+    for entry in data.get('subtopics', []) if isinstance(data, dict) else []:
+        if not isinstance(entry, dict):
+            continue
+        subtopic = requested.get(normalize_topic_name(entry.get('name') if isinstance(entry.get('name'), str) else ''))
+        if subtopic is None or subtopic in batch:
+            continue
+        articles = _valid_links(entry.get('articles'), 'readTime')
+        documentation = _valid_links(entry.get('documentation'), 'type')
+        if articles or documentation:
+            batch[subtopic] = {'articles': articles, 'documentation': documentation}
+    return batch
+
+
+def generate_subtopic_resources_batch(topic, subtopics, batch_size=None):
+    """
+    Generates the articles and documentation of many subtopics with one Gemini call per batch_size subtopics.
+
+    Subtopics that already have articles (or documentation) keep them; everything else is
+    inserted with one bulk_create per table. Rows whose (topic, subtopic, url) is already stored,
+    e.g. by a concurrent request for the same subtopic, are skipped. Titles, read times and
+    documentation types are cut to their column lengths, so one long value cannot fail the insert.
+
+    Returns:
+        {'calls': Gemini calls made, 'articles': rows generated, 'documentation': rows generated,
+         'missing': {'articles': [...], 'documentation': [...]}, the subtopics still without
+         resources of that kind because the answers did not cover them}
+    """
+    batch_size = batch_size or settings.RESOURCE_BATCH_SIZE
+    with_articles = set(ArticleResource.objects.filter(topic=topic, subtopic__in=subtopics).values_list('subtopic', flat=True))
+    with_docs = set(DocumentationResource.objects.filter(topic=topic, subtopic__in=subtopics).values_list('subtopic', flat=True))
+    pending = [subtopic for subtopic in dict.fromkeys(subtopics) if subtopic not in with_articles or subtopic not in with_docs]
+
+    articles, documentation = [], []
+    missing = {'articles': [], 'documentation': []}
+    calls = 0
+    for start in range(0, len(pending), batch_size):
+        chunk = pending[start:start + batch_size]
+        calls += 1
+        try:
+            batch = fetch_subtopic_resources_batch(topic.name, chunk)
+        except Exception as e:
+            logger.error(f"Error generating resources for {len(chunk)} subtopics of {topic.name}: {e}")
+            batch = {}
+        for subtopic in chunk:
+            generated = batch.get(subtopic, {'articles': [], 'documentation': []})
+            if subtopic not in with_articles:
+                if not generated['articles']:
+                    missing['articles'].append(subtopic)
+                articles.extend(
+                    ArticleResource(
+                        topic=topic, subtopic=subtopic, url=a['url'],
+                        title=a['title'][:_max_length(ArticleResource, 'title')],
+                        read_time=a['readTime'][:_max_length(ArticleResource, 'read_time')],
+                    )
+                    for a in generated['articles']
+                )
+            if subtopic not in with_docs:
+                if not generated['documentation']:
+                    missing['documentation'].append(subtopic)
+                documentation.extend(
+                    DocumentationResource(
+                        topic=topic, subtopic=subtopic, url=d['url'],
+                        title=d['title'][:_max_length(DocumentationResource, 'title')],
+                        doc_type=d['type'][:_max_length(DocumentationResource, 'doc_type')],
+                    )
+                    for d in generated['documentation']
+                )
+
+    with transaction.atomic():
+        ArticleResource.objects.bulk_create(articles, ignore_conflicts=True)
+        DocumentationResource.objects.bulk_create(documentation, ignore_conflicts=True)
+    return {'calls': calls, 'articles': len(articles), 'documentation': len(documentation), 'missing': missing}
@@ -0,0 +1,101 @@
+import hashlib
+import logging
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlightTimeout(Exception):
+    """Raised when a follower gives up waiting for the leader's result."""
+
+
+class SingleFlightError(Exception):
+    """Raised on followers when the leader failed to produce a result."""
+
+
+_UNSET = object()
+
+
+def _cache_keys(key):
+    # Hash the key so arbitrary user text is safe for every cache backend (memcached rejects spaces/long keys).
+    digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+    return f"singleflight:lock:{digest}", f"singleflight:result:{digest}"
+
+
+def acquire_leadership(key, lock_timeout=None):
+    """Tries to become the leader for key. Returns a lock token on success, None if someone else leads."""
+    lock_key, _ = _cache_keys(key)
+    token = uuid.uuid4().hex
+    if cache.add(lock_key, token, timeout=lock_timeout or settings.SINGLE_FLIGHT_LOCK_TIMEOUT):
+        logger.debug(f"single_flight leader for {key}")
+        return token
+    return None
+
+
+def publish_result(key, token, value=_UNSET, error=None, result_timeout=None):
+    """
+    Publishes the leader's outcome for key and releases its lock.
+
+    Pass error (an exception or message) instead of value when the work failed; followers then
+    raise SingleFlightError. With neither, the lock is just released and a follower takes over.
+    """
+    lock_key, result_key = _cache_keys(key)
+    # Publish before releasing the lock so no follower sees "no lock, no result" and re-runs the work
+    if error is not None:
+        # Keep the failure around briefly so followers fail fast instead of piling onto the API
+        cache.set(result_key, {'error': str(error)}, timeout=settings.SINGLE_FLIGHT_ERROR_TIMEOUT)
+    elif value is not _UNSET:
+        cache.set(result_key, {'value': value}, timeout=result_timeout or settings.SINGLE_FLIGHT_RESULT_TIMEOUT)
+    if cache.get(lock_key) == token:
+        cache.delete(lock_key)
+
+
+def single_flight(key, fn, lock_timeout=None, wait_timeout=None, result_timeout=None):
+    """
+    Runs fn() at most once at a time for the given key across all workers sharing the Django cache.
+
+    The first caller becomes the leader: it takes a lock with cache.add(), runs fn() and publishes the
+    result. Concurrent callers (followers) poll the cache for that result until wait_timeout expires.
+    If the leader dies without publishing, its lock expires after lock_timeout and a follower takes over.
+
+    Args:
+        key: Identifier of the work being coalesced, e.g. "topic:python".
+        fn: Zero-argument callable producing a cache-picklable result.
+        lock_timeout: Seconds the leader lock is held before it is considered abandoned.
+        wait_timeout: Seconds a follower waits for the result before raising SingleFlightTimeout.
+        result_timeout: Seconds the published result stays available to late followers.
+
+    Returns:
+        The value returned by fn(), either computed locally or by another worker.
+    """
+    wait_timeout = wait_timeout or settings.SINGLE_FLIGHT_WAIT_TIMEOUT
+    _, result_key = _cache_keys(key)
+
+    deadline = time.monotonic() + wait_timeout
+    delay = 0.05
+    while True:
+        published = cache.get(result_key)
+        if published is not None:
+            if 'error' in published:
+                raise SingleFlightError(published['error'])
+            return published['value']
+
+        token = acquire_leadership(key, lock_timeout)
+        if token is not None:
+            try:
+                value = fn()
+            except Exception as e:
+                publish_result(key, token, error=e)
+                raise
+            publish_result(key, token, value=value, result_timeout=result_timeout)
+            return value
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise SingleFlightTimeout(f"Timed out waiting for in-flight work on {key}")
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 2, 0.5)
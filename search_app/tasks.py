@@ -0,0 +1,69 @@
+import logging
+
+from jobs.models import Job
+from jobs.queue import enqueue, register
+
+from .models import Topic
+from .quiz_generation import generate_quiz_questions
+from .resources import generate_subtopic_resources_batch, get_or_generate_resources
+from .single_flight import single_flight
+from .topic_aliases import record_topic_alias
+from .topic_generation import generate_topic_content
+
+logger = logging.getLogger(__name__)
+
+# Background jobs of search_app, run by manage.py run_jobs. Handlers take and return JSON-friendly values.
+
+
+@register('generate_topic')
+def generate_topic(topic_name, search_query=''):
+    # Same single-flight key as search_gemini, so a request and a job never generate the same topic twice
+    single_flight(f"topic:{topic_name}", lambda: generate_topic_content(topic_name))
+    if search_query:
+        record_topic_alias(search_query, topic_name)
+    return {'topic': topic_name}
+
+
+@register('generate_resources')
+def generate_resources(kind, topic_id, subtopic=''):
+    topic = Topic.objects.get(id=topic_id)
+    return {'count': len(get_or_generate_resources(kind, topic, subtopic))}
+
+
+@register('generate_subtopic_resources')
+def generate_subtopic_resources(topic_id, subtopics):
+    topic = Topic.objects.get(id=topic_id)
+    outcome = generate_subtopic_resources_batch(topic, subtopics)
+    # Subtopics the batched answer skipped fall back to one job per missing kind
+    for kind, subtopics in outcome['missing'].items():
+        for subtopic in subtopics:
+            enqueue_resource_generation(kind, topic, subtopic, priority=Job.PRIORITY_LOW)
+    return outcome
+
+
+@register('top_up_quiz_pool')
+def top_up_quiz_pool(topic_id, subtopic, question_type, num_questions):
+    topic = Topic.objects.get(id=topic_id)
+    added = generate_quiz_questions(topic, subtopic, question_type, num_questions)
+    logger.info(f"Topped up quiz pool {topic.name}/{subtopic or '-'}/{question_type} with {len(added)} questions")
+    return {'count': len(added)}
+
+
+def enqueue_topic_generation(topic_name, search_query='', priority=Job.PRIORITY_HIGH, requested_by=None):
+    return enqueue(
+        'generate_topic',
+        {'topic_name': topic_name, 'search_query': search_query},
+        key=f"generate_topic:{topic_name}",
+        priority=priority,
+        requested_by=requested_by,
+    )
+
+
+def enqueue_resource_generation(kind, topic, subtopic, priority=Job.PRIORITY_NORMAL, requested_by=None):
+    return enqueue(
+        'generate_resources',
+        {'kind': kind, 'topic_id': topic.id, 'subtopic': subtopic},
+        priority=priority,
+        requested_by=requested_by,
+    )
+
@@ -1,3 +1,486 @@
-from django.test import TestCase
+import json
+import re
+import threading
+import time
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from jobs.models import Job
+
+from . import quiz_pool
+from .gemini_keys import GeminiKeyScheduler, NoGeminiKeyAvailable, key_id
+from .models import ArticleResource, QuizQuestion, QuizQuestionBand, Topic, TopicAlias
+from .near_duplicates import shingles
+from .quiz_parsing import load_quiz_json, validate_question
+from .prefetch import schedule_subtopic_prefetch
+from .quiz_generation import QuizGenerationError, QuizPoolManager
+from .quiz_pool import mark_questions_seen, store_quiz_questions
+from .resources import generate_subtopic_resources_batch
+from .single_flight import SingleFlightError, SingleFlightTimeout, acquire_leadership, publish_result, single_flight
+from .topic_aliases import record_topic_alias
+from .topic_generation import TOPIC_SECTIONS, section_key
+from .views import resolve_search_query, stream_quiz_ndjson, stream_topic_content
+from .youtube_api import VideoDetailsBatcher
+from .youtube_keys import YouTubeKeyManager, YouTubeQuotaExhausted
+
+
+def _question(**overrides):
+    question = {
+        'type': 'mcq',
+        'question': 'What does len([]) return?',
+        'options': ['0', '1', 'None', 'Error'],
+        'correct_answers': [0],
+        'explanation': 'An empty list has no items.',
+    }
+    question.update(overrides)
+    return question
+
+
+class LoadQuizJsonTests(SimpleTestCase):
+    def test_strict_json(self):
+        self.assertEqual(load_quiz_json('{"quiz": []}'), {'quiz': []})
+
+    def test_markdown_fence_and_chatter(self):
+        text = 'Here is your quiz:\n```json\n{"quiz": [{"question": "Q?"}]}\n```\nGood luck!'
+        self.assertEqual(load_quiz_json(text), {'quiz': [{'question': 'Q?'}]})
+
+    def test_trailing_commas(self):
+        self.assertEqual(load_quiz_json('{"quiz": [{"options": ["a", "b",],},],}'), {'quiz': [{'options': ['a', 'b']}]})
+
+    def test_trailing_comma_inside_string_is_kept(self):
+        self.assertEqual(load_quiz_json('{"q": "a,]", "o": [1,]}'), {'q': 'a,]', 'o': [1]})
+
+    def test_python_literals(self):
+        text = "{'quiz': [{'question': 'Is None falsy?', 'flag': True, 'other': None, 'no': false}]}"
+        self.assertEqual(
+            load_quiz_json(text),
+            {'quiz': [{'question': 'Is None falsy?', 'flag': True, 'other': None, 'no': False}]},
+        )
+
+    def test_code_is_never_executed(self):
+        with self.assertRaises(ValueError):
+            load_quiz_json('__import__("os").system("echo unsafe")')
+
+
+class ValidateQuestionTests(SimpleTestCase):
+    def test_valid_mcq(self):
+        cleaned = validate_question(_question(correct_answers=2), 'mcq')
+        self.assertEqual(cleaned['correct_answers'], [2])
+        self.assertEqual(cleaned['type'], 'mcq')
+
+    def test_option_counts(self):
+        self.assertIsNone(validate_question(_question(options=['a', 'b', 'c']), 'mcq'))
+        self.assertIsNone(validate_question(_question(), 'true-false'))
+        self.assertIsNotNone(validate_question(_question(options=['True', 'False']), 'true-false'))
+        self.assertIsNone(validate_question(_question(), 'unknown'))
+
+    def test_answer_indexes(self):
+        self.assertIsNone(validate_question(_question(correct_answers=[4]), 'mcq'))
+        self.assertIsNone(validate_question(_question(correct_answers=[-1]), 'mcq'))
+        self.assertIsNone(validate_question(_question(correct_answers=['b']), 'mcq'))
+        self.assertIsNone(validate_question(_question(correct_answers=[]), 'mcq'))
+        self.assertIsNone(validate_question(_question(correct_answers=[1, 1]), 'multiple-correct'))
+
+    def test_single_answer_types_need_exactly_one_answer(self):
+        self.assertIsNone(validate_question(_question(correct_answers=[0, 1]), 'mcq'))
+        self.assertEqual(validate_question(_question(correct_answers=[0, 1]), 'multiple-correct')['correct_answers'], [0, 1])
+
+
+def _stored(text, **overrides):
+    question = {'question': text, 'options': ['1', '2', '3', '4'], 'correct_answers': [0], 'explanation': ''}
+    question.update(overrides)
+    return question
+
+
+class ShinglesTests(SimpleTestCase):
+    def test_code_symbols_are_kept(self):
+        self.assertNotEqual(shingles('What does a[1] return?'), shingles('What does a(1) return?'))
+        self.assertIn('x++', shingles('What does "x++" do?'))
+
+    def test_sentence_punctuation_and_stopwords_are_dropped(self):
+        self.assertEqual(shingles('What is a Python decorator?'), shingles('what is a python decorator'))
+
+
+class StoreQuizQuestionsTests(TestCase):
+    def setUp(self):
+        self.topic = Topic.objects.create(name='python', content='{}')
+
+    def store(self, *texts, subtopic='', question_type='mcq'):
+        return store_quiz_questions(self.topic, subtopic, question_type, [_stored(text) for text in texts])
+
+    def test_same_question_reuses_row(self):
+        first = self.store('What is Python?')
+        second = self.store('what is python ?', 'What is PEP 8?')
+        self.assertEqual(second[0]['id'], first[0]['id'])
+        self.assertEqual(QuizQuestion.objects.count(), 2)
+
+    def test_repeats_within_batch_are_stored_once(self):
+        stored = self.store('What is Python?', 'What is Python', 'What is PEP 8?')
+        self.assertEqual(len(stored), 2)
+        self.assertEqual(QuizQuestion.objects.count(), 2)
+
+    def test_pools_are_separate(self):
+        mcq = self.store('What is Python?')
+        other = self.store('What is Python?', subtopic='basics')
+        self.assertNotEqual(mcq[0]['id'], other[0]['id'])
+
+    def test_concurrent_insert_of_same_question_is_ignored(self):
+        inserted = []
+
+        def insert_concurrently(*args):
+            # Another worker stores the same question between the lookup and bulk_create
+            inserted.append(QuizQuestion.objects.create(topic=self.topic, subtopic='', question_type='mcq', **_stored('What is Python?')))
+            return quiz_pool.NearDuplicateIndex()
+
+        with mock.patch.object(quiz_pool, 'load_pool_candidates', insert_concurrently):
+            stored = self.store('What is Python?')
+        self.assertEqual([question['id'] for question in stored], [inserted[0].id])
+        self.assertEqual(QuizQuestion.objects.count(), 1)
+
+    def test_near_duplicate_reuses_stored_row(self):
+        first = self.store('Which keyword defines a generator function in Python code?')
+        second = self.store('In Python code, which keyword defines a generator function?')
+        self.assertEqual(second[0]['id'], first[0]['id'])
+        self.assertEqual(QuizQuestion.objects.count(), 1)
+        self.assertEqual(QuizQuestionBand.objects.filter(question_id=first[0]['id']).count(), settings.QUIZ_LSH_BANDS)
+
+    def test_near_duplicate_within_batch_is_dropped(self):
+        stored = self.store(
+            'Which keyword defines a generator function in Python code?',
+            'In Python code, which keyword defines a generator function?',
+        )
+        self.assertEqual(len(stored), 1)
+
+    def test_code_questions_are_not_near_duplicates(self):
+        stored = self.store('What does a[1] return?', 'What does a(1) return?')
+        self.assertEqual(len(stored), 2)
+
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'search_app-tests'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHE, YOUTUBE_DAILY_QUOTA=250)
+class YouTubeKeyManagerTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.keys = YouTubeKeyManager(['key-a', 'key-b'])
+
+    def test_spreads_cost_over_keys(self):
+        self.assertEqual({self.keys.reserve(100), self.keys.reserve(100)}, {'key-a', 'key-b'})
+        self.assertEqual(self.keys.usage(), {'key-a': 100, 'key-b': 100})
+
+    def test_exhaustion(self):
+        for _ in range(4):
+            self.keys.reserve(100)
+        with self.assertRaises(YouTubeQuotaExhausted):
+            self.keys.reserve(100)
+        # The cheap details call still fits in what is left
+        self.assertIn(self.keys.reserve(1), ('key-a', 'key-b'))
+
+    def test_marked_key_is_skipped(self):
+        self.keys.mark_exhausted('key-a')
+        self.assertEqual(self.keys.reserve(100), 'key-b')
+
+    def test_counters_reset_at_the_quota_day(self):
+        self.keys.mark_exhausted('key-a')
+        self.keys.mark_exhausted('key-b')
+        with mock.patch('search_app.youtube_keys._quota_day', return_value=('2099-01-01', 60)):
+            self.assertEqual(self.keys.usage(), {'key-a': 0, 'key-b': 0})
+            self.assertIn(self.keys.reserve(100), ('key-a', 'key-b'))
+
+
+class VideoDetailsBatcherTests(SimpleTestCase):
+    def test_lone_lookup_does_not_wait(self):
+        calls = []
+
+        def fetch(video_ids):
+            calls.append(list(video_ids))
+            return {video_id: '01:00' for video_id in video_ids}
+
+        batcher = VideoDetailsBatcher(fetch, window_seconds=5)
+        start = time.perf_counter()
+        self.assertEqual(batcher.lookup(['a', 'b', 'a']), {'a': '01:00', 'b': '01:00'})
+        self.assertLess(time.perf_counter() - start, 1)
+        self.assertEqual(calls, [['a', 'b']])
+
+
+def _section_model(invalid=()):
+    """A stub Gemini call answering section prompts with minimal valid values, except for sections in invalid."""
+    pattern = re.compile(r'Only generate the "(.+?)" section')
+
+    def model_call(prompt, **kwargs):
+        key = pattern.search(prompt).group(1)
+        if key in invalid:
+            return '{"truncated": '
+        if key == 'SubTopics':
+            value = {'Description': {'subtopics': [{'name': 'Basics'}]}}
+        elif key.startswith('Road Map'):
+            value = {'Description': {'levels': [{'name': 'Basic Level'}]}}
+        elif key in ('Frequently Asked Questions', 'Related Topics'):
+            value = {'Description': [{'question': 'Why?'}]}
+        else:
+            value = {'Description': 'text'}
+        return json.dumps({key: value})
+    return model_call
+
+
+def _events(stream):
+    return [(event.split('\n')[0][len('event: '):], json.loads(event.split('\n')[1][len('data: '):])) for event in stream]
+
+
+@override_settings(CACHES=LOCMEM_CACHE, TOPIC_SECTION_RETRIES=0, TOPIC_PREFETCH_SUBTOPICS=0, TOPIC_PREFETCH_QUIZ_QUESTIONS=0)
+class StreamTopicContentTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_sections_then_stored_content(self):
+        with mock.patch('search_app.topic_generation.call_gemini_model', _section_model()):
+            events = _events(stream_topic_content('learn python', 'python'))
+        self.assertEqual([event for event, _ in events], ['section'] * len(TOPIC_SECTIONS) + ['complete'])
+        content = json.loads(Topic.objects.get(name='python').content)
+        self.assertEqual(list(content['python']), [section_key(section, 'python') for section, _ in TOPIC_SECTIONS])
+        self.assertEqual(json.loads(events[-1][1]['result']), content)
+
+    def test_invalid_section_sends_error_and_stores_nothing(self):
+        with mock.patch('search_app.topic_generation.call_gemini_model', _section_model(invalid={'SubTopics'})):
+            events = _events(stream_topic_content('learn python', 'python'))
+        self.assertEqual(events[-1][0], 'error')
+        self.assertFalse(Topic.objects.filter(name='python').exists())
+
+
+@override_settings(CACHES=LOCMEM_CACHE, GEMINI_KEY_RPM=2, GEMINI_KEY_MAX_WAIT_SECONDS=0, GEMINI_KEY_COOLDOWN_SECONDS=60)
+class GeminiKeySchedulerTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.scheduler = GeminiKeyScheduler(['key-a', 'key-b'])
+
+    def call(self, error=None):
+        with self.scheduler.acquire() as api_key:
+            if error is not None:
+                raise error
+            return api_key
+
+    def test_spreads_calls_and_exhausts_the_minute(self):
+        used = [self.call() for _ in range(4)]
+        self.assertEqual(sorted(used), ['key-a', 'key-a', 'key-b', 'key-b'])
+        with self.assertRaises(NoGeminiKeyAvailable):
+            self.call()
+        self.assertEqual([row['tokens'] for row in self.scheduler.stats()], [0, 0])
+
+    def test_calls_are_available_again_next_minute(self):
+        now = time.time()
+        with mock.patch('search_app.gemini_keys.time.time', return_value=now):
+            for _ in range(4):
+                self.call()
+        with mock.patch('search_app.gemini_keys.time.time', return_value=now + 60):
+            self.assertIn(self.call(), ('key-a', 'key-b'))
+
+    def test_rate_limited_key_cools_down(self):
+        with mock.patch('search_app.gemini_keys.is_rate_limit_error', return_value=True), \
+                self.assertRaises(RuntimeError):
+            with self.scheduler.acquire() as rate_limited:
+                raise RuntimeError('429')
+        self.assertEqual({self.call(), self.call()}, {'key-a', 'key-b'} - {rate_limited})
+
+    def test_locked_key_falls_back_to_another(self):
+        cache.add(f"gemini_keys:lock:{key_id('key-a')}", 'other-worker', timeout=5)
+        with mock.patch('search_app.gemini_keys._LOCK_WAIT_SECONDS', 0):
+            self.assertEqual(self.call(), 'key-b')
+        # The token taken from the locked key was given back
+        self.assertEqual({row['key_id']: row['tokens'] for row in self.scheduler.stats()}[key_id('key-a')], 2)
+
+    def test_lease_is_released(self):
+        self.call()
+        with self.assertRaises(ValueError):
+            self.call(ValueError('boom'))
+        self.assertEqual(sum(row['in_flight'] for row in self.scheduler.stats()), 0)
+        self.assertEqual(sum(row['errors'] for row in self.scheduler.stats()), 1)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class QuizPoolManagerTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.topic = Topic.objects.create(name='python', content='{}')
+        self.pool = store_quiz_questions(self.topic, '', 'mcq', [_stored(f'Question number {i} about {word}?') for i, word in enumerate(['lists', 'dicts', 'sets'])])
+        self.manager = QuizPoolManager(low_water=0, top_up_size=10)
+
+    def serve(self, num_questions=5, generated=None, error=None):
+        generate = mock.Mock(return_value=generated or [], side_effect=error)
+        with mock.patch('search_app.quiz_generation.generate_quiz_questions', generate):
+            return self.manager.serve(self.topic, '', 'mcq', num_questions, user_id=1), generate
+
+    def test_small_pool_serves_partial_quiz_and_queues_top_up(self):
+        questions, generate = self.serve()
+        self.assertEqual(len(questions), 3)
+        generate.assert_not_called()
+        job = Job.objects.get(kind='top_up_quiz_pool')
+        self.assertEqual(job.priority, Job.PRIORITY_HIGH)
+        self.assertEqual(job.payload['num_questions'], 10)
+
+    def test_generates_only_when_every_question_was_seen(self):
+        mark_questions_seen(1, self.topic.id, '', 'mcq', [question['id'] for question in self.pool])
+        questions, generate = self.serve(generated=[{'id': 99}])
+        generate.assert_called_once_with(self.topic, '', 'mcq', 5)
+        self.assertEqual(questions, [{'id': 99}])
+
+    def test_generation_failure_falls_back_to_seen_questions(self):
+        mark_questions_seen(1, self.topic.id, '', 'mcq', [question['id'] for question in self.pool])
+        questions, _ = self.serve(error=QuizGenerationError('all chunks failed'))
+        self.assertEqual(sorted(question['id'] for question in questions), sorted(question['id'] for question in self.pool))
+
+    def test_generation_failure_on_empty_pool_raises(self):
+        QuizQuestion.objects.all().delete()
+        quiz_pool.invalidate_pool(self.topic.id, '', 'mcq')
+        with self.assertRaises(QuizGenerationError):
+            self.serve(error=QuizGenerationError('all chunks failed'))
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class StreamQuizTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.topic = Topic.objects.create(name='python', content='{}')
+        self.pool = store_quiz_questions(self.topic, '', 'mcq', [_stored('Which keyword defines a generator function?')])
+
+    def stream(self, generated, error=None):
+        def stream_questions(*args):
+            yield from generated
+            if error is not None:
+                raise error
+        with mock.patch('search_app.quiz_generation.stream_quiz_question_data', stream_questions):
+            return [json.loads(line) for line in stream_quiz_ndjson(self.topic, '', 'mcq', 4, user_id=1)]
+
+    def test_generation_failure_ends_with_partial_line(self):
+        lines = self.stream(
+            [_stored('What does the yield from statement delegate to?'), _stored('Why are tuples immutable in Python?')],
+            error=QuizGenerationError('all chunks failed'),
+        )
+        self.assertEqual([line['type'] for line in lines], ['question', 'question', 'question', 'done'])
+        self.assertEqual(lines[-1], {'type': 'done', 'count': 3, 'partial': True, 'error': 'all chunks failed'})
+
+    def test_bands_are_written_once_per_stream(self):
+        generated = [
+            _stored('What does the yield from statement delegate to in Python?'),
+            # A rewording of the previous streamed question, caught before its bands are written
+            _stored('In Python, what does the yield from statement delegate to?'),
+            _stored('Why are tuples immutable in Python?'),
+        ]
+        with mock.patch('search_app.quiz_pool.index_questions', wraps=quiz_pool.index_questions) as index_questions:
+            lines = self.stream(generated)
+        self.assertEqual(index_questions.call_count, 1)
+        self.assertEqual([line['type'] for line in lines], ['question'] * 3 + ['done'])
+        self.assertEqual(QuizQuestion.objects.count(), 3)
+        self.assertEqual(QuizQuestionBand.objects.values('question').distinct().count(), 3)
+
+
+class SubtopicResourcesBatchTests(TestCase):
+    def setUp(self):
+        self.topic = Topic.objects.create(name='python', content='{}')
+
+    def generate(self, answer, subtopics):
+        with mock.patch('search_app.resources.call_gemini_model', return_value=json.dumps(answer)):
+            return generate_subtopic_resources_batch(self.topic, subtopics)
+
+    def test_long_values_are_cut_to_their_columns(self):
+        article = {'title': 'T' * 300, 'url': 'https://example.com/a', 'readTime': 'about ' * 20}
+        too_long_url = {'title': 'Long', 'url': 'https://example.com/' + 'x' * 300, 'readTime': '5 min'}
+        outcome = self.generate({'subtopics': [{'name': 'Lists', 'articles': [article, too_long_url], 'documentation': []}]}, ['Lists'])
+        self.assertEqual(outcome['articles'], 1)
+        stored = ArticleResource.objects.get()
+        self.assertEqual((len(stored.title), len(stored.read_time)), (255, 50))
+
+    def test_missing_is_reported_per_kind(self):
+        article = {'title': 'Lists', 'url': 'https://example.com/lists', 'readTime': '5 min'}
+        outcome = self.generate({'subtopics': [{'name': 'Lists', 'articles': [article], 'documentation': []}]}, ['Lists', 'Dicts'])
+        self.assertEqual(outcome['missing'], {'articles': ['Dicts'], 'documentation': ['Lists', 'Dicts']})
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class SingleFlightTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_leader_runs_once_and_publishes(self):
+        fn = mock.Mock(return_value='content')
+        self.assertEqual(single_flight('topic:python', fn), 'content')
+        self.assertEqual(single_flight('topic:python', fn), 'content')
+        fn.assert_called_once()
+
+    def test_follower_gets_the_leaders_result(self):
+        token = acquire_leadership('topic:python')
+        publisher = threading.Timer(0.1, publish_result, args=('topic:python', token), kwargs={'value': 'from leader'})
+        publisher.start()
+        fn = mock.Mock(return_value='from follower')
+        try:
+            self.assertEqual(single_flight('topic:python', fn, wait_timeout=5), 'from leader')
+        finally:
+            publisher.join()
+        fn.assert_not_called()
+
+    def test_follower_gives_up_after_wait_timeout(self):
+        acquire_leadership('topic:python')
+        fn = mock.Mock()
+        with self.assertRaises(SingleFlightTimeout):
+            single_flight('topic:python', fn, wait_timeout=0.1)
+        fn.assert_not_called()
+
+    def test_leader_failure_reaches_followers(self):
+        with self.assertRaises(ValueError):
+            single_flight('topic:python', mock.Mock(side_effect=ValueError('boom')))
+        with self.assertRaisesMessage(SingleFlightError, 'boom'):
+            single_flight('topic:python', mock.Mock())
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class TopicAliasTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.topic = Topic.objects.create(name='python', content='{"topic": "python"}')
+
+    def resolve(self, query, extracted='Python'):
+        with mock.patch('search_app.views.call_gemini_model', return_value=extracted) as model:
+            result = resolve_search_query(query)
+        cache.clear()
+        return result, model.call_count
+
+    def test_hit_skips_extraction(self):
+        record_topic_alias('How do I learn Python?', 'python')
+        with self.assertNumQueries(2):
+            result, calls = self.resolve('how do i learn   PYTHON')
+        self.assertEqual((result, calls), ((self.topic.content, 'python'), 0))
+
+    def test_miss_extracts_the_topic(self):
+        self.assertEqual(self.resolve('How do I learn Python?'), ((None, 'python'), 1))
+
+    def test_negative_verdict_is_cached_until_it_expires(self):
+        self.assertEqual(self.resolve('best pizza in town', 'not a relevant topic'), ((None, None), 1))
+        self.assertEqual(self.resolve('Best pizza in town!', 'not a relevant topic'), ((None, None), 0))
+
+        TopicAlias.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(self.resolve('best pizza in town', 'not a relevant topic'), ((None, None), 1))
+
+
+class SubtopicPrefetchTests(TestCase):
+    def setUp(self):
+        content = {'topic': 'python', 'python': {'SubTopics': {'Description': {'subtopics': [
+            {'name': 'Lists'}, {'name': 'Dicts'}, {'name': 'Generators'},
+        ]}}}}
+        self.topic = Topic.objects.create(name='python', content=json.dumps(content))
+
+    def test_queues_low_priority_jobs_for_the_first_subtopics(self):
+        # One batched resources job, then videos and a quiz top-up per subtopic; each insert runs in a savepoint
+        with self.assertNumQueries(15):
+            self.assertEqual(schedule_subtopic_prefetch(self.topic, max_subtopics=2, quiz_questions=10), 5)
+        self.assertEqual(set(Job.objects.values_list('priority', flat=True)), {Job.PRIORITY_LOW})
+        self.assertEqual(Job.objects.get(kind='generate_subtopic_resources').payload['subtopics'], ['Lists', 'Dicts'])
+
+    def test_repeat_prefetch_reuses_pending_jobs(self):
+        schedule_subtopic_prefetch(self.topic, max_subtopics=2, quiz_questions=10)
+        schedule_subtopic_prefetch(self.topic, max_subtopics=2, quiz_questions=10)
+        self.assertEqual(Job.objects.count(), 5)
@@ -0,0 +1,57 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .helpers import normalize_prompt, prompt_hash
+from .models import Topic, TopicAlias
+
+logger = logging.getLogger(__name__)
+
+
+def lookup_topic_alias(prompt):
+    """
+    Resolves a raw search prompt through the alias index with a single indexed query.
+
+    Returns:
+        The matching TopicAlias (with its topic loaded), or None if the prompt has not been seen
+        or its negative verdict has expired.
+    """
+    return (
+        TopicAlias.objects
+        .select_related('topic')
+        .filter(prompt_hash=prompt_hash(prompt))
+        .filter(Q(expires_at__isnull=True) | Q(expires_at__gt=timezone.now()))
+        .first()
+    )
+
+
+def record_topic_alias(prompt, topic_name):
+    """Points the normalized prompt at the Topic called topic_name."""
+    topic = Topic.objects.filter(name=topic_name).only('id').first()
+    if topic is None:
+        return
+    TopicAlias.objects.update_or_create(
+        prompt_hash=prompt_hash(prompt),
+        defaults={
+            'normalized_prompt': normalize_prompt(prompt),
+            'topic': topic,
+            'verdict': TopicAlias.VERDICT_TOPIC,
+            'expires_at': None,
+        },
+    )
+
+
+def record_negative_alias(prompt, verdict):
+    """Caches a 'not a relevant topic' / 'not enough information' verdict for TOPIC_ALIAS_NEGATIVE_TTL seconds."""
+    TopicAlias.objects.update_or_create(
+        prompt_hash=prompt_hash(prompt),
+        defaults={
+            'normalized_prompt': normalize_prompt(prompt),
+            'topic': None,
+            'verdict': verdict,
+            'expires_at': timezone.now() + timedelta(seconds=settings.TOPIC_ALIAS_NEGATIVE_TTL),
+        },
+    )
@@ -0,0 +1,287 @@
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.conf import settings
+
+from .gemini_client import call_gemini_model
+from .models import Topic
+from .prefetch import schedule_subtopic_prefetch
+
+logger = logging.getLogger(__name__)
+
+_PROMPT_HEADER = """
+        {topic-name} = {topic}
+Replace the value of {topic-name} in the output object.
+
+Gather the following information about the topic {topic-name}.
+
+Output a single valid JSON object inside the response with key as {topic} and another key as "topic" and its value to be the {topic-name} for example {"topic": "Python", "Python": {rest as shown below}}. The JSON object should contain the following keys and values:
+"""
+
+
+# Each section of Topic.content: (key, structure the model must follow for its value).
+# "{topic-name}" is filled in by the model (monolithic prompt) or by us (section prompts).
+TOPIC_SECTIONS = [
+    ("Short Description", """{
+        "Description": "Write a concise description between 100 and 120 words, using a friendly and conversational tone that encourages beginners. Highlight key points using **bold** text. **Example for 'Python':** **Python** is a versatile language known for its readability. It's used in web development, data science, and more." 
+    }"""),
+    ("Need to Learn {topic-name}", """{
+        "Description": "Explain in a maximum of 50 words why learning {topic-name} is valuable. Use a motivating, beginner-friendly tone. **Example for 'Python':** Learning Python opens doors to exciting career opportunities and empowers you to build innovative applications.",
+        "Benefit 1": {"heading": "give breif heading in 1 or 2 words", "description": "give breif description in 20-30 words"},
+        "Benefit 2": {"heading": "give breif heading in 1 or 2 words", "description": "give breif description in 20-30 words"},
+        "Benefit 3": {"heading": "give breif heading in 1 or 2 words", "description": "give breif description in 20-30 words"},
+    }"""),
+    ("Resource Tab Suggestions", """{
+        "Description": "Provide 3 resource tab name suggestions that would be most helpful for learning {topic-name}. Strictly select from the following options: 'Videos', 'Articles', 'Courses', 'Books', 'Documentation','Cheat Sheets','Practice Problems'. **Example for 'Python':** ['Videos', 'Documentations', 'Practice Problems']" 
+    }"""),
+    ("SubTopics", """{
+        "Description": {
+            "subtopics": [
+                {
+                    "name": "give name of subtopic here",
+                    "description": "40-50 word description. **Example for 'Python Variables':** Understanding how to store and manipulate data.",
+                    "difficulty": "Beginner, Intermediate, Advanced, Expert, Mastery. **Example for 'Python Variables':** Beginner",
+                    "timeToComplete": "e.g., 2 hours. **Example for 'Python Variables':** 2 hours",
+                    "whyItMatters": "20-30 word explanation. **Example for 'Python Variables':** Fundamental for all Python programming tasks.",
+                    "commonMistakes": [
+                        "**Example for 'Python Variables':** Using incorrect data types.",
+                        "**Example for 'Python Variables':** Not understanding variable scope.",
+                        "**Example for 'Python Variables':** Naming variables poorly."
+                    ],
+                    resourceTabs: [],          
+                },
+                {
+                    "name": "give name of subtopic here",
+                    "description": "40-50 word description. **Example for 'Python Loops':** Learning to control program flow.",
+                    "difficulty": "Beginner, Intermediate, Advanced, Expert, Mastery. **Example for 'Python Loops':** Intermediate",
+                    "timeToComplete": "e.g., 2 hours. **Example for 'Python Loops':** 3 hours",
+                    "whyItMatters": "20-30 word explanation. **Example for 'Python Loops':** Enables you to write efficient code.",
+                    "commonMistakes": [
+                        "**Example for 'Python Loops':** Incorrect loop conditions.",
+                        "**Example for 'Python Loops':** Not handling edge cases.",
+                        "**Example for 'Python Loops':** Using infinite loops."
+                    ],
+                    resourceTabs: [],          
+                },
+                // Add more subtopics as needed (At least 6 subtopics are required)
+            ]
+        }
+    }"""),
+    ("Road Map to Learn {topic-name}", """{
+        "Description": {
+            "prerequisites": {
+                ["An array to detail all the prerequisites for learning {topic-name}. Include at least 3 prerequisites.",]
+            },
+            "levels": [
+                {
+                    "name": "Basic Level", // must be "Basic Level" if basic level exists
+                    "description": "Give basic description in 3-5 words of what this level contains",
+                    "topics": [
+                        "**Example for 'Python':** Setting up Python environment.",
+                        "**Example for 'Python':** Basic syntax.",
+                        "**Example for 'Python':** Simple programs."
+                    ],
+                    "howToConquer": "Actionable advice. **Example for 'Python':** Practice coding exercises.",
+                    "insiderTips": "50-word tips. **Example for 'Python':** Join online communities."
+                },
+                {
+                    "name": "Intermediate Level", // must be "Intermediate Level" if Intermediate level exists
+                    "description": "Give basic description in 3-5 words of what this level contains",
+                    "topics": [
+                        "**Example for 'Python':** Object-oriented programming.",
+                        "**Example for 'Python':** Working with APIs.",
+                        "**Example for 'Python':** Web applications."
+                    ],
+                    "howToConquer": "Actionable advice. **Example for 'Python':** Build personal projects.",
+                    "insiderTips": "50-word tips. **Example for 'Python':** Focus on readability."
+                },
+                {
+                    "name": "Advanced Level", // must be "Advanced Level" if Advanced level exists
+                    "description": "Give basic description in 3-5 words of what this level contains",
+                    "topics": [
+                        "**Example for 'Python':** Data analysis.",
+                        "**Example for 'Python':** Machine learning.",
+                        "**Example for 'Python':** Advanced libraries."
+                    ],
+                    "howToConquer": "Actionable advice. **Example for 'Python':** Contribute to open-source.",
+                    "insiderTips": "50-word tips. **Example for 'Python':** Stay updated with trends."
+                },
+                {
+                    "name": "Expert Level", // must be "Expert Level" if Expert level exists
+                    "description": "Give basic description in 3-5 words of what this level contains",
+                    "topics": [
+                        "**Example for 'Python':** Performance optimization.",
+                        "**Example for 'Python':** Advanced algorithms.",
+                        "**Example for 'Python':** System design."
+                    ],
+                    "howToConquer": "Actionable advice. **Example for 'Python':** Mentor others.",
+                    "insiderTips": "50-word tips. **Example for 'Python':** Network with professionals."
+                },
+                // At least 3 levels are required
+            ]
+        }
+    }"""),
+    ("Key Takeaways", """{
+        "Description": "A JSON array containing 3-5 impactful takeaways in detail that summarize the most important points of learning {topic-name}. Each takeaway should be a short, direct statement. **Example for 'Python':** ['Python is versatile and beginner-friendly.', 'Practice is essential to mastering Python.', 'Python has a rich ecosystem of libraries.', 'Python is used in web development, data science, and automation.', 'Python promotes code readability and maintainability.']"
+    }"""),
+    ("Frequently Asked Questions", """{
+        "Description": [
+            {
+                "question": "Example for 'Python': What is Python used for?",
+                "answer": "Example for 'Python': Web development."
+            },
+            {
+                "question": "Example for 'Python': How to install Python?",
+                "answer": "Example for 'Python': Download from website."
+            },
+            // Add more FAQs as needed (at least 5 FAQs are required)
+        ]
+    }"""),
+    ("Related Topics", """{
+        "Description": [
+            {
+                "topic": "Example for 'Python': Web Development",
+                "description": "Example for 'Python': Building websites."
+            },
+            {
+                "topic": "Example for 'Python': Data Science",
+                "description": "Example for 'Python': Analyzing data."
+            },
+            // Add more related topics as needed (at least 3 related topics are required)
+        ]
+    }"""),
+]
+
+_SECTION_PROMPT_TEMPLATE = """
+Gather the following information about the topic {topic-name}.
+
+Only generate the "{section}" section. Output a single valid JSON object with exactly one key, "{section}", whose value follows this structure:
+
+{
+    "{section}": {structure}
+}
+    """
+
+
+class SectionGenerationError(Exception):
+    """Raised when a topic section is still invalid after all of its retries."""
+
+
+def generate_prompt(topic):
+    """The original single prompt asking for every section at once, kept as the baseline of bench_topic_generation."""
+    sections = ",\n".join(f'    "{key}": {structure}' for key, structure in TOPIC_SECTIONS)
+    prompt_template = _PROMPT_HEADER + "\n{\n" + sections + "\n}\n    "
+    return prompt_template.replace("{topic}", topic)
+
+
+def section_key(section, topic):
+    return section.replace("{topic-name}", topic)
+
+
+def generate_section_prompt(topic, section, structure):
+    key = section_key(section, topic)
+    return (
+        _SECTION_PROMPT_TEMPLATE
+        .replace("{structure}", structure.replace("{topic-name}", topic))
+        .replace("{section}", key)
+        .replace("{topic-name}", topic)
+        .replace("{topic}", topic)
+    )
+
+
+def _validate_section(section, value):
+    """Checks the parts of a section's shape the frontend relies on."""
+    if not isinstance(value, dict) or 'Description' not in value:
+        return False
+    description = value['Description']
+    if section == "SubTopics":
+        return isinstance(description, dict) and bool(description.get('subtopics'))
+    if section.startswith("Road Map to Learn"):
+        return isinstance(description, dict) and bool(description.get('levels'))
+    if section in ("Frequently Asked Questions", "Related Topics"):
+        return isinstance(description, list) and bool(description)
+    return True
+
+
+def _generate_section(topic, section, structure, model_call, retries):
+    prompt = generate_section_prompt(topic, section, structure)
+    last_error = None
+    for attempt in range(retries + 1):
+        try:
+            data = json.loads(model_call(prompt, model_name="gemini-2.0-flash"))
+            # The model echoes the key it was given, possibly with different capitalisation
+            value = data.get(section_key(section, topic)) if isinstance(data, dict) else None
+            if value is None and isinstance(data, dict) and len(data) == 1:
+                value = next(iter(data.values()))
+            if _validate_section(section, value):
+                return value
+            last_error = f"invalid structure for section {section!r}"
+        except Exception as e:
+            last_error = e
+        logger.warning(f"Section {section!r} of {topic!r} failed (attempt {attempt + 1}): {last_error}")
+    raise SectionGenerationError(f"Could not generate section {section!r} for {topic!r}: {last_error}")
+
+
+def iter_topic_sections(topic, model_call=None, max_workers=None, retries=None):
+    """
+    Generates the topic sections with one prompt per section, run concurrently on a bounded thread pool.
+
+    Output length dominates Gemini latency, so several short generations in parallel finish much
+    sooner than one long one. A section that fails to parse or validate is retried on its own.
+
+    Yields:
+        (section key, validated value) for each section as soon as it is generated, in completion order.
+
+    Raises:
+        SectionGenerationError: if a section is still invalid after its retries.
+    """
+    model_call = model_call or call_gemini_model
+    max_workers = max_workers or settings.TOPIC_SECTION_WORKERS
+    retries = settings.TOPIC_SECTION_RETRIES if retries is None else retries
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        futures = {
+            executor.submit(_generate_section, topic, section, structure, model_call, retries): section
+            for section, structure in TOPIC_SECTIONS
+        }
+        for future in as_completed(futures):
+            yield section_key(futures[future], topic), future.result()
+    finally:
+        # A failed section, or a consumer that stops early, does not wait for the sections still queued
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def assemble_topic_content(topic, sections):
+    """
+    The content JSON string for generated sections, in the same shape as the single-prompt output:
+    {"topic": topic, topic: {section: value, ...}} with sections in TOPIC_SECTIONS order.
+    """
+    ordered = {section_key(section, topic): sections[section_key(section, topic)] for section, _ in TOPIC_SECTIONS}
+    return json.dumps({"topic": topic, topic: ordered})
+
+
+def generate_topic_sections(topic, model_call=None, max_workers=None, retries=None):
+    """Generates every section of a topic (see iter_topic_sections) and returns the content JSON string."""
+    return assemble_topic_content(topic, dict(iter_topic_sections(topic, model_call, max_workers, retries)))
+
+
+def store_topic_content(topic_name, content):
+    """Stores generated content for topic_name unless another worker already did, and returns the stored content."""
+    # get_or_create instead of create: a topic written by a worker whose lock expired must not raise IntegrityError
+    topic, created = Topic.objects.get_or_create(name=topic_name, defaults={'content': content})
+    if created:
+        schedule_subtopic_prefetch(topic)
+    return topic.content
+
+
+def generate_topic_content(topic_name):
+    """
+    Returns the content for topic_name, generating and storing it with Gemini if it does not exist yet.
+    Meant to run as the single-flight leader, so it re-checks the table before paying for generation.
+    """
+    topic = Topic.objects.filter(name=topic_name).first()
+    if topic:
+        return topic.content
+    # One prompt per section, generated concurrently, instead of one long generation
+    return store_topic_content(topic_name, generate_topic_sections(topic_name))
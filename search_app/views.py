@@ -1,20 +1,23 @@
 import os
 import json
-import traceback
 from django.shortcuts import render
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse
 from django.conf import settings
-from google import genai
-from google.genai import types
-from .youtube_api import search_youtube
+from .gemini_client import call_gemini_model
+from .resources import (
+    fetch_articles, fetch_documentation, fetch_videos,
+    save_articles, save_documentation, save_videos,
+    stored_articles, stored_documentation, stored_videos,
+    RESOURCE_KINDS, get_or_generate_all_resources,
+)
+from .tasks import enqueue_resource_generation, enqueue_topic_generation
 import logging
-import random
-from .models import QuizQuestion, Topic, VideoResource, ArticleResource, DocumentationResource
-from itertools import cycle
-from django.db import transaction
-
-_gemini_api_key_cycle = cycle(settings.GEMINI_API_KEYS)
-_youtube_api_key_cycle = cycle(settings.YOUTUBE_API_KEYS)
+from .models import QuizQuestion, Topic
+from .helpers import normalize_prompt, normalize_topic_name
+from .quiz_generation import quiz_pool_manager
+from .topic_generation import assemble_topic_content, generate_topic_content, iter_topic_sections, store_topic_content
+from .single_flight import acquire_leadership, publish_result, single_flight, SingleFlightTimeout
+from .topic_aliases import lookup_topic_alias, record_negative_alias, record_topic_alias
 
 # Configure logging (optional, for debugging)
 logging.basicConfig(level=logging.DEBUG)
@@ -38,220 +41,190 @@ def extract_relevant_topic_from_prompt_util(user_prompt: str) -> str:
         gemini_response = call_gemini_model(gemini_prompt, model_name = "gemini-2.0-flash", temperature=0.2, max_output_tokens=32, response_mime_type="text/plain")
         response_text = gemini_response.strip().strip('"\'')  # Remove quotes if present
         if response_text.lower() == 'not a relevant topic':
+            record_negative_alias(user_prompt, 'not a relevant topic')
             return 'not a relevant topic'
         if response_text.lower() == 'not enough information':
+            record_negative_alias(user_prompt, 'not enough information')
             return 'not enough information'
         return response_text
     except Exception as e:
         logger.error(f"Error extracting topic from prompt: {e}")
         return 'not a relevant topic'
 
-def call_gemini_model(prompt, model_name="gemini-2.0-pro-exp-02-05", temperature=1, top_p=0.95, top_k=64, max_output_tokens=8192, response_mime_type="application/json"):
-    """
-    Calls the Gemini model with the given prompt and configuration.
+def resolve_search_query(search_query):
     """
-    try:
-        client = genai.Client(api_key=next(_gemini_api_key_cycle))
-        contents = [
-            types.Content(
-                role="user",
-                parts=[types.Part.from_text(text=prompt)],
-            ),
-        ]
-        generate_content_config = types.GenerateContentConfig(
-            temperature=temperature,
-            top_p=top_p,
-            top_k=top_k,
-            max_output_tokens=max_output_tokens,
-            response_mime_type=response_mime_type,
-        )
-        response = client.models.generate_content(
-            model=model_name,
-            contents=contents,
-            config=generate_content_config,
-        )
-        return response.text
-    except Exception as e:
-        logging.error(f"Error calling Gemini model: {e}")
-        traceback.print_exc()
-        raise e
+    Maps a raw search query to a topic without generating any topic content.
 
-def generate_prompt(topic):
-    prompt_template = """
-        {topic-name} = {topic}
-Replace the value of {topic-name} in the output object.
+    Returns:
+        (content, topic_name). content is the stored content when the query names an existing topic,
+        directly or through an alias. Otherwise content is None and topic_name is the normalized topic
+        to generate, or None when the query is not a relevant topic or lacks information.
+    """
+    # Check if topic already exists
+    topic = Topic.objects.filter(name=search_query).first()
+    if topic:
+        return topic.content, topic.name
 
-Gather the following information about the topic {topic-name}.
+    # Repeat phrasings resolve through the alias index without an extraction call
+    alias = lookup_topic_alias(search_query)
+    if alias:
+        if alias.topic_id:
+            return alias.topic.content, alias.topic.name
+        return None, None
 
-Output a single valid JSON object inside the response with key as {topic} and another key as "topic" and its value to be the {topic-name} for example {"topic": "Python", "Python": {rest as shown below}}. The JSON object should contain the following keys and values:
-
-{
-    "Short Description": {
-        "Description": "Write a concise description between 100 and 120 words, using a friendly and conversational tone that encourages beginners. Highlight key points using **bold** text. **Example for 'Python':** **Python** is a versatile language known for its readability. It's used in web development, data science, and more." 
-    },
-    "Need to Learn {topic-name}": {
-        "Description": "Explain in a maximum of 50 words why learning {topic-name} is valuable. Use a motivating, beginner-friendly tone. **Example for 'Python':** Learning Python opens doors to exciting career opportunities and empowers you to build innovative applications.",
-        "Benefit 1": {"heading": "give breif heading in 1 or 2 words", "description": "give breif description in 20-30 words"},
-        "Benefit 2": {"heading": "give breif heading in 1 or 2 words", "description": "give breif description in 20-30 words"},
-        "Benefit 3": {"heading": "give breif heading in 1 or 2 words", "description": "give breif description in 20-30 words"},
-    },
-    "Resource Tab Suggestions": {
-        "Description": "Provide 3 resource tab name suggestions that would be most helpful for learning {topic-name}. Strictly select from the following options: 'Videos', 'Articles', 'Courses', 'Books', 'Documentation','Cheat Sheets','Practice Problems'. **Example for 'Python':** ['Videos', 'Documentations', 'Practice Problems']" 
-    },
-    "SubTopics": {
-        "Description": {
-            "subtopics": [
-                {
-                    "name": "give name of subtopic here",
-                    "description": "40-50 word description. **Example for 'Python Variables':** Understanding how to store and manipulate data.",
-                    "difficulty": "Beginner, Intermediate, Advanced, Expert, Mastery. **Example for 'Python Variables':** Beginner",
-                    "timeToComplete": "e.g., 2 hours. **Example for 'Python Variables':** 2 hours",
-                    "whyItMatters": "20-30 word explanation. **Example for 'Python Variables':** Fundamental for all Python programming tasks.",
-                    "commonMistakes": [
-                        "**Example for 'Python Variables':** Using incorrect data types.",
-                        "**Example for 'Python Variables':** Not understanding variable scope.",
-                        "**Example for 'Python Variables':** Naming variables poorly."
-                    ],
-                    resourceTabs: [],          
-                },
-                {
-                    "name": "give name of subtopic here",
-                    "description": "40-50 word description. **Example for 'Python Loops':** Learning to control program flow.",
-                    "difficulty": "Beginner, Intermediate, Advanced, Expert, Mastery. **Example for 'Python Loops':** Intermediate",
-                    "timeToComplete": "e.g., 2 hours. **Example for 'Python Loops':** 3 hours",
-                    "whyItMatters": "20-30 word explanation. **Example for 'Python Loops':** Enables you to write efficient code.",
-                    "commonMistakes": [
-                        "**Example for 'Python Loops':** Incorrect loop conditions.",
-                        "**Example for 'Python Loops':** Not handling edge cases.",
-                        "**Example for 'Python Loops':** Using infinite loops."
-                    ],
-                    resourceTabs: [],          
-                },
-                // Add more subtopics as needed (At least 6 subtopics are required)
-            ]
-        }
-    },
-    "Road Map to Learn {topic-name}": {
-        "Description": {
-            "prerequisites": {
-                ["An array to detail all the prerequisites for learning {topic-name}. Include at least 3 prerequisites.",]
-            },
-            "levels": [
-                {
-                    "name": "Basic Level", // must be "Basic Level" if basic level exists
-                    "description": "Give basic description in 3-5 words of what this level contains",
-                    "topics": [
-                        "**Example for 'Python':** Setting up Python environment.",
-                        "**Example for 'Python':** Basic syntax.",
-                        "**Example for 'Python':** Simple programs."
-                    ],
-                    "howToConquer": "Actionable advice. **Example for 'Python':** Practice coding exercises.",
-                    "insiderTips": "50-word tips. **Example for 'Python':** Join online communities."
-                },
-                {
-                    "name": "Intermediate Level", // must be "Intermediate Level" if Intermediate level exists
-                    "description": "Give basic description in 3-5 words of what this level contains",
-                    "topics": [
-                        "**Example for 'Python':** Object-oriented programming.",
-                        "**Example for 'Python':** Working with APIs.",
-                        "**Example for 'Python':** Web applications."
-                    ],
-                    "howToConquer": "Actionable advice. **Example for 'Python':** Build personal projects.",
-                    "insiderTips": "50-word tips. **Example for 'Python':** Focus on readability."
-                },
-                {
-                    "name": "Advanced Level", // must be "Advanced Level" if Advanced level exists
-                    "description": "Give basic description in 3-5 words of what this level contains",
-                    "topics": [
-                        "**Example for 'Python':** Data analysis.",
-                        "**Example for 'Python':** Machine learning.",
-                        "**Example for 'Python':** Advanced libraries."
-                    ],
-                    "howToConquer": "Actionable advice. **Example for 'Python':** Contribute to open-source.",
-                    "insiderTips": "50-word tips. **Example for 'Python':** Stay updated with trends."
-                },
-                {
-                    "name": "Expert Level", // must be "Expert Level" if Expert level exists
-                    "description": "Give basic description in 3-5 words of what this level contains",
-                    "topics": [
-                        "**Example for 'Python':** Performance optimization.",
-                        "**Example for 'Python':** Advanced algorithms.",
-                        "**Example for 'Python':** System design."
-                    ],
-                    "howToConquer": "Actionable advice. **Example for 'Python':** Mentor others.",
-                    "insiderTips": "50-word tips. **Example for 'Python':** Network with professionals."
-                },
-                // At least 3 levels are required
-            ]
-        }
-    },
-    "Key Takeaways": {
-        "Description": "A JSON array containing 3-5 impactful takeaways in detail that summarize the most important points of learning {topic-name}. Each takeaway should be a short, direct statement. **Example for 'Python':** ['Python is versatile and beginner-friendly.', 'Practice is essential to mastering Python.', 'Python has a rich ecosystem of libraries.', 'Python is used in web development, data science, and automation.', 'Python promotes code readability and maintainability.']"
-    },
-    "Frequently Asked Questions": {
-        "Description": [
-            {
-                "question": "Example for 'Python': What is Python used for?",
-                "answer": "Example for 'Python': Web development."
-            },
-            {
-                "question": "Example for 'Python': How to install Python?",
-                "answer": "Example for 'Python': Download from website."
-            },
-            // Add more FAQs as needed (at least 5 FAQs are required)
-        ]
-    },
-    "Related Topics": {
-        "Description": [
-            {
-                "topic": "Example for 'Python': Web Development",
-                "description": "Example for 'Python': Building websites."
-            },
-            {
-                "topic": "Example for 'Python': Data Science",
-                "description": "Example for 'Python': Analyzing data."
-            },
-            // Add more related topics as needed (at least 3 related topics are required)
-        ]
-    }
-}
-    """
-    return prompt_template.replace("{topic}", topic)
+    # Coalesce concurrent extractions of the same prompt into one Gemini call
+    topic_name = single_flight(
+        f"extract:{normalize_prompt(search_query)}",
+        lambda: extract_relevant_topic_from_prompt_util(search_query)
+    )
+    topic_name = normalize_topic_name(topic_name)
+    if topic_name == 'not a relevant topic' or topic_name == 'not enough information' or topic_name == '':
+        return None, None
+    return None, topic_name
 
 def search_gemini(request):
-    print("search_gemini called")
     if request.method == 'POST' and request.headers.get('x-requested-with') == 'XMLHttpRequest':
-        print("it is a post request")
-        topic_name = json.loads(request.body).get('search_query', '')
-        
-        print(f"topic_name: {topic_name}")
+        search_query = json.loads(request.body).get('search_query', '')
+        logger.debug(f"search_gemini query: {search_query}")
         
         try:
-            # Check if topic already exists
-            topic = Topic.objects.filter(name=topic_name).first()
-            if topic:
+            content, topic_name = resolve_search_query(search_query)
+            if content is not None:
                 # Return existing content if available
-                return JsonResponse({'result': topic.content})
-            
-            # Generate new content if topic doesn't exist
-            topic_name = extract_relevant_topic_from_prompt_util(topic_name)
-            topic_name = topic_name.strip().lower()
-            if topic_name == 'not a relevant topic' or topic_name == 'not enough information' or topic_name == '':
+                return JsonResponse({'result': content})
+            if topic_name is None:
                 return JsonResponse({'error': 'not a relevant topic or not enough information'}, status=400)
-            prompt = generate_prompt(topic_name)
-            result = call_gemini_model(prompt, model_name="gemini-2.0-flash")
-            
-            # Create new topic with generated content
-            Topic.objects.create(name=topic_name, content=result)
+
+            if json.loads(request.body).get('async'):
+                # Generate in the background; the client polls the job and searches again once it is done
+                job = enqueue_topic_generation(topic_name, search_query, requested_by=request.session.get('user_id'))
+                return JsonResponse({'status': 'queued', 'job_id': job.id, 'topic': topic_name}, status=202)
+
+            # Only one worker generates a cold topic, the others wait for its result
+            result = single_flight(f"topic:{topic_name}", lambda: generate_topic_content(topic_name))
+            record_topic_alias(search_query, topic_name)
             
             return JsonResponse({'result': result})
             
+        except SingleFlightTimeout as e:
+            logger.warning(f"Timed out waiting for topic generation: {e}")
+            return JsonResponse({'error': 'Topic is still being generated, please retry shortly'}, status=503)
         except Exception as e:
-            print(f"Error: {e}")
+            logger.exception(f"Error searching topic: {e}")
             return JsonResponse({'error': str(e)}, status=500)
     
     return JsonResponse({'error': 'Invalid request'}, status=400)
 
+def _sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def stream_topic_content(search_query, topic_name):
+    """
+    Yields server-sent events for a cold topic: one 'section' event per top-level section as soon
+    as it has been generated and validated, then 'complete' with the stored content, or 'error' if
+    a section stays invalid (nothing is stored then). Sections come from the same per-section
+    generation generate_topic_content uses, so both endpoints store content of the same shape.
+
+    The generation lock is the same one search_gemini uses, so a topic is still generated only once;
+    if another worker already leads, this waits for its result and sends only 'complete'.
+    """
+    key = f"topic:{topic_name}"
+    token = acquire_leadership(key)
+    if token is None:
+        try:
+            result = single_flight(key, lambda: generate_topic_content(topic_name))
+            record_topic_alias(search_query, topic_name)
+            yield _sse_event('complete', {'result': result})
+        except SingleFlightTimeout:
+            yield _sse_event('error', {'error': 'Topic is still being generated, please retry shortly'})
+        except Exception as e:
+            yield _sse_event('error', {'error': str(e)})
+        return
+
+    published = False
+    try:
+        topic = Topic.objects.filter(name=topic_name).first()
+        if topic:
+            result = topic.content
+        else:
+            sections = {}
+            for section, value in iter_topic_sections(topic_name):
+                sections[section] = value
+                yield _sse_event('section', {'name': section, 'value': value})
+            result = store_topic_content(topic_name, assemble_topic_content(topic_name, sections))
+        publish_result(key, token, value=result)
+        published = True
+        record_topic_alias(search_query, topic_name)
+        yield _sse_event('complete', {'result': result})
+    except Exception as e:
+        logger.error(f"Error streaming topic generation: {e}")
+        publish_result(key, token, error=e)
+        published = True
+        yield _sse_event('error', {'error': str(e)})
+    finally:
+        if not published:
+            # The client went away mid-stream: release the lock so a waiting worker takes over
+            publish_result(key, token)
+
+def search_gemini_stream(request):
+    """Streaming variant of search_gemini that sends topic sections as server-sent events."""
+    if request.method == 'POST' and request.headers.get('x-requested-with') == 'XMLHttpRequest':
+        search_query = json.loads(request.body).get('search_query', '')
+        try:
+            content, topic_name = resolve_search_query(search_query)
+        except SingleFlightTimeout as e:
+            logger.warning(f"Timed out waiting for topic extraction: {e}")
+            return JsonResponse({'error': 'Topic is still being generated, please retry shortly'}, status=503)
+        except Exception as e:
+            logger.error(f"Error resolving search query: {e}")
+            return JsonResponse({'error': str(e)}, status=500)
+
+        if content is not None:
+            events = iter([_sse_event('complete', {'result': content})])
+        elif topic_name is None:
+            return JsonResponse({'error': 'not a relevant topic or not enough information'}, status=400)
+        else:
+            events = stream_topic_content(search_query, topic_name)
+
+        response = StreamingHttpResponse(events, content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # Stop nginx-style proxies from buffering the stream
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    return JsonResponse({'error': 'Invalid request'}, status=400)
+
+def stream_quiz_ndjson(topic, subtopic, question_type, num_questions, user_id):
+    """
+    Yields the quiz as newline-delimited JSON: one {"type": "question", "question": {...}} line per
+    question as soon as it is stored (so it has its id), then {"type": "done", "count": n, "partial": bool},
+    with an "error" when generation failed part way. A failure outside generation ends the stream
+    with {"type": "error", "error": ..., "count": n, "partial": true}.
+    """
+    count = 0
+    questions = quiz_pool_manager.serve_stream(topic, subtopic, question_type, num_questions, user_id)
+    try:
+        while True:
+            try:
+                question = next(questions)
+            except StopIteration as stop:
+                # serve_stream returns the generation error, if any
+                error = stop.value
+                break
+            count += 1
+            yield json.dumps({'type': 'question', 'question': question}) + '\n'
+    except Exception as e:
+        logger.error(f"Error streaming quiz: {e}")
+        yield json.dumps({'type': 'error', 'error': str(e), 'count': count, 'partial': True}) + '\n'
+        return
+    finally:
+        # Also when the client goes away: stores the stream's index entries and marks questions seen
+        questions.close()
+    done = {'type': 'done', 'count': count, 'partial': count < num_questions}
+    if error:
+        done['error'] = error
+    yield json.dumps(done) + '\n'
+
 def generate_quiz(request):
     if request.session.get('user_id') is None:
         return JsonResponse({
@@ -266,6 +239,15 @@ def generate_quiz(request):
         subtopic = data.get('subtopic', '')
         question_type = data.get('question_type', 'mcq')
         num_questions = data.get('num_questions', 10)
+        try:
+            num_questions = int(num_questions)
+        except (TypeError, ValueError):
+            return JsonResponse({'error': 'num_questions must be an integer'}, status=400)
+        if not 1 <= num_questions <= settings.QUIZ_MAX_QUESTIONS:
+            return JsonResponse({'error': f'num_questions must be between 1 and {settings.QUIZ_MAX_QUESTIONS}'}, status=400)
+        question_types = [qtype for qtype, _ in QuizQuestion.QUESTION_TYPES]
+        if question_type not in question_types:
+            return JsonResponse({'error': f"question_type must be one of: {', '.join(question_types)}"}, status=400)
         
         # Get or create the Topic object
         try:
@@ -276,108 +258,22 @@ def generate_quiz(request):
                 'message': 'Topic not found'
             }, status=404)
         
-        # 50-50 chance to use database or Gemini
-        use_database = random.choice([True, False])
-        
-        if use_database:
-            # Try to get questions from database first
-            questions = QuizQuestion.objects.filter(
-                topic=topic,
-                subtopic=subtopic,
-                question_type=question_type
+        if data.get('stream'):
+            response = StreamingHttpResponse(
+                stream_quiz_ndjson(topic, subtopic, question_type, num_questions, request.session['user_id']),
+                content_type='application/x-ndjson',
             )
-            
-            if questions.exists():
-                # If we have questions in database, use them
-                if questions.count() >= num_questions:
-                    # If we have enough questions, randomly select from existing ones
-                    selected_questions = random.sample(list(questions), num_questions)
-                    questions_data = []
-                    for q in selected_questions:
-                        questions_data.append({
-                            'id': q.id,
-                            'question': q.question,
-                            'options': q.options,
-                            'correct_answers': q.correct_answers,
-                            'explanation': q.explanation,
-                            'type': q.question_type
-                        })
-                    return JsonResponse({'quiz': {'quiz': questions_data}})
-                else:
-                    # If we don't have enough questions, fall back to Gemini
-                    logger.info(f"Database has {questions.count()} questions, falling back to Gemini for {num_questions} questions")
-                    use_database = False
-        
-        if not use_database:
-            # Generate new questions using Gemini
-            prompt = f"""
-                Create a quiz on the {'subtopic of ' + subtopic + ' within the broader topic of ' if subtopic else 'topic of '}{topic_name}.
-                The quiz should consist of {num_questions} questions.
-                All questions should be of type '{question_type}'.
-                There should be only 4 options for mcq type and multiple-correct type questions and only 2 options for true-false type questions.
-                There should be only 1 correct answer for true-false type and mcq type questions and 1 or more correct answers for multiple-correct type questions.
-                For each question, provide:
-                    type: string;
-                    question: string;
-                    options: string[];
-                    correct_answers: number[];
-                    explanation: string;
-                
-                Return the quiz in JSON format with a "quiz" key containing an array of questions.
-            """
-            response_text = call_gemini_model(prompt, model_name="gemini-2.0-flash")
-            quiz_data = eval(response_text)
-            # Store new questions in database and collect their IDs
-            final_questions = []
-            with transaction.atomic():
-                for question in quiz_data["quiz"]:
-                    try:
-                        # Check if question already exists
-                        existing_question = QuizQuestion.objects.filter(
-                            topic=topic,
-                            subtopic=subtopic,
-                            question_type=question_type,
-                            question=question["question"]
-                        ).first()
-                        if existing_question:
-                            # Use existing question with its ID
-                            final_questions.append({
-                                "id": existing_question.id,
-                                "type": existing_question.question_type,
-                                "question": existing_question.question,
-                                "options": existing_question.options,
-                                "correct_answers": existing_question.correct_answers,
-                                "explanation": existing_question.explanation
-                            })
-                        else:
-                            # Create new question and get its ID
-                            new_question = QuizQuestion.objects.create(
-                                topic=topic,
-                                subtopic=subtopic,
-                                question_type=question_type,
-                                question=question["question"],
-                                options=question["options"],
-                                correct_answers=question["correct_answers"],
-                                explanation=question["explanation"],
-                                source="gemini"
-                            )
-                            final_questions.append({
-                                "id": new_question.id,
-                                "type": new_question.question_type,
-                                "question": new_question.question,
-                                "options": new_question.options,
-                                "correct_answers": new_question.correct_answers,
-                                "explanation": new_question.explanation
-                            })
-                    except Exception as e:
-                        logger.warning(f"Error processing question: {e}")
-                        continue
-            return JsonResponse({'quiz': {"quiz": final_questions}})
+            response['Cache-Control'] = 'no-cache'
+            response['X-Accel-Buffering'] = 'no'
+            return response
+
+        # Served from the question pool when it can be; Gemini only fills a pool that is too small
+        questions = quiz_pool_manager.serve(topic, subtopic, question_type, num_questions, request.session['user_id'])
+        # partial: some generated chunks failed, so the quiz has fewer questions than requested
+        return JsonResponse({'quiz': {'quiz': questions}, 'partial': len(questions) < num_questions})
     except Exception as e:
         logger.error(f"Error generating quiz: {e}")
         return JsonResponse({'error': str(e)}, status=400)
-    # Safety net: should never be reached
-    return JsonResponse({'error': 'Unexpected error in generate_quiz'}, status=500)
 
 
 def generate_videos_for_topic(request):
@@ -398,49 +294,20 @@ def generate_videos_for_topic(request):
             
             # Get or create the Topic object
             topic, _ = Topic.objects.get_or_create(name=topic_name)
+            subtopic = subtopic_name if subtopic_name else ''
             
             # Check if videos already exist in database
-            existing_videos = VideoResource.objects.filter(
-                topic=topic,
-                subtopic=subtopic_name if subtopic_name else ''
-            )
-            
-            if existing_videos.exists():
-                videos = [{
-                    'title': video.title,
-                    'url': video.url,
-                    'duration': video.duration,
-                    'thumbnail': video.thumbnail
-                } for video in existing_videos]
+            videos = stored_videos(topic, subtopic)
+            if videos:
                 return JsonResponse({'videos': videos})
             
-            # Generate new videos if not in database
-            youtube_prompt = f"{f'{topic_name} {subtopic_name}' if subtopic_name else topic_name} tutorial"
-            youtube_results = search_youtube(next(_youtube_api_key_cycle), youtube_prompt)
-            
-            videos = []
-            if youtube_results:
-                with transaction.atomic():
-                    for video in youtube_results[:2]:  # Get top 2 videos
-                        video_url = video.get('url', '')
-                        video_id = video_url.split('v=')[-1] if 'v=' in video_url else ''
-                        
-                        video_data = {
-                            'title': video.get('title', ''),
-                            'url': video_url,
-                            'duration': video.get('duration', ''),
-                            'thumbnail': f"https://img.youtube.com/vi/{video_id}/maxresdefault.jpg" if video_id else ''
-                        }
-                        
-                        # Save to database
-                        VideoResource.objects.create(
-                            topic=topic,
-                            subtopic=subtopic_name if subtopic_name else '',
-                            **video_data
-                        )
-                        
-                        videos.append(video_data)
+            if data.get('async'):
+                # Generate in the background; the client polls the job or asks again later
+                job = enqueue_resource_generation('videos', topic, subtopic, requested_by=request.session['user_id'])
+                return JsonResponse({'status': 'queued', 'job_id': job.id}, status=202)
             
+            # Generate new videos if not in database
+            videos = save_videos(topic, subtopic, fetch_videos(topic_name, subtopic))
             return JsonResponse({'videos': videos})
             
         except Exception as e:
@@ -467,54 +334,20 @@ def generate_articles_for_topic(request):
             
             # Get or create the Topic object
             topic, _ = Topic.objects.get_or_create(name=topic_name)
+            subtopic = subtopic_name if subtopic_name else ''
             
             # Check if articles already exist in database
-            existing_articles = ArticleResource.objects.filter(
-                topic=topic,
-                subtopic=subtopic_name if subtopic_name else ''
-            )
-            
-            if existing_articles.exists():
-                articles = [{
-                    'title': article.title,
-                    'url': article.url,
-                    'readTime': article.read_time
-                } for article in existing_articles]
+            articles = stored_articles(topic, subtopic)
+            if articles:
                 return JsonResponse({'articles': articles})
             
-            # Generate new articles if not in database
-            gemini_prompt = f"""
-                Generate 2 high-quality, beginner-friendly articles about {f'{topic_name} {subtopic_name}' if subtopic_name else topic_name}.
-                Return a JSON array with the following structure for each article:
-                {{
-                    "title": "article title",
-                    "url": "article url",
-                    "readTime": "estimated read time"
-                }}
-                
-                Make sure all URLs are valid and accessible.
-            """
-            
-            gemini_response = call_gemini_model(gemini_prompt)
-            articles_data = json.loads(gemini_response)
-            
-            # Save to database
-            articles = []
-            with transaction.atomic():
-                for article_data in articles_data:
-                    article = ArticleResource.objects.create(
-                        topic=topic,
-                        subtopic=subtopic_name if subtopic_name else '',
-                        title=article_data['title'],
-                        url=article_data['url'],
-                        read_time=article_data['readTime']
-                    )
-                    articles.append({
-                        'title': article.title,
-                        'url': article.url,
-                        'readTime': article.read_time
-                    })
+            if data.get('async'):
+                # Generate in the background; the client polls the job or asks again later
+                job = enqueue_resource_generation('articles', topic, subtopic, requested_by=request.session['user_id'])
+                return JsonResponse({'status': 'queued', 'job_id': job.id}, status=202)
             
+            # Generate new articles if not in database
+            articles = save_articles(topic, subtopic, fetch_articles(topic_name, subtopic))
             return JsonResponse({'articles': articles})
             
         except Exception as e:
@@ -541,58 +374,67 @@ def generate_documentation_for_topic(request):
             
             # Get or create the Topic object
             topic, _ = Topic.objects.get_or_create(name=topic_name)
+            subtopic = subtopic_name if subtopic_name else ''
             
             # Check if documentation already exists in database
-            existing_docs = DocumentationResource.objects.filter(
-                topic=topic,
-                subtopic=subtopic_name if subtopic_name else ''
-            )
-            
-            if existing_docs.exists():
-                documentation = [{
-                    'title': doc.title,
-                    'url': doc.url,
-                    'type': doc.doc_type
-                } for doc in existing_docs]
+            documentation = stored_documentation(topic, subtopic)
+            if documentation:
                 return JsonResponse({'documentation': documentation})
             
+            if data.get('async'):
+                # Generate in the background; the client polls the job or asks again later
+                job = enqueue_resource_generation('documentation', topic, subtopic, requested_by=request.session['user_id'])
+                return JsonResponse({'status': 'queued', 'job_id': job.id}, status=202)
+            
             # Generate new documentation if not in database
-            gemini_prompt = f"""
-                Generate 2 official or widely recognized documentation sources for {f'{topic_name} {subtopic_name}' if subtopic_name else topic_name}.
-                Return a JSON array with the following structure for each documentation:
-                {{
-                    "title": "documentation title",
-                    "url": "documentation url",
-                    "type": "documentation type"
-                }}
-                
-                Make sure all URLs are valid and accessible.
-            """
+            documentation = save_documentation(topic, subtopic, fetch_documentation(topic_name, subtopic))
+            return JsonResponse({'documentation': documentation})
+            
+        except Exception as e:
+            logger.error(f"Error generating documentation: {e}")
+            return JsonResponse({'error': str(e)}, status=500)
+    
+    return JsonResponse({'error': 'Invalid request'}, status=400)
+
+def generate_resources_for_topic(request):
+    if request.session.get('user_id') is None:
+        return JsonResponse({
+            'status': 'error',
+            'message': 'User not logged in'
+        }, status=401)
+    """Videos, articles and documentation for a topic or subtopic in one request."""
+    if request.method == 'POST' and request.headers.get('x-requested-with') == 'XMLHttpRequest':
+        try:
+            data = json.loads(request.body)
+            topic_name = data.get('topic_name', '')
+            subtopic_name = data.get('subtopic_name', '')
+            
+            if not topic_name:
+                return JsonResponse({'error': 'Topic name is required'}, status=400)
             
-            gemini_response = call_gemini_model(gemini_prompt)
-            docs_data = json.loads(gemini_response)
+            # Get or create the Topic object
+            topic, _ = Topic.objects.get_or_create(name=topic_name)
+            subtopic = subtopic_name if subtopic_name else ''
             
-            # Save to database
-            documentation = []
-            with transaction.atomic():
-                for doc_data in docs_data:
-                    doc = DocumentationResource.objects.create(
-                        topic=topic,
-                        subtopic=subtopic_name if subtopic_name else '',
-                        title=doc_data['title'],
-                        url=doc_data['url'],
-                        doc_type=doc_data['type']
-                    )
-                    documentation.append({
-                        'title': doc.title,
-                        'url': doc.url,
-                        'type': doc.doc_type
-                    })
+            if data.get('async'):
+                # Return what is stored and queue generation of the rest
+                resources = {kind: stored(topic, subtopic) for kind, (stored, _, _) in RESOURCE_KINDS.items()}
+                jobs = {
+                    kind: enqueue_resource_generation(kind, topic, subtopic, requested_by=request.session['user_id']).id
+                    for kind, items in resources.items() if not items
+                }
+                if jobs:
+                    return JsonResponse({**resources, 'status': 'queued', 'job_ids': jobs}, status=202)
+                return JsonResponse(resources)
             
-            return JsonResponse({'documentation': documentation})
+            # Missing kinds are looked up concurrently
+            resources, errors = get_or_generate_all_resources(topic, subtopic)
+            if errors:
+                resources['errors'] = errors
+            return JsonResponse(resources)
             
         except Exception as e:
-            logger.error(f"Error generating documentation: {e}")
+            logger.error(f"Error generating resources: {e}")
             return JsonResponse({'error': str(e)}, status=500)
     
-    return JsonResponse({'error': 'Invalid request'}, status=400)
\ No newline at end of file
+    return JsonResponse({'error': 'Invalid request'}, status=400)
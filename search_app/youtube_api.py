@@ -1,7 +1,15 @@
+import hashlib
 import logging
+import threading
+import time
+from cachetools import TTLCache
+from django.conf import settings
+from django.core.cache import cache
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 import re
+from .helpers import normalize_prompt
+from .youtube_keys import SEARCH_LIST_COST, VIDEOS_LIST_COST, YouTubeQuotaExhausted, is_quota_error, youtube_keys
 
 logger = logging.getLogger(__name__)
 
@@ -23,30 +31,198 @@ def format_duration(duration):
     else:
         return f"{m:02d}:{s:02d}"
 
-def search_youtube(api_key, query, max_results=5):
+_services = threading.local()
+
+
+def get_youtube_service(api_key, http=None):
+    """
+    Returns a YouTube Data API service object for api_key, built once per thread and key.
+
+    build() parses the discovery document and sets up a transport, which is the bulk of a
+    call's client-side overhead. Services are cached per thread because the underlying
+    httplib2 transport is not thread-safe.
+    """
+    by_key = getattr(_services, 'by_key', None)
+    if by_key is None:
+        by_key = _services.by_key = {}
+    service = by_key.get(api_key)
+    if service is None:
+        service = by_key[api_key] = build('youtube', 'v3', developerKey=api_key, http=http, cache_discovery=False)
+    return service
+
+
+class QueryResultCache:
+    """
+    Caches search results by normalized query in a size-bounded in-process TTL cache, backed by
+    the shared Django cache so other workers and restarts reuse results too.
+    """
+
+    def __init__(self, ttl=None, maxsize=None):
+        self.ttl = ttl if ttl is not None else settings.YOUTUBE_RESULT_CACHE_TTL
+        self._local = TTLCache(maxsize=maxsize or settings.YOUTUBE_RESULT_CACHE_SIZE, ttl=self.ttl)
+        self._lock = threading.Lock()
+
+    def key(self, query, max_results):
+        digest = hashlib.sha256(normalize_prompt(query).encode('utf-8')).hexdigest()
+        return f"youtube_search:{max_results}:{digest}"
+
+    def get(self, key):
+        with self._lock:
+            videos = self._local.get(key)
+        if videos is None:
+            videos = cache.get(key)
+            if videos is not None:
+                with self._lock:
+                    self._local[key] = videos
+        return videos
+
+    def set(self, key, videos):
+        with self._lock:
+            self._local[key] = videos
+        cache.set(key, videos, timeout=self.ttl)
+
+
+search_result_cache = QueryResultCache()
+
+
+class _DetailsBatch:
+    def __init__(self):
+        self.video_ids = []
+        self.durations = {}
+        self.done = threading.Event()
+
+
+class VideoDetailsBatcher:
+    """
+    Coalesces videos().list duration lookups from concurrent searches into shared calls.
+
+    The first caller to open a batch fetches the whole batch (up to 50 IDs, the API maximum) in a
+    single 1-unit call. It only waits a short window for other threads to add their IDs when other
+    lookups are in flight in this process, so a search on an idle worker never sleeps.
+    """
+
+    def __init__(self, fetch, window_seconds=None, max_ids=50):
+        self.fetch = fetch
+        self.window_seconds = window_seconds if window_seconds is not None else settings.YOUTUBE_DETAILS_BATCH_WINDOW_MS / 1000
+        self.max_ids = max_ids
+        self._lock = threading.Lock()
+        self._open_batch = None
+        self._active = 0
+
+    def lookup(self, video_ids):
+        """Returns a map of video ID to formatted duration for the given IDs."""
+        joined = []
+        leading = []
+        with self._lock:
+            self._active += 1
+            for video_id in dict.fromkeys(video_ids):
+                batch = self._open_batch
+                if batch is None or len(batch.video_ids) >= self.max_ids:
+                    batch = self._open_batch = _DetailsBatch()
+                    leading.append(batch)
+                batch.video_ids.append(video_id)
+                if batch not in joined:
+                    joined.append(batch)
+
+        try:
+            for batch in leading:
+                with self._lock:
+                    concurrent = self._active > 1
+                if concurrent and len(batch.video_ids) < self.max_ids:
+                    time.sleep(self.window_seconds)
+                with self._lock:
+                    if self._open_batch is batch:
+                        self._open_batch = None
+                try:
+                    batch.durations = self.fetch(batch.video_ids)
+                except Exception as e:
+                    logger.error(f"Error fetching video details: {e}")
+                finally:
+                    batch.done.set()
+
+            durations = {}
+            for batch in joined:
+                batch.done.wait(timeout=30)
+                durations.update(batch.durations)
+        finally:
+            with self._lock:
+                self._active -= 1
+        return {video_id: durations[video_id] for video_id in video_ids if video_id in durations}
+
+
+def _fetch_durations(video_ids):
+    api_key = youtube_keys.reserve(VIDEOS_LIST_COST)
+    youtube = get_youtube_service(api_key)
+    try:
+        video_response = youtube.videos().list(
+            part='contentDetails',
+            id=','.join(video_ids),
+            maxResults=len(video_ids)
+        ).execute()
+    except HttpError as e:
+        if is_quota_error(e):
+            youtube_keys.mark_exhausted(api_key)
+        raise
+
+    # Create a map of video ID to duration
+    duration_map = {}
+    for video in video_response.get('items', []):
+        try:
+            video_id = video['id']
+            duration = video['contentDetails']['duration']
+            duration_map[video_id] = format_duration(duration)
+        except KeyError as ke:
+            logger.warning(f"Missing duration data: {ke}")
+    return duration_map
+
+
+video_details_batcher = VideoDetailsBatcher(_fetch_durations)
+
+
+def search_youtube(query, max_results=2):
     """
     Searches YouTube for videos based on a query.
 
+    Results are served from the query-result cache when the same normalized query was
+    searched within YOUTUBE_RESULT_CACHE_TTL seconds. Otherwise the API key is chosen by
+    the quota manager; a key that reports quotaExceeded is skipped until the daily reset
+    and the search is retried on the next one.
+
     Args:
-        api_key: Your YouTube Data API v3 key.
         query: The search query string.
-        max_results: The maximum number of results to return.
+        max_results: The maximum number of results to return. Ask only for what will be
+            shown, since every result costs the same 100-unit search call anyway but
+            inflates the details lookup.
 
     Returns:
         A list of dictionaries, where each dictionary represents a video.
         Returns None if an error occurs.
     """
     logger.info(f"search_youtube called with query: {query}")
+    cache_key = search_result_cache.key(query, max_results)
+    cached_videos = search_result_cache.get(cache_key)
+    if cached_videos is not None:
+        return cached_videos
     try:
-        youtube = build('youtube', 'v3', developerKey=api_key)
-
-        # First, search for videos
-        search_response = youtube.search().list(
-            q=query,
-            part='snippet',
-            maxResults=max_results,
-            type='video'
-        ).execute()
+        search_response = None
+        for _ in range(max(1, len(youtube_keys.api_keys))):
+            api_key = youtube_keys.reserve(SEARCH_LIST_COST)
+            youtube = get_youtube_service(api_key)
+            try:
+                # First, search for videos
+                search_response = youtube.search().list(
+                    q=query,
+                    part='snippet',
+                    maxResults=max_results,
+                    type='video'
+                ).execute()
+                break
+            except HttpError as e:
+                if not is_quota_error(e):
+                    raise
+                youtube_keys.mark_exhausted(api_key)
+        if search_response is None:
+            raise YouTubeQuotaExhausted("All YouTube API keys have used up today's quota")
 
         videos = []
         video_ids = []
@@ -60,22 +236,9 @@ def search_youtube(api_key, query, max_results=5):
                 logger.warning(f"Missing video ID in response: {ke}")
                 continue
 
-        # Get video details including duration
+        # Get video details including duration, batched with concurrent searches
         if video_ids:
-            video_response = youtube.videos().list(
-                part='contentDetails',
-                id=','.join(video_ids)
-            ).execute()
-
-            # Create a map of video ID to duration
-            duration_map = {}
-            for video in video_response.get('items', []):
-                try:
-                    video_id = video['id']
-                    duration = video['contentDetails']['duration']
-                    duration_map[video_id] = format_duration(duration)
-                except KeyError as ke:
-                    logger.warning(f"Missing duration data: {ke}")
+            duration_map = video_details_batcher.lookup(video_ids)
 
             # Combine search results with duration
             for search_result in search_response.get('items', []):
@@ -94,11 +257,16 @@ def search_youtube(api_key, query, max_results=5):
                 except KeyError as ke:
                     logger.warning(f"Missing data in response: {ke}")
 
+        if videos:
+            search_result_cache.set(cache_key, videos)
         return videos
 
     except HttpError as e:
         logger.error(f'An HTTP error {e.resp.status} occurred:\n{e.content}')
         return None
+    except YouTubeQuotaExhausted as e:
+        logger.error(str(e))
+        return None
     except Exception as e:
         logger.error(f"An unexpected error occurred: {e}")
-        return None
\ No newline at end of file
+        return None
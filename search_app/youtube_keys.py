@@ -0,0 +1,91 @@
+import hashlib
+import logging
+from datetime import datetime, time as dt_time, timedelta
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# YouTube Data API quotas reset at midnight Pacific time
+_QUOTA_TIMEZONE = ZoneInfo('America/Los_Angeles')
+
+# Quota cost of each YouTube Data API call we make
+SEARCH_LIST_COST = 100
+VIDEOS_LIST_COST = 1
+
+
+class YouTubeQuotaExhausted(Exception):
+    """Raised when no configured YouTube key has enough quota left today for the call."""
+
+
+def is_quota_error(error):
+    """True if a googleapiclient HttpError says the key is out of daily quota."""
+    resp = getattr(error, 'resp', None)
+    if resp is None or getattr(resp, 'status', None) != 403:
+        return False
+    content = getattr(error, 'content', b'') or b''
+    if isinstance(content, bytes):
+        content = content.decode('utf-8', errors='ignore')
+    return 'quotaExceeded' in content or 'dailyLimitExceeded' in content
+
+
+def _quota_day():
+    """Returns (quota day label, seconds until the next Pacific-time quota reset)."""
+    now = datetime.now(_QUOTA_TIMEZONE)
+    next_reset = datetime.combine(now.date() + timedelta(days=1), dt_time.min, tzinfo=_QUOTA_TIMEZONE)
+    return now.date().isoformat(), int((next_reset - now).total_seconds()) + 60
+
+
+class YouTubeKeyManager:
+    """
+    Tracks how many YouTube quota units each key has spent today, in the shared Django cache.
+
+    Units are reserved before a call is made, so concurrent workers cannot overspend a key,
+    and counters expire at the Pacific-time quota boundary. A key that answers quotaExceeded
+    is marked as fully spent until the next reset.
+    """
+
+    def __init__(self, api_keys=None):
+        self.api_keys = [key for key in (api_keys if api_keys is not None else settings.YOUTUBE_API_KEYS) if key]
+        self.daily_quota = settings.YOUTUBE_DAILY_QUOTA
+
+    def _usage_key(self, api_key, day):
+        return f"youtube_quota:{hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:12]}:{day}"
+
+    def usage(self):
+        """Units spent today per key."""
+        day, _ = _quota_day()
+        keys = {api_key: self._usage_key(api_key, day) for api_key in self.api_keys}
+        stored = cache.get_many(list(keys.values()))
+        return {api_key: stored.get(cache_key, 0) for api_key, cache_key in keys.items()}
+
+    def reserve(self, cost):
+        """
+        Charges cost units to the key with the most quota left and returns that key.
+
+        Raises:
+            YouTubeQuotaExhausted: if no key has cost units left today.
+        """
+        day, ttl = _quota_day()
+        usage = self.usage()
+        for api_key in sorted(self.api_keys, key=lambda k: usage[k]):
+            if usage[api_key] + cost > self.daily_quota:
+                continue
+            cache_key = self._usage_key(api_key, day)
+            cache.add(cache_key, 0, timeout=ttl)
+            spent = cache.incr(cache_key, cost)
+            if spent <= self.daily_quota:
+                return api_key
+            # Another worker got there first; give the units back and try the next key
+            cache.decr(cache_key, cost)
+        raise YouTubeQuotaExhausted("All YouTube API keys have used up today's quota")
+
+    def mark_exhausted(self, api_key):
+        day, ttl = _quota_day()
+        logger.warning("YouTube key ran out of quota, skipping it until the Pacific-time reset")
+        cache.set(self._usage_key(api_key, day), self.daily_quota, timeout=ttl)
+
+
+youtube_keys = YouTubeKeyManager()